@@ -316,8 +316,8 @@ export const Chat = forwardRef<ChatRef>(function Chat(_, ref) {
       await supabase
         .from('tasks')
         .update({
-          status: 'failed',
-          error: 'Cancelled by user',
+          status: 'cancelled',
+          error_message: 'Cancelled by user',
         })
         .eq('id', secretRequest.taskId)
       
@@ -1,4 +1,4 @@
-import { supabase } from './supabase'
+import { supabase, TaskLog } from './supabase'
 
 const SUPABASE_URL = import.meta.env.VITE_SUPABASE_URL
 
@@ -76,3 +76,15 @@ export async function get2FAStatus(userId: string) {
   if (error) throw error
   return data
 }
+
+// Task logs are paged by seq: pass the last seq you have to get newer lines.
+// seq counts up per task in commit order, so no line appears behind a cursor.
+export async function getTaskLogs(taskId: string, sinceSeq = 0, limit = 200): Promise<TaskLog[]> {
+  const { data, error } = await supabase.rpc('get_task_logs', {
+    p_task_id: taskId,
+    p_since_seq: sinceSeq,
+    p_limit: limit,
+  })
+  if (error) throw error
+  return data
+}
@@ -50,11 +50,26 @@ export interface Task {
   updated_at: string
 }
 
+export interface TaskLog {
+  task_id: string
+  seq: number
+  message: string
+  type: 'info' | 'success' | 'warning' | 'error'
+  logged_at: string
+}
+
 export interface SecretVault {
   id: string
   user_id: string
   name: string
-  encrypted_value: string
+  description: string | null
+  // Stored as entered by the vault page (the worker reads them as-is)
+  encrypted_username: string | null
+  encrypted_password: string | null
+  encrypted_notes: string | null
+  website_url: string | null
+  category: 'social' | 'email' | 'work' | 'finance' | 'shopping' | 'other'
+  last_used_at: string | null
   created_at: string
   updated_at: string
 }
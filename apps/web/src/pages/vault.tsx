@@ -23,7 +23,9 @@ export default function VaultPage() {
   const [loading, setLoading] = useState(true)
   const [showAddDialog, setShowAddDialog] = useState(false)
   const [newSecretName, setNewSecretName] = useState('')
-  const [newSecretValue, setNewSecretValue] = useState('')
+  const [newSecretUrl, setNewSecretUrl] = useState('')
+  const [newSecretUsername, setNewSecretUsername] = useState('')
+  const [newSecretPassword, setNewSecretPassword] = useState('')
   const [savingSecret, setSavingSecret] = useState(false)
   const [visibleSecrets, setVisibleSecrets] = useState<Set<string>>(new Set())
 
@@ -47,7 +49,7 @@ export default function VaultPage() {
   }
 
   const handleAddSecret = async () => {
-    if (!newSecretName || !newSecretValue) return
+    if (!newSecretName || !newSecretUrl || !newSecretPassword) return
     
     setSavingSecret(true)
     try {
@@ -56,7 +58,10 @@ export default function VaultPage() {
         .insert({
           user_id: user?.id,
           name: newSecretName,
-          encrypted_value: newSecretValue, // In production, encrypt client-side
+          website_url: newSecretUrl,
+          // Stored as entered; the worker signs in with these on website_url
+          encrypted_username: newSecretUsername || null,
+          encrypted_password: newSecretPassword,
         })
 
       if (error) throw error
@@ -67,7 +72,9 @@ export default function VaultPage() {
       })
       setShowAddDialog(false)
       setNewSecretName('')
-      setNewSecretValue('')
+      setNewSecretUrl('')
+      setNewSecretUsername('')
+      setNewSecretPassword('')
       fetchSecrets()
     } catch {
       toast({
@@ -160,9 +167,13 @@ export default function VaultPage() {
               >
                 <div className="flex-1 min-w-0">
                   <h3 className="font-medium">{secret.name}</h3>
+                  <p className="text-sm text-muted-foreground truncate">
+                    {secret.website_url}
+                    {secret.encrypted_username && ` · ${secret.encrypted_username}`}
+                  </p>
                   <p className="text-sm text-muted-foreground font-mono">
                     {visibleSecrets.has(secret.id)
-                      ? secret.encrypted_value
+                      ? secret.encrypted_password
                       : '••••••••••••'}
                   </p>
                 </div>
@@ -202,19 +213,40 @@ export default function VaultPage() {
               <Label htmlFor="secret-name">Name</Label>
               <Input
                 id="secret-name"
-                placeholder="e.g., GitHub Token"
+                placeholder="e.g., GitHub"
                 value={newSecretName}
                 onChange={(e) => setNewSecretName(e.target.value)}
               />
             </div>
             <div className="space-y-2">
-              <Label htmlFor="secret-value">Value</Label>
+              <Label htmlFor="secret-url">Website</Label>
+              <Input
+                id="secret-url"
+                type="url"
+                placeholder="e.g., https://github.com"
+                value={newSecretUrl}
+                onChange={(e) => setNewSecretUrl(e.target.value)}
+              />
+            </div>
+            <div className="space-y-2">
+              <Label htmlFor="secret-username">Username or email</Label>
+              <Input
+                id="secret-username"
+                autoComplete="off"
+                placeholder="Enter username"
+                value={newSecretUsername}
+                onChange={(e) => setNewSecretUsername(e.target.value)}
+              />
+            </div>
+            <div className="space-y-2">
+              <Label htmlFor="secret-password">Password</Label>
               <Input
-                id="secret-value"
+                id="secret-password"
                 type="password"
-                placeholder="Enter secret value"
-                value={newSecretValue}
-                onChange={(e) => setNewSecretValue(e.target.value)}
+                autoComplete="new-password"
+                placeholder="Enter password"
+                value={newSecretPassword}
+                onChange={(e) => setNewSecretPassword(e.target.value)}
               />
             </div>
           </div>
@@ -0,0 +1,273 @@
+"""
+Admission Control - Claim tasks only when the instance has room for them
+
+Every running task holds a Chromium instance of a few hundred MB, and the
+worker runs on instances with as little as 1 GB of RAM. Before claiming
+work, the dispatch loop asks the controller how many tasks it may start:
+1. Available memory must cover the expected footprint of each new task
+   plus a reserve (container cgroup limits are honoured)
+2. CPU use must be below ADMISSION_MAX_CPU_PERCENT
+3. An idle worker always admits one task, so the queue cannot stall
+
+Tasks claimed in the last RAMP_UP_SECONDS are charged their full expected
+footprint, because their browsers have not grown into it yet.
+
+Under the supervisor several worker processes sample the same host. Each
+claims against its share (1/WORKER_PROCESSES) of the free memory above the
+reserve, so together they cannot over-commit it; its own idle browsers
+count in full.
+
+Tasks that are not admitted are simply not claimed and stay pending for
+this or another worker. The expected task footprint starts at
+ADMISSION_TASK_MEMORY_MB and follows the RSS of the browsers that running
+tasks actually hold. Idle warm browsers count towards the headroom, since
+the memory they already hold is what the next task would use.
+"""
+
+import os
+import time
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import psutil
+
+import metrics
+
+logger = logging.getLogger("autoagent.admission")
+
+# Admission configuration
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_TASK_MEMORY_MB = float(os.getenv("ADMISSION_TASK_MEMORY_MB", "300"))
+ADMISSION_RESERVE_MB = float(os.getenv("ADMISSION_RESERVE_MB", "150"))
+ADMISSION_MAX_CPU_PERCENT = float(os.getenv("ADMISSION_MAX_CPU_PERCENT", "90"))
+ADMISSION_SAMPLE_INTERVAL = float(os.getenv("ADMISSION_SAMPLE_INTERVAL", "1"))
+
+# Share of the host's headroom this process may claim against: under the
+# supervisor (see supervisor.py) it is split between the worker processes
+ADMISSION_SHARE = (
+    1.0 / max(1, int(os.getenv("WORKER_PROCESSES", "1")))
+    if os.getenv("WORKER_SLOT") is not None
+    else 1.0
+)
+
+# A just-claimed task has not grown into its footprint yet; it is charged
+# against the headroom for this long so the next wake-up cannot over-admit
+RAMP_UP_SECONDS = 30.0
+
+# Weight of the newest observation in the task footprint estimate
+FOOTPRINT_SMOOTHING = 0.3
+
+CGROUP_V2_DIR = "/sys/fs/cgroup"
+CGROUP_V1_DIR = "/sys/fs/cgroup/memory"
+
+
+@dataclass
+class ResourceSample:
+    """Memory and CPU headroom of the instance at one point in time."""
+
+    available_mb: float
+    total_mb: float
+    cpu_percent: float
+    idle_browser_mb: float
+
+
+@dataclass
+class AdmissionDecision:
+    """How many tasks may be claimed now, and why."""
+
+    admitted: int
+    reason: str
+
+
+def _read_int(path: str) -> Optional[int]:
+    try:
+        with open(path) as f:
+            value = f.read().strip()
+    except OSError:
+        return None
+    return int(value) if value.isdigit() else None
+
+
+def cgroup_memory() -> Optional[Tuple[float, float]]:
+    """
+    Memory limit and usage of this container, in MB.
+
+    Returns:
+        Tuple of (limit_mb, usage_mb), or None when not limited by a cgroup
+    """
+    for limit_file, usage_file in (
+        (f"{CGROUP_V2_DIR}/memory.max", f"{CGROUP_V2_DIR}/memory.current"),
+        (f"{CGROUP_V1_DIR}/memory.limit_in_bytes", f"{CGROUP_V1_DIR}/memory.usage_in_bytes"),
+    ):
+        limit, usage = _read_int(limit_file), _read_int(usage_file)
+        # "max" (v2) or a huge sentinel (v1) means no limit
+        if limit is not None and usage is not None and limit < psutil.virtual_memory().total:
+            return limit / (1024 * 1024), usage / (1024 * 1024)
+    return None
+
+
+class AdmissionController:
+    """
+    Decides how many of the free execution slots may take a task.
+
+    Usage:
+        admission = AdmissionController(browser_pool)
+        decision = admission.admit(free_slots=2, active=1)
+        if decision.admitted:
+            tasks = claim(decision.admitted)
+            admission.started(len(tasks))
+    """
+
+    def __init__(
+        self,
+        browser_pool=None,
+        enabled: bool = ADMISSION_ENABLED,
+        task_memory_mb: float = ADMISSION_TASK_MEMORY_MB,
+        reserve_mb: float = ADMISSION_RESERVE_MB,
+        max_cpu_percent: float = ADMISSION_MAX_CPU_PERCENT,
+        sample_interval: float = ADMISSION_SAMPLE_INTERVAL,
+        share: float = ADMISSION_SHARE,
+    ):
+        self.browser_pool = browser_pool
+        self.enabled = enabled
+        self.task_memory_mb = task_memory_mb
+        self.reserve_mb = reserve_mb
+        self.max_cpu_percent = max_cpu_percent
+        self.sample_interval = sample_interval
+        self.share = share
+
+        self.deferred = 0
+
+        self._sample: Optional[ResourceSample] = None
+        self._sampled_at = 0.0
+        self._deferring = False
+        self._ramping: List[float] = []
+        # Prime psutil's CPU counter; the first reading is otherwise 0
+        psutil.cpu_percent(interval=None)
+
+    def sample(self) -> ResourceSample:
+        """Current headroom, re-read at most every sample_interval seconds."""
+        now = time.monotonic()
+        if self._sample is not None and now - self._sampled_at < self.sample_interval:
+            return self._sample
+
+        memory = psutil.virtual_memory()
+        available_mb = memory.available / (1024 * 1024)
+        total_mb = memory.total / (1024 * 1024)
+        limited = cgroup_memory()
+        if limited is not None:
+            limit_mb, usage_mb = limited
+            available_mb = min(available_mb, limit_mb - usage_mb)
+            total_mb = limit_mb
+
+        idle_mb: List[float] = []
+        if self.browser_pool is not None:
+            idle_mb, leased_mb = self.browser_pool.rss_by_state()
+            self._observe_footprint(leased_mb)
+
+        self._sample = ResourceSample(
+            available_mb=available_mb,
+            total_mb=total_mb,
+            cpu_percent=psutil.cpu_percent(interval=None),
+            idle_browser_mb=sum(idle_mb),
+        )
+        self._sampled_at = now
+        return self._sample
+
+    @property
+    def shedding(self) -> bool:
+        """True while the last decision left free slots idle."""
+        return self._deferring
+
+    def capacity(self) -> int:
+        """How many tasks the current free memory could hold (at least one)."""
+        return max(1, self._fits(self.sample()))
+
+    def admit(self, free_slots: int, active: int) -> AdmissionDecision:
+        """
+        Decide how many tasks to claim for the free slots.
+
+        Args:
+            free_slots: Execution slots without a task
+            active: Tasks currently running in this worker
+
+        Returns:
+            AdmissionDecision with the number of tasks to claim (0 to shed load)
+        """
+        if free_slots <= 0:
+            return AdmissionDecision(0, "no free slots")
+        if not self.enabled:
+            return AdmissionDecision(free_slots, "admission control disabled")
+
+        sample = self.sample()
+        headroom = (
+            f"{sample.available_mb:.0f}MB free of {sample.total_mb:.0f}MB, "
+            f"{sample.idle_browser_mb:.0f}MB in idle browsers, CPU {sample.cpu_percent:.0f}%"
+        )
+
+        if sample.cpu_percent > self.max_cpu_percent:
+            decision = AdmissionDecision(0, f"CPU above {self.max_cpu_percent:.0f}% ({headroom})")
+        else:
+            fits = self._fits(sample)
+            admitted = max(0, min(free_slots, fits))
+            decision = AdmissionDecision(
+                admitted,
+                f"{max(fits, 0)} tasks of ~{self.task_memory_mb:.0f}MB fit above the "
+                f"{self.reserve_mb:.0f}MB reserve ({headroom}, {self._share_note()}{len(self._ramping)} tasks ramping up)",
+            )
+
+        # Deferring with nothing running would leave the queue stuck forever
+        if decision.admitted == 0 and active == 0:
+            decision = AdmissionDecision(1, f"idle worker, admitting one task despite: {decision.reason}")
+
+        self._record(decision, free_slots)
+        return decision
+
+    def started(self, count: int):
+        """Register tasks claimed on the back of an admission decision."""
+        now = time.monotonic()
+        self._ramping.extend([now] * count)
+
+    def stats(self) -> dict:
+        return {
+            "deferred": self.deferred,
+            "task_memory_mb": round(self.task_memory_mb, 1),
+        }
+
+    def _fits(self, sample: ResourceSample) -> int:
+        cutoff = time.monotonic() - RAMP_UP_SECONDS
+        self._ramping = [t for t in self._ramping if t > cutoff]
+        usable = (
+            (sample.available_mb - self.reserve_mb) * self.share + sample.idle_browser_mb
+            - len(self._ramping) * self.task_memory_mb
+        )
+        return int(usable // self.task_memory_mb)
+
+    def _share_note(self) -> str:
+        return f"{self.share:.0%} of it for this process, " if self.share < 1 else ""
+
+    def _observe_footprint(self, leased_mb: List[float]):
+        """Follow the RSS that running tasks' browsers actually use."""
+        if not leased_mb:
+            return
+        observed = sum(leased_mb) / len(leased_mb)
+        self.task_memory_mb += FOOTPRINT_SMOOTHING * (observed - self.task_memory_mb)
+
+    def _record(self, decision: AdmissionDecision, free_slots: int):
+        # Admissions are logged with the tasks they claim (see TaskWorker)
+        deferred = free_slots - decision.admitted
+        if not deferred:
+            self._deferring = False
+            return
+
+        self.deferred += deferred
+        metrics.ADMISSION_DEFERRED.inc(deferred)
+
+        # The dispatch loop asks on every wake-up; log when shedding starts
+        message = f"Leaving {deferred}/{free_slots} free slots idle: {decision.reason}"
+        if self._deferring:
+            logger.debug(message)
+        else:
+            logger.info(message)
+        self._deferring = True
@@ -8,20 +8,90 @@ This module implements the core agent that:
 """
 
 import os
+import json
 import asyncio
 import logging
-from typing import Optional, Any
-from supabase import Client
+import time
+import shutil
+import tempfile
+from contextlib import AsyncExitStack
+from datetime import datetime, timezone
+from typing import Callable, Optional
+from supabase import AsyncClient
 
-from browser_use import Agent, Browser, ChatAnthropic
+from browser_use import Agent, AgentHistoryList, Browser, ChatAnthropic
+from browser_use.agent.views import AgentState
+from browser_use.llm.base import BaseChatModel
+from browser_use.utils import SignalHandler
+import metrics
+from artifact_store import ArtifactStore
+from browser_pool import BrowserPool
+from credential_vault import CredentialVault
+from execution_profiles import ExecutionProfile, RequestBlocker, profile_for
+from fan_out import (
+    FANOUT_ENABLED, FANOUT_MAX_PARALLEL, FANOUT_SUBTASK_MAX_STEPS,
+    continuation_prompt, looks_decomposable, merge_results, plan_subtasks,
+)
+from human_loop import detect_input_requirement, needs_credentials
+from log_sink import TaskLogSink
+from progress import ProgressPublisher
+from session_registry import PausedSessionRegistry
+from trace_cache import TraceCache
 
 logger = logging.getLogger("autoagent.agent")
 
+# The worker owns SIGTERM/SIGINT (stop claiming, drain, see main.py). Every
+# Agent.run() would otherwise install browser-use 0.11's handlers over the
+# worker's, exit the process on SIGTERM mid-run, and remove all handlers for
+# both signals when it returns.
+SignalHandler.register = lambda self: None
+SignalHandler.unregister = lambda self: None
+
 # Anthropic configuration
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 
-if not ANTHROPIC_API_KEY:
-    raise ValueError("ANTHROPIC_API_KEY must be set")
+# Step budget per task; a resumed task only runs the steps it has left
+MAX_STEPS = 25
+
+# Actions whose extracted content is published as a partial result
+PARTIAL_RESULT_ACTIONS = {"extract", "extract_structured_data"}
+
+# Bumped whenever the layout of tasks.browser_state changes
+BROWSER_STATE_VERSION = 1
+
+# Trace replay: attempts per recorded step, and the cap on the pause between
+# steps (recorded pauses include LLM thinking time that replay does not need)
+REPLAY_MAX_RETRIES = 2
+REPLAY_STEP_DELAY = 1.0
+
+# Name the agent uses to refer to user-provided input (see sensitive_data)
+USER_INPUT_SECRET = "user_input"
+
+# Names the agent uses to refer to credentials from the user's vault
+VAULT_USERNAME_SECRET = "vault_username"
+VAULT_PASSWORD_SECRET = "vault_password"
+
+# Reports visible credential/code fields (with the page text when there are
+# any), and the document's load time from the Navigation Timing API
+PAGE_PROBE_JS = """() => {
+    const visible = (el) => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    const any = (selector) => Array.from(document.querySelectorAll(selector)).some(visible);
+    const fields = any('input[type=password]') || any('input[autocomplete=one-time-code]');
+    const text = fields && document.body ? document.body.innerText : '';
+    const nav = performance.getEntriesByType('navigation')[0];
+    const load = nav && nav.loadEventEnd > 0 ? (nav.loadEventEnd - nav.startTime) / 1000 : null;
+    return JSON.stringify({fields: fields, text: text, origin: performance.timeOrigin, load: load});
+}"""
+
+
+def create_llm() -> BaseChatModel:
+    """The model tasks run on (browser-use 0.11.x has its own ChatAnthropic wrapper)."""
+    if not ANTHROPIC_API_KEY:
+        raise ValueError("ANTHROPIC_API_KEY must be set")
+    return ChatAnthropic(
+        model="claude-opus-4-5-20251101",
+        api_key=ANTHROPIC_API_KEY,
+    )
 
 
 class BrowserAgent:
@@ -35,51 +105,254 @@ class BrowserAgent:
     - Real-time logging to Supabase
     """
 
-    def __init__(self, supabase: Client):
+    def __init__(
+        self,
+        supabase: AsyncClient,
+        browser_pool: Optional[BrowserPool] = None,
+        log_sink: Optional[TaskLogSink] = None,
+        session_registry: Optional[PausedSessionRegistry] = None,
+        trace_cache: Optional[TraceCache] = None,
+        llm_factory: Callable[[], BaseChatModel] = create_llm,
+        credential_vault: Optional[CredentialVault] = None,
+        artifact_store: Optional[ArtifactStore] = None,
+        progress: Optional[ProgressPublisher] = None,
+    ):
         self.supabase = supabase
+        self.browser_pool = browser_pool
+        self.log_sink = log_sink
+        self.session_registry = session_registry
+        self.trace_cache = trace_cache
+        self.llm_factory = llm_factory
+        self.credential_vault = credential_vault
+        self.artifact_store = artifact_store
+        self.progress = progress
         self.browser: Optional[Browser] = None
         self.current_task_id: Optional[str] = None
+        # Set on the agents a fanned-out task runs its subtasks on ("1", "2", ...)
+        self.subtask: Optional[str] = None
+        self.max_steps = MAX_STEPS
+        # Share of the step budget used, and what extract actions returned, so far
+        self.progress_fraction = 0.0
+        self._partial_results: list = []
+        # A fanned-out task publishes progress over its subtask agents
+        self._parent: Optional["BrowserAgent"] = None
+        self._subtask_agents: list = []
+        # (subtask, result) of subtasks that succeeded before the task fell
+        # back to one run; that run only does the rest
+        self._finished_subtasks: list = []
+        # True while this agent's live session is held by the session registry
+        self.parked = False
+        self._agent: Optional[Agent] = None
+        self._prompt = ""
+        self._user_id: Optional[str] = None
+        self._required_input: dict = {}
+        self._lease = None
+        self._browser_stack = AsyncExitStack()
+        # How the browser is set up for the current task, and what it blocked
+        self.profile: ExecutionProfile = profile_for(None)
+        self._blocker: Optional[RequestBlocker] = None
+        # URL of the form the user just answered; not re-detected until we leave it
+        self._answered_url: Optional[str] = None
+        # Sites signed in to with vault credentials this run; a second login
+        # form on the same site (e.g. wrong password) goes to the user
+        self._vault_hosts: set = set()
+        # Step screenshots kept by the artifact store, by hash: [{"step", "sha256"}]
+        self._screenshots: list = []
+        self._last_screenshot_path: Optional[str] = None
+        # Per-step timings of the current run, summarized into its result
+        self.task_metrics: Optional[metrics.TaskMetrics] = None
+        # Document whose load time was last recorded (performance.timeOrigin)
+        self._loaded_origin: Optional[float] = None
 
-    async def run_task(self, task_id: str, prompt: str) -> dict:
+    async def run_task(
+        self,
+        task_id: str,
+        prompt: str,
+        browser_state: Optional[dict] = None,
+        user_input: Optional[str] = None,
+        user_id: Optional[str] = None,
+        task_type: Optional[str] = None,
+    ) -> dict:
         """
         Execute a browser task with the given prompt.
         
         Args:
             task_id: The Supabase task ID for logging
             prompt: The user's instruction
+            browser_state: Snapshot saved when the task paused, to continue from
+            user_input: The input the user provided for the paused step
+            user_id: The task owner, whose recorded action traces may be replayed
+            task_type: Selects the execution profile (headless, blocklist, viewport)
             
         Returns:
             dict with task results
         """
         self.current_task_id = task_id
+        self._prompt = prompt
+        self._user_id = user_id
+        self.profile = profile_for(task_type)
+        self.task_metrics = metrics.track_task(self._run_key())
+        self._vault_hosts = set()
+        self._screenshots = []
+        self.progress_fraction = 0.0
+        self._partial_results = []
+        self._finished_subtasks = []
+        self._last_screenshot_path = None
+        
+        # Index the user's saved logins while the browser starts
+        if self.credential_vault is not None and user_id:
+            self.credential_vault.prefetch(user_id)
+        
+        # Only fresh runs replay or record traces; resumed runs start mid-task
+        resumed = bool(browser_state or user_input)
+        trace = None
+        if self.trace_cache is not None and user_id and not resumed:
+            trace = await self.trace_cache.get(user_id, prompt)
+
+        # List-style prompts may run as parallel subtasks instead. Not when
+        # resuming: the user's input must not reach the planner or subtasks.
+        if trace is None and not resumed and self.subtask is None and FANOUT_ENABLED and looks_decomposable(prompt):
+            fanned_out = await self._fan_out(task_id, prompt, user_id, task_type)
+            if fanned_out is not None:
+                return fanned_out
+            if self._finished_subtasks:
+                # Resumes continue this prompt too (see _snapshot_state)
+                prompt = self._prompt = continuation_prompt(prompt, self._finished_subtasks)
         
         try:
             await self._log(task_id, "Initializing browser...", "info")
             
-            # Create browser instance (headless=False to see what's happening)
-            self.browser = Browser(headless=False)
+            storage_state = browser_state.get("storage_state") if browser_state else None
+            self.browser = await self._open_browser(storage_state)
             
             await self._log(task_id, "Browser initialized, creating agent...", "info")
             
             # Create the browser-use agent
-            # browser-use 0.11.x has its own ChatAnthropic wrapper
-            llm = ChatAnthropic(
-                model="claude-opus-4-5-20251101",
-                api_key=ANTHROPIC_API_KEY,
-            )
+            llm = self.llm_factory()
+            metrics.instrument_llm(llm, lambda: self.task_metrics)
             
-            agent = Agent(
-                task=prompt,
-                llm=llm,
-                browser=self.browser,
-            )
-            
-            await self._log(task_id, "Agent created, starting execution...", "info")
+            if browser_state:
+                agent = self._restore_agent(prompt, llm, browser_state, user_input)
+                await self._log(task_id, f"Restored agent at step {agent.state.n_steps}, continuing...", "info")
+            elif user_input:
+                # Restarted without a snapshot: the LLM only sees a placeholder
+                field_name = self._required_input.get("field_name", "password")
+                agent = Agent(
+                    task=(
+                        f"{prompt}\n\nIf you encounter a login page or verification form, enter "
+                        f"<secret>{USER_INPUT_SECRET}</secret> in the {field_name} field."
+                    ),
+                    llm=llm,
+                    browser=self.browser,
+                    sensitive_data={USER_INPUT_SECRET: user_input},
+                )
+                await self._log(task_id, "Agent created, restarting with your input...", "info")
+            else:
+                agent = Agent(
+                    task=prompt,
+                    llm=llm,
+                    browser=self.browser,
+                )
+                await self._log(task_id, "Agent created, starting execution...", "info")
+            metrics.instrument_actions(agent, lambda: self.task_metrics)
             
+        except asyncio.CancelledError:
+            # Stopped (cancelled, deadline, token budget) while setting up
+            await self._close_browser()
+            metrics.untrack_task(self._run_key())
+            raise
+        except Exception as e:
+            logger.error(f"Agent error: {e}")
+            await self._log(task_id, f"Error: {str(e)}", "error")
+            await self._close_browser()
+            metrics.untrack_task(self._run_key())
+            raise
+
+        self._agent = agent
+        record = (
+            self.trace_cache is not None and self._user_id is not None
+            and not resumed and not self._finished_subtasks
+        )
+        return await self._run_agent(task_id, trace=trace, record=record)
+
+    async def resume_live(self, task_id: str, user_input: str) -> dict:
+        """
+        Continue a parked session in place: same browser, same page, same agent.
+
+        Args:
+            task_id: The task ID
+            user_input: The secret/code provided by user
+
+        Returns:
+            dict with task results
+        """
+        self.current_task_id = task_id
+        self.parked = False
+        self.task_metrics = metrics.track_task(task_id)
+        agent = self._agent
+
+        await self._log(task_id, f"Resuming live session at step {agent.state.n_steps}...", "info")
+
+        try:
+            self._answered_url = await self.browser.get_current_page_url()
+        except Exception:
+            self._answered_url = None
+        self._provide_input(agent, self._prompt, user_input)
+
+        return await self._run_agent(task_id)
+
+    async def _run_agent(self, task_id: str, trace: Optional[dict] = None, record: bool = False) -> dict:
+        """
+        Run (or continue) the browser-use agent and turn its history into a result.
+
+        Args:
+            task_id: The task ID
+            trace: Recorded action trace to replay before involving the LLM
+            record: Save the action trace if the LLM run succeeds
+        """
+        agent = self._agent
+        try:
+            replay = None
+            if trace is not None:
+                replayed_result, replay = await self._replay_trace(task_id, agent, trace)
+                if replay["hit"]:
+                    await self._log(task_id, "Execution completed", "success")
+                    return {
+                        "success": True,
+                        "result": replayed_result or "Task completed successfully.",
+                        "steps_taken": replay["steps"],
+                        "replay": replay,
+                        "metrics": self.task_metrics.summary(),
+                        "profile": self._profile_summary(),
+                        "artifacts": self._artifacts_summary(),
+                    }
+                # The LLM carries on from wherever the replay stopped
+                record = False
+
             # Run the agent
-            history = await agent.run(max_steps=25)
+            started = time.monotonic()
+            history = await agent.run(
+                max_steps=self.max_steps,
+                on_step_start=self._on_step_start,
+                on_step_end=self._on_step_end,
+            )
             
             await self._log(task_id, "Execution completed", "success")
+
+            # Vault sign-ins type secrets by placeholder; a replay has no
+            # sensitive_data to fill them in, so it could only fail
+            if record and self._vault_hosts:
+                logger.info(f"Not recording trace for task {task_id}: it signed in with vault credentials")
+                record = False
+
+            if record and history.is_successful():
+                await self.trace_cache.save(
+                    self._user_id,
+                    self._prompt,
+                    history.model_dump(mode="json"),
+                    len(history.history),
+                    time.monotonic() - started,
+                )
             
             # Extract meaningful result
             final_result = "Task completed successfully."
@@ -91,13 +364,22 @@ class BrowserAgent:
                 else:
                     final_result = str(history)[:500] if history else final_result
             
-            return {
+            result = {
                 "success": True,
                 "result": final_result,
                 "steps_taken": agent.n_steps if hasattr(agent, 'n_steps') else 0,
             }
+            if replay is not None:
+                result["replay"] = replay
+            result["metrics"] = self.task_metrics.summary()
+            result["profile"] = self._profile_summary()
+            result["artifacts"] = self._artifacts_summary()
+            return result
             
         except LoginRequiredError as e:
+            # A subtask cannot pause on its own; the fanned-out task decides
+            if self.subtask is not None:
+                raise
             # Handle login/2FA - pause and wait for user input
             return await self._handle_login_required(task_id, e)
             
@@ -107,13 +389,365 @@ class BrowserAgent:
             raise
             
         finally:
-            # Cleanup browser
-            if self.browser:
+            metrics.untrack_task(self._run_key())
+            if not self.parked:
+                self._discard_screenshot_files(agent)
+                await self._close_browser()
+
+    def _run_key(self) -> str:
+        """What this run's metrics and frames are tracked under: the task, or task/subtask."""
+        if self.subtask is None:
+            return self.current_task_id
+        return f"{self.current_task_id}/{self.subtask}"
+
+    async def _fan_out(self, task_id: str, prompt: str, user_id: Optional[str], task_type: Optional[str]) -> Optional[dict]:
+        """
+        Run a list-style prompt as independent subtasks in parallel.
+
+        Every subtask runs on its own agent and browser context (browser-use
+        drives every tab of the browser it attaches to, so agents cannot
+        share one), FANOUT_MAX_PARALLEL at a time.
+
+        Returns:
+            The merged result, or None to run the prompt as one task (not
+            decomposable, or a subtask needs input from the user; subtasks
+            that succeeded by then are left in _finished_subtasks)
+        """
+        llm = self.llm_factory()
+        metrics.instrument_llm(llm, lambda: self.task_metrics)
+        try:
+            subtasks = await plan_subtasks(llm, prompt)
+        except Exception as e:
+            logger.warning(f"Fan-out planning failed for task {task_id}: {e}")
+            return None
+        if not subtasks:
+            return None
+
+        parallel = min(FANOUT_MAX_PARALLEL, len(subtasks))
+        await self._log(task_id, f"Split into {len(subtasks)} independent subtasks, running {parallel} at a time", "info")
+
+        semaphore = asyncio.Semaphore(parallel)
+        started = time.monotonic()
+
+        self._subtask_agents = []
+        for number in range(1, len(subtasks) + 1):
+            child = BrowserAgent(
+                self.supabase, self.browser_pool, self.log_sink,
+                llm_factory=self.llm_factory,
+                credential_vault=self.credential_vault,
+                artifact_store=self.artifact_store,
+                progress=self.progress,
+            )
+            child.subtask = str(number)
+            child.max_steps = FANOUT_SUBTASK_MAX_STEPS
+            child._parent = self
+            self._subtask_agents.append(child)
+
+        async def run_subtask(child: "BrowserAgent", subtask: str) -> dict:
+            async with semaphore:
+                subtask_started = time.monotonic()
                 try:
-                    await self.browser.close()
-                except:
-                    pass
-                self.browser = None
+                    result = await child.run_task(task_id, subtask, user_id=user_id, task_type=task_type)
+                except LoginRequiredError:
+                    raise
+                except Exception as e:
+                    result = {"success": False, "error": str(e), "steps_taken": 0}
+                result["started_after_seconds"] = round(subtask_started - started, 2)
+                result["seconds"] = round(time.monotonic() - subtask_started, 2)
+                child.progress_fraction = 1.0
+                self._publish_progress()
+                return result
+
+        runs = [asyncio.create_task(run_subtask(child, subtask)) for child, subtask in zip(self._subtask_agents, subtasks)]
+        try:
+            results = await asyncio.gather(*runs)
+        except LoginRequiredError as e:
+            # Kept, not redone: the single run is told what they found
+            self._finished_subtasks = [
+                (subtask, run.result())
+                for subtask, run in zip(subtasks, runs)
+                if run.done() and not run.cancelled() and run.exception() is None and run.result().get("success")
+            ]
+            await self._log(
+                task_id,
+                f"A subtask needs {e.field_name} from you; running the {len(subtasks) - len(self._finished_subtasks)} "
+                f"unfinished subtasks as one task instead",
+                "warning",
+            )
+            self._subtask_agents = []
+            return None
+        except BaseException:
+            metrics.untrack_task(self._run_key())
+            raise
+        finally:
+            # Stops the other subtasks if one failed or the task was stopped
+            for run in runs:
+                run.cancel()
+            await asyncio.gather(*runs, return_exceptions=True)
+
+        seconds = time.monotonic() - started
+        succeeded = sum(1 for r in results if r.get("success"))
+        await self._log(task_id, f"Execution completed: {succeeded}/{len(subtasks)} subtasks succeeded in {seconds:.1f}s", "success")
+        metrics.untrack_task(self._run_key())
+
+        return {
+            "success": succeeded == len(subtasks),
+            "result": merge_results(subtasks, results),
+            "steps_taken": sum(r.get("steps_taken", 0) for r in results),
+            "fan_out": {
+                "parallel": parallel,
+                "seconds": round(seconds, 2),
+                # What running the subtasks one after another would have taken
+                "sequential_seconds": round(sum(r["seconds"] for r in results), 2),
+                "subtasks": [
+                    {
+                        "prompt": subtask,
+                        "success": r.get("success", False),
+                        "result": r.get("result"),
+                        "error": r.get("error"),
+                        "steps_taken": r.get("steps_taken", 0),
+                        "started_after_seconds": r["started_after_seconds"],
+                        "seconds": r["seconds"],
+                        "metrics": r.get("metrics"),
+                    }
+                    for subtask, r in zip(subtasks, results)
+                ],
+            },
+            # Planning; each subtask's own metrics are under fan_out
+            "metrics": self.task_metrics.summary(),
+            "profile": self._profile_summary(),
+            "artifacts": {
+                "screenshots": [
+                    {**shot, "subtask": i}
+                    for i, r in enumerate(results, start=1)
+                    for shot in (r.get("artifacts") or {}).get("screenshots", [])
+                ],
+            },
+        }
+
+    async def _replay_trace(self, task_id: str, agent: Agent, trace: dict) -> tuple:
+        """
+        Replay a recorded action trace without asking the LLM for next steps.
+
+        Every step re-locates the elements it acts on and the replay stops at
+        the first step that fails, leaving the browser where it got to.
+
+        Returns:
+            Tuple of (final result text or None, replay stats for the task result)
+        """
+        history = AgentHistoryList.load_from_dict(trace["history"], agent.AgentOutput)
+        await self._log(task_id, f"Replaying {len(history.history)} recorded steps...", "info")
+
+        started = time.monotonic()
+        try:
+            results = await agent.rerun_history(
+                history,
+                max_retries=REPLAY_MAX_RETRIES,
+                skip_failures=False,
+                delay_between_actions=REPLAY_STEP_DELAY,
+                max_step_interval=REPLAY_STEP_DELAY,
+            )
+            hit = True
+        except Exception as e:
+            await self._log(task_id, f"Replay stopped ({e}), continuing with the LLM", "warning")
+            results, hit = [], False
+        elapsed = time.monotonic() - started
+
+        counts = await self.trace_cache.record_replay(self._user_id, self._prompt, hit)
+        replays = counts.get("replays", 0)
+        attempts = replays + counts.get("replay_failures", 0)
+        recorded = trace.get("recorded_duration_seconds") or 0
+
+        stats = {
+            "hit": hit,
+            "steps": len(history.history),
+            "replay_seconds": round(elapsed, 2),
+            "time_saved_seconds": round(max(0.0, recorded - elapsed), 2) if hit else 0.0,
+            "hit_rate": round(replays / attempts, 3) if attempts else None,
+        }
+        if hit:
+            await self._log(task_id, f"Replay finished in {elapsed:.1f}s (recorded run took {recorded:.1f}s)", "info")
+
+        final_result = results[-1].extracted_content if results else None
+        return final_result, stats
+
+    async def close_session(self):
+        """Close a session the registry is done holding."""
+        self.parked = False
+        if self._agent is not None:
+            self._discard_screenshot_files(self._agent)
+        self._agent = None
+        await self._close_browser()
+
+    def _profile_summary(self) -> dict:
+        """The execution profile the task ran with, and the requests it blocked."""
+        if self._blocker is None:
+            return {"name": self.profile.name, "headless": self.profile.headless}
+        summary = self._blocker.summary()
+        if summary["requests_blocked"]:
+            logger.info(
+                f"[{self.current_task_id}] Blocked {summary['requests_blocked']} requests "
+                f"(~{summary['bytes_saved_estimate'] / 1024:.0f}KB)"
+            )
+        return summary
+
+    def _artifacts_summary(self) -> dict:
+        """Step screenshots of the run, referenced by artifact hash."""
+        return {"screenshots": list(self._screenshots)}
+
+    async def _store_screenshot(self, agent: Agent):
+        """Hand the step's screenshot to the artifact store (which may skip it)."""
+        if self.artifact_store is None or not agent.history.history:
+            return
+        path = agent.history.history[-1].state.screenshot_path
+        if not path or path == self._last_screenshot_path:
+            return
+        self._last_screenshot_path = path
+        sha = await self.artifact_store.put_screenshot(self._run_key(), path)
+        if sha is not None:
+            self._screenshots.append({"step": agent.state.n_steps - 1, "sha256": sha})
+
+    def _report_progress(self, agent: Agent):
+        """Record steps used and anything the step extracted, and publish them."""
+        if self.progress is None:
+            return
+        if agent.history.history:
+            last = agent.history.history[-1]
+            actions = last.model_output.action if last.model_output else []
+            for action, action_result in zip(actions, last.result):
+                name = next(iter(action.model_dump(exclude_none=True)), None)
+                if name in PARTIAL_RESULT_ACTIONS and action_result.extracted_content:
+                    self._partial_results.append(action_result.extracted_content)
+        self.progress_fraction = min(1.0, (agent.state.n_steps - 1) / self.max_steps)
+        (self._parent or self)._publish_progress()
+
+    def _publish_progress(self):
+        """Hand the task's progress to the publisher (over all subtasks, if fanned out)."""
+        if self.progress is None:
+            return
+        if self._subtask_agents:
+            fraction = sum(a.progress_fraction for a in self._subtask_agents) / len(self._subtask_agents)
+            partial = [f"[subtask {a.subtask}] {text}" for a in self._subtask_agents for text in a._partial_results]
+        else:
+            fraction, partial = self.progress_fraction, self._partial_results
+        self.progress.report(self.current_task_id, progress=round(fraction * 100), partial_results=partial)
+
+    def _discard_screenshot_files(self, agent: Agent):
+        """Remove browser-use's own full-size copies once the run is over."""
+        if self.artifact_store is None:
+            return
+        self.artifact_store.release(self._run_key())
+        service = getattr(agent, "screenshot_service", None)
+        if service is not None:
+            shutil.rmtree(service.screenshots_dir, ignore_errors=True)
+
+    def browser_rss_mb(self) -> float:
+        """Resident memory of this session's pooled browser, 0 if unknown."""
+        if self._lease is None:
+            return 0.0
+        return self._lease.browser.rss_mb()
+
+    async def _open_browser(self, storage_state: Optional[dict] = None) -> Browser:
+        """
+        Create a browser session, on a warm pooled browser when available,
+        set up as the task's execution profile asks.
+
+        Args:
+            storage_state: Cookies and localStorage to load once connected
+        """
+        options = self.profile.browser_options()
+        if storage_state:
+            # browser-use loads storage state from a file when the browser connects
+            fd, path = tempfile.mkstemp(prefix="browser-state-", suffix=".json")
+            with os.fdopen(fd, "w") as f:
+                json.dump(storage_state, f)
+            self._browser_stack.callback(os.unlink, path)
+            options["storage_state"] = path
+
+        if self.browser_pool is None:
+            # keep_alive stops agent.run() from killing it, so a paused session
+            # can be parked; _close_browser kills it. Request blocking needs a
+            # context we own, so it only applies to pooled browsers.
+            return Browser(headless=self.profile.headless, keep_alive=True, **options)
+
+        # Pooled browsers are launched headless or not for the whole pool
+        # (BROWSER_HEADLESS); the profile sets up the context we lease
+        self._lease = await self._browser_stack.enter_async_context(self.browser_pool.lease())
+        if self.profile.blocks_requests:
+            self._blocker = RequestBlocker(self.profile)
+            # browser-use opens new tabs in the default context, not the leased one
+            await self._blocker.attach(self._lease.context, self._lease.default_context)
+        return Browser(cdp_url=self._lease.cdp_url, keep_alive=True, **options)
+
+    def _restore_agent(self, prompt: str, llm: BaseChatModel, browser_state: dict, user_input: Optional[str]) -> Agent:
+        """Rebuild a paused agent from its snapshot so it continues at the paused step."""
+        options = {}
+        if browser_state.get("url"):
+            options["initial_actions"] = [{"navigate": {"url": browser_state["url"], "new_tab": False}}]
+
+        agent = Agent(
+            task=prompt,
+            llm=llm,
+            browser=self.browser,
+            injected_agent_state=AgentState.model_validate(browser_state["agent_state"]),
+            **options,
+        )
+        if browser_state.get("history"):
+            agent.history = AgentHistoryList.load_from_dict(browser_state["history"], agent.AgentOutput)
+
+        if user_input:
+            self._required_input = browser_state.get("required_input") or {}
+            self._provide_input(agent, prompt, user_input)
+            self._answered_url = browser_state.get("url")
+
+        return agent
+
+    def _provide_input(self, agent: Agent, prompt: str, user_input: str):
+        """Hand the user's input to a paused agent and tell it to continue."""
+        # The LLM refers to the input by name; browser-use fills in the value
+        agent.sensitive_data = {**(agent.sensitive_data or {}), USER_INPUT_SECRET: user_input}
+
+        field_name = self._required_input.get("field_name", "requested value")
+        agent.add_new_task(
+            f"{prompt}\n\nThe user has provided the {field_name} the page asked for. "
+            f"Enter it as <secret>{USER_INPUT_SECRET}</secret> and continue where you left off."
+        )
+
+    async def _snapshot_state(self, agent: Agent, required_input: dict) -> dict:
+        """Capture what is needed to continue this run later: storage, URL and agent state."""
+        storage_state = await self.browser._cdp_get_storage_state()
+        return {
+            "version": BROWSER_STATE_VERSION,
+            "saved_at": datetime.now(timezone.utc).isoformat(),
+            "url": await self.browser.get_current_page_url(),
+            # Differs from the task's prompt when the run continues a fan-out
+            "prompt": self._prompt,
+            "required_input": required_input,
+            "storage_state": storage_state,
+            # last_model_output is rebuilt by the next step; pending images are per-step
+            "agent_state": agent.state.model_dump(
+                mode="json",
+                exclude={"last_model_output": True, "message_manager_state": {"read_state_images"}},
+            ),
+            "history": agent.history.model_dump(mode="json"),
+        }
+
+    async def _close_browser(self):
+        """Disconnect the browser session and hand any pooled browser back."""
+        if self.browser:
+            try:
+                if self.browser_pool is not None:
+                    # stop() honours keep_alive, leaving the pooled process running
+                    await self.browser.stop()
+                else:
+                    await self.browser.kill()
+            except:
+                pass
+            self.browser = None
+
+        await self._browser_stack.aclose()
+        self._lease = None
+        self._blocker = None
 
     async def resume_with_input(self, task_id: str, user_input: str) -> dict:
         """
@@ -131,29 +765,24 @@ class BrowserAgent:
         await self._log(task_id, "Resuming with user-provided input...", "info")
         
         # Get the task to retrieve browser state and original prompt
-        result = self.supabase.table("tasks").select("*").eq("id", task_id).single().execute()
+        result = await self.supabase.table("tasks").select("*").eq("id", task_id).single().execute()
         task = result.data
         
         if not task:
             raise ValueError(f"Task {task_id} not found")
         
-        # For now, we restart the task with the input included
-        # In a production system, you'd serialize browser state
         original_prompt = task["prompt"]
-        required_input = task.get("required_input", {})
-        field_name = required_input.get("field_name", "password")
-        
-        # Construct new prompt with credentials
-        augmented_prompt = f"""
-        {original_prompt}
-        
-        IMPORTANT: If you encounter a login page or verification form, 
-        use this value for the {field_name} field: {user_input}
-        
-        Continue where you left off.
-        """
-        
-        return await self.run_task(task_id, augmented_prompt)
+        browser_state = task.get("browser_state")
+        if browser_state and browser_state.get("version") == BROWSER_STATE_VERSION:
+            return await self.run_task(
+                task_id, browser_state.get("prompt") or original_prompt, browser_state=browser_state, user_input=user_input,
+                user_id=task.get("user_id"), task_type=task.get("task_type"),
+            )
+
+        # No usable snapshot (e.g. paused by an older worker): restart from
+        # the beginning, with the input handed over as sensitive data
+        self._required_input = task.get("required_input") or {}
+        return await self.run_task(task_id, original_prompt, user_input=user_input, task_type=task.get("task_type"))
 
     async def _handle_login_required(self, task_id: str, error: 'LoginRequiredError') -> dict:
         """
@@ -162,15 +791,20 @@ class BrowserAgent:
         """
         await self._log(task_id, "Login/verification required, pausing for user input...", "warning")
         
+        # Keep the live session so a quick answer resumes instantly. Parked
+        # before the status update, which is what lets a resume be claimed.
+        if self.session_registry is not None and self._agent is not None:
+            self.parked = await self.session_registry.park(task_id, self)
+
         # Update task to waiting state
-        self.supabase.table("tasks").update({
-            "status": "waiting_for_secret",
-            "required_input": {
-                "type": error.input_type if hasattr(error, 'input_type') else "password",
-                "field_name": error.field_name if hasattr(error, 'field_name') else "Password/Code",
-                "hint": error.hint if hasattr(error, 'hint') else "Please provide the required credentials or verification code.",
-            },
-        }).eq("id", task_id).execute()
+        if self.log_sink is not None:
+            await self.log_sink.flush(task_id)
+        try:
+            await self._set_waiting_for_input(task_id, error)
+        except Exception:
+            if self.parked:
+                await self.session_registry.discard(task_id)
+            raise
         
         # Return and let the worker's polling handle the resume
         return {
@@ -179,19 +813,158 @@ class BrowserAgent:
             "message": "Waiting for user input",
         }
 
-    async def _on_step_end(self, task_id: str, step: Any):
-        """Callback after each agent step for logging."""
+    async def _set_waiting_for_input(self, task_id: str, error: 'LoginRequiredError'):
+        """Mark the task waiting_for_secret with what it needs and how to resume."""
+        with metrics.db_write("set_waiting_for_input", task_id):
+            await self.supabase.table("tasks").update({
+                "status": "waiting_for_secret",
+                "required_input": {
+                    "type": error.input_type if hasattr(error, 'input_type') else "password",
+                    "field_name": error.field_name if hasattr(error, 'field_name') else "Password/Code",
+                    "hint": error.hint if hasattr(error, 'hint') else "Please provide the required credentials or verification code.",
+                    "screenshot": getattr(error, "screenshot", None),
+                },
+                # Lets the resume continue from this step instead of starting over
+                "browser_state": error.browser_state,
+                # Reserves the resume for this worker while its session is live
+                "parked_at": "now()" if self.parked else None,
+                # Release the claim; once input arrives a worker resumes it
+                "lease_expires_at": None,
+            }).eq("id", task_id).execute()
+
+    async def _on_step_start(self, agent: Agent):
+        """Hook run before each agent step: starts its timing."""
+        self.task_metrics.start_step(agent.state.n_steps)
+
+    async def _on_step_end(self, agent: Agent):
+        """
+        Hook run after each agent step: records its timing, logs it and pauses
+        the task if the page now asks for credentials or a verification code.
+        """
+        task_id = self.current_task_id
+        self.task_metrics.end_step()
         try:
-            step_info = str(step) if step else "Step completed"
-            await self._log(task_id, f"Step: {step_info[:100]}", "info")
+            await self._log(task_id, f"Step {agent.state.n_steps - 1} completed", "info")
         except Exception as e:
             logger.warning(f"Error logging step: {e}")
+        await self._store_screenshot(agent)
+        self._report_progress(agent)
+
+        requirement = await self._detect_required_input()
+        if requirement is None:
+            return
+
+        if await self._sign_in_from_vault(agent, requirement):
+            return
+
+        input_type, field_name, hint = requirement
+        required_input = {"type": input_type, "field_name": field_name, "hint": hint}
+        if self._screenshots:
+            # What the page looked like when it asked (artifact hash)
+            required_input["screenshot"] = self._screenshots[-1]["sha256"]
+        self._required_input = required_input
+        try:
+            browser_state = await self._snapshot_state(agent, required_input)
+        except Exception as e:
+            # Without a snapshot the resume falls back to re-running the task
+            logger.warning(f"Failed to snapshot browser state for task {task_id}: {e}")
+            browser_state = None
+
+        raise LoginRequiredError(
+            input_type=input_type,
+            field_name=field_name,
+            hint=hint,
+            browser_state=browser_state,
+            screenshot=required_input.get("screenshot"),
+        )
+
+    async def _sign_in_from_vault(self, agent: Agent, requirement: tuple) -> bool:
+        """
+        Answer a login form with the user's saved credentials for the site.
+
+        Returns:
+            True if the agent was told to sign in, False to ask the user
+        """
+        if self.credential_vault is None or not self._user_id or not needs_credentials(requirement):
+            return False
+
+        try:
+            url = await self.browser.get_current_page_url()
+        except Exception:
+            return False
+        credential = await self.credential_vault.lookup(self._user_id, url)
+        if credential is None or credential.host in self._vault_hosts:
+            return False
+
+        input_type, field_name, _ = requirement
+        if input_type == "credentials" and not (credential.username and credential.password):
+            return False
+        if input_type == "password" and not credential.password:
+            return False
+        if field_name == "Username/Email" and not credential.username:
+            return False
+
+        # Scoped to the entry's site, so the values are only typed into its pages
+        secrets = {}
+        if credential.username:
+            secrets[VAULT_USERNAME_SECRET] = credential.username
+        if credential.password:
+            secrets[VAULT_PASSWORD_SECRET] = credential.password
+        agent.sensitive_data = {**(agent.sensitive_data or {}), f"https://*.{credential.host}": secrets}
+
+        placeholders = " and ".join(f"<secret>{name}</secret>" for name in secrets)
+        agent.add_new_task(
+            f"{self._prompt}\n\nThe page asks you to sign in to {credential.host}. "
+            f"Sign in with the saved {field_name.lower()}: enter {placeholders}, then continue with the task."
+        )
+
+        self._vault_hosts.add(credential.host)
+        self._answered_url = url
+        self.credential_vault.touch(credential.id)
+        metrics.VAULT_SIGN_INS.inc()
+        await self._log(self.current_task_id, f"Signing in to {credential.host} with saved credentials ({credential.name})", "info")
+        return True
+
+    async def _detect_required_input(self) -> Optional[tuple]:
+        """
+        Return (input_type, field_name, hint) if the current page needs user input.
+
+        The same page probe records the load time of each newly loaded page.
+        """
+        try:
+            url = await self.browser.get_current_page_url()
+            page = await self.browser.get_current_page()
+            if page is None:
+                return None
+            found = json.loads(await page.evaluate(PAGE_PROBE_JS))
+        except Exception as e:
+            logger.debug(f"Input detection skipped: {e}")
+            return None
+
+        if found.get("load") is not None and found.get("origin") != self._loaded_origin:
+            self._loaded_origin = found.get("origin")
+            self.task_metrics.record_page_load(found["load"])
+
+        if url == self._answered_url:
+            return None
+        self._answered_url = None
+
+        # Only pages with a visible password/code field can need input
+        if not found.get("fields"):
+            return None
+        return detect_input_requirement(found.get("text", ""), url)
 
     async def _log(self, task_id: str, message: str, log_type: str = "info"):
         """Log a message to both local logger and Supabase."""
+        if self.subtask is not None:
+            message = f"[subtask {self.subtask}] {message}"
         logger.info(f"[{task_id}] {message}")
+        if self.log_sink is not None:
+            await self.log_sink.write(task_id, message, log_type)
+            return
+
         try:
-            self.supabase.rpc(
+            await self.supabase.rpc(
                 "append_task_log",
                 {"task_id": task_id, "log_message": message, "log_type": log_type}
             ).execute()
@@ -207,9 +980,13 @@ class LoginRequiredError(Exception):
         message: str = "Login or verification required",
         input_type: str = "password",
         field_name: str = "Password",
-        hint: str = "Please provide credentials"
+        hint: str = "Please provide credentials",
+        browser_state: Optional[dict] = None,
+        screenshot: Optional[str] = None,
     ):
         super().__init__(message)
         self.input_type = input_type
         self.field_name = field_name
         self.hint = hint
+        self.browser_state = browser_state
+        self.screenshot = screenshot
@@ -0,0 +1,354 @@
+"""
+Artifact Store - Content-addressed, deduplicated task screenshots
+
+browser-use writes a full-size PNG of the page on every step of every task.
+The artifact store keeps what is worth keeping, once:
+1. A frame that looks nearly identical to the task's previous kept frame
+   (difference hash within ARTIFACT_NEAR_DUPLICATE_DISTANCE bits) is skipped
+2. Kept frames are downscaled to ARTIFACT_MAX_WIDTH and re-encoded as WebP
+3. Each artifact is named by the SHA-256 of its bytes, so the same image is
+   stored and uploaded once, whichever task produced it
+4. Uploads to the ARTIFACT_BUCKET storage bucket run in the background,
+   ARTIFACT_UPLOAD_CONCURRENCY at a time
+5. Local copies live in a cache capped at ARTIFACT_CACHE_MB, evicting the
+   least recently used artifact that has already been uploaded. An artifact
+   is only ever evicted once uploaded: failed uploads are retried with
+   backoff, and artifacts a previous run left un-uploaded (marked by a
+   .pending file next to them) are queued again at start
+
+Task results reference artifacts by hash; the object path in the bucket is
+derived from it (see object_path()).
+"""
+
+import io
+import os
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+from supabase import AsyncClient
+
+import metrics
+
+logger = logging.getLogger("autoagent.artifact_store")
+
+# Artifact store configuration
+ARTIFACT_STORE_ENABLED = os.getenv("ARTIFACT_STORE_ENABLED", "true").lower() == "true"
+ARTIFACT_BUCKET = os.getenv("ARTIFACT_BUCKET", "task-artifacts")
+ARTIFACT_CACHE_DIR = os.getenv("ARTIFACT_CACHE_DIR", "/tmp/autoagent-artifacts")
+ARTIFACT_CACHE_MB = float(os.getenv("ARTIFACT_CACHE_MB", "512"))
+ARTIFACT_MAX_WIDTH = int(os.getenv("ARTIFACT_MAX_WIDTH", "1024"))
+ARTIFACT_QUALITY = int(os.getenv("ARTIFACT_QUALITY", "70"))
+ARTIFACT_NEAR_DUPLICATE_DISTANCE = int(os.getenv("ARTIFACT_NEAR_DUPLICATE_DISTANCE", "3"))
+ARTIFACT_UPLOAD_CONCURRENCY = max(1, int(os.getenv("ARTIFACT_UPLOAD_CONCURRENCY", "4")))
+
+# Under the supervisor (see supervisor.py) the worker processes of a host
+# split the cache: each gets its own directory and an equal share of the cap
+WORKER_SLOT = os.getenv("WORKER_SLOT")
+if WORKER_SLOT is not None:
+    ARTIFACT_CACHE_DIR = os.path.join(ARTIFACT_CACHE_DIR, f"worker-{WORKER_SLOT}")
+    ARTIFACT_CACHE_MB /= max(1, int(os.getenv("WORKER_PROCESSES", "1")))
+
+# Delay before retrying a failed upload, doubling per failure (seconds)
+UPLOAD_RETRY_MIN = 5.0
+UPLOAD_RETRY_MAX = 300.0
+
+# How long close() waits for queued uploads (seconds)
+ARTIFACT_DRAIN_TIMEOUT = 30.0
+
+ARTIFACT_EXTENSION = "webp"
+ARTIFACT_CONTENT_TYPE = "image/webp"
+# Next to an artifact that has not been uploaded yet
+PENDING_SUFFIX = ".pending"
+
+
+def object_path(sha256: str) -> str:
+    """Path of an artifact in the bucket (and, under the cache dir, on disk)."""
+    return f"{sha256[:2]}/{sha256}.{ARTIFACT_EXTENSION}"
+
+
+def _difference_hash(image) -> int:
+    """64-bit difference hash: which neighbouring pixels of a 9x8 thumbnail get brighter."""
+    from PIL import Image
+
+    pixels = image.convert("L").resize((9, 8), Image.Resampling.BILINEAR).tobytes()
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] < pixels[row * 9 + col + 1])
+    return bits
+
+
+def _encode(data: bytes, max_width: int, quality: int) -> Tuple[int, bytes]:
+    """Difference hash of a screenshot, and the screenshot downscaled and re-encoded."""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert("RGB")
+        fingerprint = _difference_hash(image)
+        if image.width > max_width:
+            image = image.resize(
+                (max_width, max(1, round(image.height * max_width / image.width))),
+                Image.Resampling.LANCZOS,
+            )
+        out = io.BytesIO()
+        image.save(out, format="WEBP", quality=quality, method=4)
+    return fingerprint, out.getvalue()
+
+
+class ArtifactStore:
+    """
+    Deduplicates, compresses, caches and uploads task screenshots.
+
+    Usage:
+        store = ArtifactStore(supabase)
+        store.start()
+        sha = await store.put_screenshot(task_id, path)  # None if a near-duplicate
+        store.release(task_id)                          # when the run ends
+        await store.close()                             # drains uploads
+    """
+
+    def __init__(
+        self,
+        supabase: AsyncClient,
+        enabled: bool = ARTIFACT_STORE_ENABLED,
+        bucket: str = ARTIFACT_BUCKET,
+        cache_dir: str = ARTIFACT_CACHE_DIR,
+        cache_mb: float = ARTIFACT_CACHE_MB,
+        max_width: int = ARTIFACT_MAX_WIDTH,
+        quality: int = ARTIFACT_QUALITY,
+        near_duplicate_distance: int = ARTIFACT_NEAR_DUPLICATE_DISTANCE,
+        upload_concurrency: int = ARTIFACT_UPLOAD_CONCURRENCY,
+    ):
+        self.supabase = supabase
+        self.enabled = enabled
+        self.bucket = bucket
+        self.cache_dir = cache_dir
+        self.cache_bytes = int(cache_mb * 1024 * 1024)
+        self.max_width = max_width
+        self.quality = quality
+        self.near_duplicate_distance = near_duplicate_distance
+        self.upload_concurrency = upload_concurrency
+
+        # sha256 -> size on disk, least recently used first
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self._cached_bytes = 0
+        # Only uploaded artifacts are evictable; pending ones (queued, being
+        # uploaded or waiting to be retried) are pinned
+        self._uploaded: Set[str] = set()
+        self._pending: Set[str] = set()
+        # sha256 -> failed upload attempts
+        self._failures: Dict[str, int] = {}
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._uploaders: List[asyncio.Task] = []
+        # task_id -> difference hash of its last kept frame
+        self._last_frames: Dict[str, int] = {}
+        self.stats_counts: Dict[str, int] = {"stored": 0, "duplicate": 0, "near_duplicate": 0, "evicted": 0}
+
+    def start(self):
+        """Index the local cache and start the uploaders."""
+        if not self.enabled:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._index_cache()
+        self._uploaders = [asyncio.create_task(self._upload_forever()) for _ in range(self.upload_concurrency)]
+
+    async def close(self):
+        """Finish queued uploads (up to ARTIFACT_DRAIN_TIMEOUT), then stop the uploaders."""
+        if self._uploaders:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=ARTIFACT_DRAIN_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning(f"Shutting down with {self._queue.qsize()} artifact uploads still queued")
+        for uploader in self._uploaders:
+            uploader.cancel()
+        await asyncio.gather(*self._uploaders, return_exceptions=True)
+        self._uploaders = []
+
+    async def put_screenshot(self, task_id: str, path: str) -> Optional[str]:
+        """
+        Store a step's screenshot unless it repeats the task's previous frame.
+
+        Args:
+            task_id: The task the screenshot belongs to
+            path: The screenshot file browser-use wrote
+
+        Returns:
+            The artifact's SHA-256, or None if the frame was skipped (or unreadable)
+        """
+        if not self.enabled:
+            return None
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # Decoding and re-encoding a full-page screenshot is CPU work
+            fingerprint, encoded = await asyncio.to_thread(_encode, data, self.max_width, self.quality)
+        except Exception as e:
+            logger.debug(f"Screenshot {path} not stored: {e}")
+            return None
+
+        previous = self._last_frames.get(task_id)
+        if previous is not None and bin(previous ^ fingerprint).count("1") <= self.near_duplicate_distance:
+            self._count("near_duplicate")
+            return None
+        self._last_frames[task_id] = fingerprint
+
+        sha = hashlib.sha256(encoded).hexdigest()
+        metrics.ARTIFACT_BYTES.labels(stage="raw").inc(len(data))
+        if sha in self._cache:
+            self._cache.move_to_end(sha)
+            self._count("duplicate")
+        else:
+            try:
+                await asyncio.to_thread(self._write, sha, encoded)
+            except OSError as e:
+                logger.warning(f"Failed to cache artifact {sha}: {e}")
+                return None
+            self._add(sha, len(encoded))
+            metrics.ARTIFACT_BYTES.labels(stage="stored").inc(len(encoded))
+            self._count("stored")
+
+        if sha not in self._uploaded and sha not in self._pending:
+            self._enqueue(sha)
+        return sha
+
+    def release(self, task_id: str):
+        """Forget a finished run's last frame."""
+        self._last_frames.pop(task_id, None)
+
+    def local_path(self, sha256: str) -> Optional[str]:
+        """The cached copy of an artifact, if it is still in the cache."""
+        if sha256 not in self._cache:
+            return None
+        self._cache.move_to_end(sha256)
+        return os.path.join(self.cache_dir, object_path(sha256))
+
+    def stats(self) -> dict:
+        return {
+            **self.stats_counts,
+            "cached_mb": round(self._cached_bytes / (1024 * 1024), 1),
+            "uploads_queued": self._queue.qsize(),
+            "uploads_pending": len(self._pending),
+        }
+
+    def _count(self, outcome: str):
+        self.stats_counts[outcome] += 1
+        metrics.ARTIFACTS.labels(outcome=outcome).inc()
+
+    def _enqueue(self, sha: str):
+        self._pending.add(sha)
+        self._queue.put_nowait(sha)
+
+    def _write(self, sha: str, data: bytes):
+        path = os.path.join(self.cache_dir, object_path(sha))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Marked before it exists, so a crash cannot leave it unmarked
+        open(f"{path}{PENDING_SUFFIX}", "w").close()
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _add(self, sha: str, size: int):
+        self._cache[sha] = size
+        self._cached_bytes += size
+        self._evict()
+
+    def _evict(self):
+        """
+        Drop least recently used, already uploaded artifacts until the cache fits.
+
+        Artifacts that are not uploaded yet are never dropped, even if that
+        keeps the cache over its cap while uploads fail.
+        """
+        for sha in list(self._cache):
+            if self._cached_bytes <= self.cache_bytes:
+                break
+            if sha not in self._uploaded:
+                continue
+            self._cached_bytes -= self._cache.pop(sha)
+            self._uploaded.discard(sha)
+            try:
+                os.remove(os.path.join(self.cache_dir, object_path(sha)))
+            except OSError:
+                pass
+            self.stats_counts["evicted"] += 1
+
+    def _index_cache(self):
+        """Pick up artifacts cached by a previous run, oldest first, and queue those not uploaded yet."""
+        found = []
+        for root, _, files in os.walk(self.cache_dir):
+            names = set(files)
+            for name in files:
+                sha, ext = os.path.splitext(name)
+                path = os.path.join(root, name)
+                if ext == PENDING_SUFFIX and sha not in names:
+                    # Crashed before the artifact was written
+                    os.remove(path)
+                if ext != f".{ARTIFACT_EXTENSION}":
+                    continue
+                stat = os.stat(path)
+                found.append((stat.st_mtime, sha, stat.st_size, f"{name}{PENDING_SUFFIX}" in names))
+        for _, sha, size, pending in sorted(found):
+            self._cache[sha] = size
+            self._cached_bytes += size
+            if pending:
+                self._enqueue(sha)
+            else:
+                self._uploaded.add(sha)
+        self._evict()
+        if found:
+            logger.info(
+                f"Artifact cache holds {len(self._cache)} artifacts ({self._cached_bytes / (1024 * 1024):.0f} MB), "
+                f"{len(self._pending)} still to upload"
+            )
+
+    async def _upload(self, sha: str):
+        path = os.path.join(self.cache_dir, object_path(sha))
+        with open(path, "rb") as f:
+            data = f.read()
+        # Same name, same bytes: overwriting an existing object is harmless
+        await self.supabase.storage.from_(self.bucket).upload(
+            path=object_path(sha),
+            file=data,
+            file_options={"content-type": ARTIFACT_CONTENT_TYPE, "upsert": "true"},
+        )
+
+    def _uploaded_ok(self, sha: str):
+        self._pending.discard(sha)
+        self._failures.pop(sha, None)
+        self._uploaded.add(sha)
+        try:
+            os.remove(os.path.join(self.cache_dir, object_path(sha)) + PENDING_SUFFIX)
+        except OSError:
+            pass
+
+    def _retry_later(self, sha: str) -> float:
+        """Queue a failed upload again after a backoff; it stays pinned until then."""
+        failures = self._failures.get(sha, 0) + 1
+        self._failures[sha] = failures
+        delay = min(UPLOAD_RETRY_MAX, UPLOAD_RETRY_MIN * 2 ** (failures - 1))
+        asyncio.get_running_loop().call_later(delay, self._queue.put_nowait, sha)
+        return delay
+
+    async def _upload_forever(self):
+        while True:
+            sha = await self._queue.get()
+            try:
+                await self._upload(sha)
+                self._uploaded_ok(sha)
+                metrics.ARTIFACT_UPLOADS.labels(outcome="uploaded").inc()
+            except FileNotFoundError:
+                # Removed from the cache dir behind our back; nothing to upload
+                self._pending.discard(sha)
+                self._failures.pop(sha, None)
+                self._cached_bytes -= self._cache.pop(sha, 0)
+            except Exception as e:
+                delay = self._retry_later(sha)
+                logger.warning(f"Failed to upload artifact {sha}, retrying in {delay:.0f}s: {e}")
+                metrics.ARTIFACT_UPLOADS.labels(outcome="failed").inc()
+            finally:
+                self._queue.task_done()
+                self._evict()
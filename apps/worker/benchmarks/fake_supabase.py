@@ -0,0 +1,189 @@
+"""
+Fake Supabase - In-memory task queue behind a fake PostgREST
+
+Keeps just enough of the tasks table and the worker RPCs (claim_tasks,
+renew_task_leases, reap_expired_tasks, insert_task_logs, status updates) for
+a real TaskWorker to claim, run and finish tasks against it, and for tests of
+the lease flow. Every task's insert, claim and finish times are recorded on
+the benchmark's clock, so pickup latency and throughput can be read off
+afterwards.
+"""
+
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from fake_postgrest import FakePostgREST
+
+TERMINAL_STATUSES = {"completed", "failed", "waiting_for_secret"}
+
+
+@dataclass
+class TaskTiming:
+    """When a task was inserted, claimed and finished (time.perf_counter)."""
+
+    created: float
+    claimed: Optional[float] = None
+    finished: Optional[float] = None
+
+
+class FakeSupabase(FakePostgREST):
+    """
+    Fake PostgREST that serves a task queue to the worker.
+
+    Usage:
+        with FakeSupabase(latency_ms=20) as server:
+            task = server.add_task("Find the price of item 3")
+            ...
+            server.timings[task["id"]].finished
+    """
+
+    def __init__(self, latency_ms: float = 20.0):
+        super().__init__(latency_ms=latency_ms)
+        self.reset()
+
+    def reset(self):
+        """Forget all tasks and counters."""
+        with self._lock:
+            self.tasks: Dict[str, dict] = {}
+            self.timings: Dict[str, TaskTiming] = {}
+            self.claim_calls = 0
+            self.log_rpcs = 0
+            self.log_entries = 0
+
+    def add_task(self, prompt: str, user_id: Optional[str] = None, **fields) -> dict:
+        """Insert a pending task, as the web app would (fields override columns)."""
+        task = {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id or str(uuid.uuid4()),
+            "prompt": prompt,
+            "status": "pending",
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "started_at": None,
+            "worker_id": None,
+            "lease_expires_at": None,
+            "attempts": 0,
+            "user_provided_input": None,
+            **fields,
+        }
+        with self._lock:
+            self.tasks[task["id"]] = task
+            self.timings[task["id"]] = TaskTiming(created=time.perf_counter())
+        return dict(task)
+
+    def finished(self) -> List[dict]:
+        with self._lock:
+            return [dict(t) for t in self.tasks.values() if t["status"] in TERMINAL_STATUSES]
+
+    def handle(self, method: str, path: str, headers: Dict[str, str], body: Any) -> Tuple[int, Any, Dict[str, str]]:
+        url = urlsplit(path)
+        filters = dict(parse_qsl(url.query))
+
+        if url.path.startswith("/rest/v1/rpc/"):
+            return 200, self._rpc(url.path.rsplit("/", 1)[-1], body or {}), {}
+
+        if url.path == "/rest/v1/tasks":
+            with self._lock:
+                rows = [t for t in self.tasks.values() if self._matches(t, filters)]
+                if method == "PATCH":
+                    for row in rows:
+                        row.update(body or {})
+                        if row.get("status") in TERMINAL_STATUSES:
+                            self.timings[row["id"]].finished = time.perf_counter()
+                if method == "HEAD":
+                    return 200, [], {"Content-Range": f"*/{len(rows)}"}
+                return 200, [dict(r) for r in rows], {}
+
+        return 200, [], {}
+
+    def _rpc(self, name: str, params: dict) -> Any:
+        with self._lock:
+            if name == "claim_tasks":
+                self.claim_calls += 1
+                pending = [t for t in self.tasks.values() if t["status"] == "pending"]
+                claimed = pending[:max(params.get("p_limit", 1), 0)]
+                now = time.perf_counter()
+                for task in claimed:
+                    task["status"] = "running"
+                    task["started_at"] = task.get("started_at") or _at_offset(0)
+                    task["worker_id"] = params.get("p_worker_id")
+                    task["lease_expires_at"] = _at_offset(params.get("p_lease_seconds", 1800))
+                    task["attempts"] = task.get("attempts", 0) + 1
+                    self.timings[task["id"]].claimed = now
+                return [dict(t) for t in claimed]
+
+            if name == "renew_task_leases":
+                return self._renew_task_leases(params)
+
+            if name == "reap_expired_tasks":
+                return self._reap_expired_tasks(params)
+
+            if name == "insert_task_logs":
+                self.log_rpcs += 1
+                self.log_entries += len(params.get("p_entries") or [])
+                return None
+
+            # claim_resumable_tasks, trace RPCs, ...: nothing to do
+            return []
+
+    def _renew_task_leases(self, params: dict) -> List[dict]:
+        rows = []
+        for task_id in params.get("p_task_ids") or []:
+            task = self.tasks.get(task_id)
+            if task is None:
+                continue
+            held = task.get("worker_id") == params["p_worker_id"]
+            if held and task["status"] == "running" and task.get("lease_expires_at") is not None:
+                task["lease_expires_at"] = _at_offset(params.get("p_lease_seconds", 120))
+            rows.append({"task_id": task_id, "held": held, "status": task["status"]})
+        return rows
+
+    def _reap_expired_tasks(self, params: dict) -> List[dict]:
+        max_attempts = params.get("p_max_attempts", 3)
+        dead_worker_id = params.get("p_dead_worker_id")
+        now = datetime.now(timezone.utc)
+        unleased_before = now - timedelta(seconds=params.get("p_unleased_seconds", 600))
+
+        def expired(task: dict) -> bool:
+            lease, started = _parse(task.get("lease_expires_at")), _parse(task.get("started_at"))
+            return (
+                (lease is not None and lease < now)
+                or (lease is None and started is not None and started < unleased_before)
+                or (dead_worker_id is not None and task.get("worker_id") == dead_worker_id)
+            )
+
+        rows = []
+        candidates = [
+            t for t in self.tasks.values()
+            if t["status"] == "running" and t.get("user_provided_input") is None and expired(t)
+        ]
+        for task in candidates[:max(params.get("p_limit", 100), 0)]:
+            if task.get("attempts", 0) >= max_attempts:
+                task["status"] = "failed"
+                task["error_message"] = f"Task abandoned by its worker {task['attempts']} times"
+            else:
+                task["status"] = "pending"
+            task["worker_id"] = None
+            task["lease_expires_at"] = None
+            rows.append({"task_id": task["id"], "status": task["status"], "attempts": task.get("attempts", 0)})
+        return rows
+
+    @staticmethod
+    def _matches(row: dict, filters: Dict[str, str]) -> bool:
+        # Only the eq. operator the worker uses; select/limit/order are ignored
+        for column, condition in filters.items():
+            if condition.startswith("eq.") and str(row.get(column)) != condition[3:]:
+                return False
+        return True
+
+
+def _at_offset(seconds: float) -> str:
+    """A timestamptz this many seconds from now, as PostgREST returns it."""
+    return (datetime.now(timezone.utc) + timedelta(seconds=seconds)).isoformat()
+
+
+def _parse(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
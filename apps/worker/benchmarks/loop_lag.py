@@ -0,0 +1,102 @@
+"""
+Event Loop Lag Benchmark
+
+Floods append_task_log through the synchronous Supabase client (the old
+worker code path) and through the async client (the current one) against a
+fake PostgREST server, while a ticker measures how late the event loop
+wakes up. Any lag here is time browser-use steps would have been stalled.
+
+Usage:
+    python benchmarks/loop_lag.py --writes 400 --writers 8 --latency-ms 40
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from supabase import create_client, acreate_client
+from fake_postgrest import FakePostgREST, FAKE_SERVICE_KEY
+
+TICK_SECONDS = 0.005
+
+
+async def _ticker(lags: List[float], stop: asyncio.Event):
+    """Record how late each scheduled wake-up of the loop happens."""
+    while not stop.is_set():
+        expected = time.perf_counter() + TICK_SECONDS
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+
+async def _run(write, writes: int, writers: int) -> dict:
+    lags: List[float] = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_ticker(lags, stop))
+
+    async def writer(count: int):
+        for i in range(count):
+            await write(f"Step {i}: clicked element")
+
+    started = time.perf_counter()
+    per_writer = writes // writers
+    await asyncio.gather(*(writer(per_writer) for _ in range(writers)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await ticker
+
+    lags_ms = sorted(lag * 1000 for lag in lags) or [0.0]
+    return {
+        "elapsed_s": elapsed,
+        "writes_per_s": per_writer * writers / elapsed,
+        "lag_p50_ms": statistics.median(lags_ms),
+        "lag_p99_ms": lags_ms[int(len(lags_ms) * 0.99) - 1] if len(lags_ms) > 1 else lags_ms[0],
+        "lag_max_ms": lags_ms[-1],
+    }
+
+
+async def benchmark(writes: int, writers: int, latency_ms: float) -> dict:
+    params = {"task_id": "00000000-0000-0000-0000-000000000000", "log_type": "info"}
+
+    with FakePostgREST(latency_ms=latency_ms) as server:
+        sync_client = create_client(server.url, FAKE_SERVICE_KEY)
+        async_client = await acreate_client(server.url, FAKE_SERVICE_KEY)
+
+        async def sync_write(message: str):
+            sync_client.rpc("append_task_log", {**params, "log_message": message}).execute()
+
+        async def async_write(message: str):
+            await async_client.rpc("append_task_log", {**params, "log_message": message}).execute()
+
+        return {
+            "sync client": await _run(sync_write, writes, writers),
+            "async client": await _run(async_write, writes, writers),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writes", type=int, default=400, help="Total log writes per run")
+    parser.add_argument("--writers", type=int, default=8, help="Concurrent writers (e.g. task slots)")
+    parser.add_argument("--latency-ms", type=float, default=40.0, help="Simulated DB round-trip latency")
+    args = parser.parse_args()
+
+    results = asyncio.run(benchmark(args.writes, args.writers, args.latency_ms))
+
+    print(f"{args.writes} writes, {args.writers} writers, {args.latency_ms:.0f}ms latency")
+    print(f"{'path':<14}{'elapsed s':>11}{'writes/s':>11}{'lag p50 ms':>12}{'lag p99 ms':>12}{'lag max ms':>12}")
+    for name, r in results.items():
+        print(
+            f"{name:<14}{r['elapsed_s']:>11.2f}{r['writes_per_s']:>11.1f}"
+            f"{r['lag_p50_ms']:>12.1f}{r['lag_p99_ms']:>12.1f}{r['lag_max_ms']:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
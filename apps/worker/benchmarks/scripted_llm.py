@@ -0,0 +1,99 @@
+"""
+Scripted LLM - browser-use chat model that plays back a fixed action script
+
+Stands in for ChatAnthropic in benchmarks: each agent step gets the next
+action of the script after a simulated thinking delay, so a task runs the
+real browser-use loop against real pages without an API key or token spend.
+Token usage is estimated from the message sizes so the worker's per-step
+metrics stay meaningful.
+"""
+
+import asyncio
+from typing import Any, List, Optional
+
+from browser_use.llm.views import ChatInvokeCompletion, ChatInvokeUsage
+
+# Rough characters-per-token ratio used to estimate prompt tokens
+CHARS_PER_TOKEN = 4
+COMPLETION_TOKENS = 120
+
+
+class ScriptedLLM:
+    """
+    Answers agent steps from a list of browser-use actions.
+
+    Usage:
+        llm = ScriptedLLM([
+            {"navigate": {"url": "http://127.0.0.1:8000/catalog.html"}},
+            {"scroll": {"down": True, "pages": 1}},
+        ], think_seconds=1.5)
+        agent = Agent(task=prompt, llm=llm, browser=browser)
+
+    A done action is appended when the script runs out.
+    """
+
+    _verified_api_keys = True
+
+    def __init__(self, script: List[dict], think_seconds: float = 1.0, result_text: str = "Done"):
+        self.script = list(script)
+        self.think_seconds = think_seconds
+        self.result_text = result_text
+        self.model = "scripted-llm"
+        self.calls = 0
+        self._step = 0
+
+    @property
+    def provider(self) -> str:
+        return "scripted"
+
+    @property
+    def name(self) -> str:
+        return self.model
+
+    @property
+    def model_name(self) -> str:
+        return self.model
+
+    async def ainvoke(self, messages: list, output_format: Optional[type] = None, **kwargs: Any) -> ChatInvokeCompletion:
+        self.calls += 1
+        await asyncio.sleep(self.think_seconds)
+
+        usage = ChatInvokeUsage(
+            prompt_tokens=sum(len(str(m)) for m in messages) // CHARS_PER_TOKEN,
+            prompt_cached_tokens=None,
+            prompt_cache_creation_tokens=None,
+            prompt_image_tokens=None,
+            completion_tokens=COMPLETION_TOKENS,
+            total_tokens=0,
+        )
+        usage.total_tokens = usage.prompt_tokens + usage.completion_tokens
+
+        if output_format is None:
+            return ChatInvokeCompletion(completion=self.result_text, usage=usage)
+        return ChatInvokeCompletion(completion=self._structured(output_format), usage=usage)
+
+    def _structured(self, output_format: type):
+        fields = output_format.model_fields
+
+        # The agent's next action
+        if "action" in fields:
+            if self._step < len(self.script):
+                action = self.script[self._step]
+            else:
+                action = {"done": {"text": self.result_text, "success": True}}
+            self._step += 1
+            return output_format.model_validate({
+                "evaluation_previous_goal": "Success",
+                "memory": f"Scripted step {self._step}",
+                "next_goal": "Continue the script",
+                "action": [action],
+            })
+
+        # The judge's verdict on the finished run
+        if "verdict" in fields:
+            return output_format.model_validate({"verdict": True, "reasoning": "Scripted run"})
+
+        try:
+            return output_format.model_validate({})
+        except Exception:
+            return output_format.model_construct()
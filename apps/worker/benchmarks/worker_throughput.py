@@ -0,0 +1,348 @@
+"""
+Worker Throughput Benchmark
+
+Runs the real TaskWorker (claim loop, browser pool, browser-use agent, log
+sink) end to end without a Supabase project or an Anthropic key:
+1. FakeSupabase serves the task queue and worker RPCs from memory
+2. ScriptedLLM plays back a fixed browser-use action script per task
+3. A local static site provides the pages the agent browses
+
+For each concurrency level it measures throughput (tasks/min) on a burst
+of tasks, pickup latency (insert to claim) on an idle worker, log-write
+overhead and the peak RSS of the worker and its browsers. Each run is
+appended to a JSON Lines file and compared with the previous run.
+
+Needs the worker's requirements and a Chromium installed by Playwright.
+
+Usage:
+    python benchmarks/worker_throughput.py --concurrency 1 2 4 --tasks 12
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+import subprocess
+import threading
+import tempfile
+from datetime import datetime, timezone
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import psutil
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+from fake_postgrest import FAKE_SERVICE_KEY
+from fake_supabase import FakeSupabase
+from scripted_llm import ScriptedLLM
+
+RESULTS_PATH = os.path.join(BENCHMARKS_DIR, "results", "worker_throughput.jsonl")
+
+PROMPT = "Open the catalog and find the price of product 3"
+PRODUCTS = 60
+
+
+class StaticSite:
+    """
+    Serves generated catalog and product pages from a temporary directory.
+
+    Usage:
+        with StaticSite() as site:
+            site.url + "/catalog.html"
+    """
+
+    def __init__(self):
+        self._dir = tempfile.TemporaryDirectory(prefix="autoagent-site-")
+        self._write_pages(self._dir.name)
+
+        class QuietHandler(SimpleHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+        handler = partial(QuietHandler, directory=self._dir.name)
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "StaticSite":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+        self._dir.cleanup()
+
+    @staticmethod
+    def _write_pages(root: str):
+        def page(title: str, body: str) -> str:
+            return (
+                f"<!doctype html><html><head><title>{title}</title></head>"
+                f"<body><nav><a href='/catalog.html'>Catalog</a> <a href='#'>Cart</a> "
+                f"<input placeholder='Search products'></nav><h1>{title}</h1>{body}</body></html>"
+            )
+
+        cards = "".join(
+            f"<div class='card'><h2>Product {i}</h2><p>Sturdy, well reviewed and ships in two days.</p>"
+            f"<a href='/item-{i}.html'>View product {i}</a> <button>Add to cart</button></div>"
+            for i in range(1, PRODUCTS + 1)
+        )
+        with open(os.path.join(root, "catalog.html"), "w") as f:
+            f.write(page("Catalog", cards))
+
+        for i in range(1, PRODUCTS + 1):
+            details = (
+                f"<p class='price'>Price: ${10 + i}.00</p><select><option>1</option><option>2</option></select>"
+                f"<button>Add to cart</button><h3>Reviews</h3>"
+                + "".join(f"<p>Review {r}: does what it says.</p>" for r in range(20))
+            )
+            with open(os.path.join(root, f"item-{i}.html"), "w") as f:
+                f.write(page(f"Product {i}", details))
+
+
+class PeakMemory:
+    """Samples the RSS of this process and its children (the browsers)."""
+
+    def __init__(self, interval: float = 0.25):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self) -> "PeakMemory":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        root = psutil.Process()
+        while not self._stop.is_set():
+            total = 0
+            for proc in [root] + root.children(recursive=True):
+                try:
+                    total += proc.memory_info().rss
+                except psutil.Error:
+                    continue
+            self.peak_mb = max(self.peak_mb, total / (1024 * 1024))
+            self._stop.wait(self.interval)
+
+
+def configure_worker_env(server: FakeSupabase, args):
+    """Point the worker at the stand-ins; must run before main is imported."""
+    os.environ.update({
+        "SUPABASE_URL": server.url,
+        "SUPABASE_SERVICE_KEY": FAKE_SERVICE_KEY,
+        "WORKER_ID": "benchmark-worker",
+        "LOG_LEVEL": os.getenv("LOG_LEVEL", "WARNING"),
+        "BROWSER_HEADLESS": "false" if args.headed else "true",
+        "POLL_INTERVAL": str(args.poll_interval),
+        "REALTIME_ENABLED": "false",
+        "METRICS_PORT": "0",
+        "TRACE_CACHE_ENABLED": "false",
+        "HOT_RESUME_MAX_SESSIONS": "0",
+    })
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def log_write_totals() -> tuple:
+    """Seconds and count of insert_task_logs writes observed so far."""
+    from prometheus_client import REGISTRY
+
+    labels = {"operation": "insert_task_logs"}
+    seconds = REGISTRY.get_sample_value("autoagent_db_write_seconds_sum", labels) or 0.0
+    count = REGISTRY.get_sample_value("autoagent_db_write_seconds_count", labels) or 0.0
+    return seconds, count
+
+
+async def wait_until(predicate, timeout: float, what: str):
+    deadline = time.perf_counter() + timeout
+    while not predicate():
+        if time.perf_counter() > deadline:
+            raise TimeoutError(f"Timed out after {timeout:.0f}s waiting for {what}")
+        await asyncio.sleep(0.02)
+
+
+async def run_level(server: FakeSupabase, site: StaticSite, concurrency: int, args) -> dict:
+    import main as worker_main
+
+    server.reset()
+    script = [
+        {"navigate": {"url": f"{site.url}/catalog.html"}},
+        {"scroll": {"down": True, "pages": 2}},
+        {"navigate": {"url": f"{site.url}/item-3.html"}},
+    ]
+    worker = worker_main.TaskWorker(
+        max_concurrent_tasks=concurrency,
+        llm_factory=lambda: ScriptedLLM(script, args.think_seconds, "Product 3 costs $13.00"),
+    )
+
+    def enqueue() -> str:
+        task = server.add_task(PROMPT)
+        if not args.poll_only:
+            # Stand-in for the Realtime INSERT event
+            worker.notifier.notify()
+        return task["id"]
+
+    def done(task_ids) -> bool:
+        return all(server.timings[tid].finished is not None for tid in task_ids)
+
+    with PeakMemory() as memory:
+        started = time.perf_counter()
+        runner = asyncio.create_task(worker.start())
+        # The first (empty) claim means pool warm-up is done and the loop is live
+        await wait_until(lambda: server.claim_calls > 0 or runner.done(), args.timeout, "worker start")
+        if runner.done():
+            runner.result()
+        startup_seconds = time.perf_counter() - started
+
+        try:
+            # Throughput: a burst of tasks, more than there are slots
+            log_seconds_before, log_writes_before = log_write_totals()
+            burst_started = time.perf_counter()
+            burst = [enqueue() for _ in range(args.tasks)]
+            await wait_until(lambda: done(burst), args.timeout, "the task burst")
+            burst_seconds = time.perf_counter() - burst_started
+            log_seconds_after, log_writes_after = log_write_totals()
+
+            # Pickup latency: one task at a time on an idle worker
+            probes = []
+            for _ in range(args.pickup_probes):
+                await asyncio.sleep(args.idle_seconds)
+                task_id = enqueue()
+                await wait_until(lambda: done([task_id]), args.timeout, "a pickup probe")
+                probes.append(task_id)
+        finally:
+            await worker.stop()
+            await asyncio.wait_for(runner, timeout=30)
+
+    timings = server.timings
+    statuses = {t["id"]: t["status"] for t in server.finished()}
+    run_seconds = [timings[t].finished - timings[t].claimed for t in burst]
+    queue_wait = [timings[t].claimed - timings[t].created for t in burst]
+    pickup = [timings[t].claimed - timings[t].created for t in probes]
+    log_seconds = log_seconds_after - log_seconds_before
+
+    return {
+        "concurrency": concurrency,
+        "tasks": args.tasks,
+        "completed": sum(1 for t in burst if statuses.get(t) == "completed"),
+        "startup_seconds": round(startup_seconds, 2),
+        "tasks_per_minute": round(args.tasks / burst_seconds * 60, 2),
+        "task_seconds_p50": round(statistics.median(run_seconds), 2),
+        "queue_wait_seconds_p50": round(statistics.median(queue_wait), 2),
+        "pickup_ms_p50": round(percentile(pickup, 50) * 1000, 1) if pickup else None,
+        "pickup_ms_p95": round(percentile(pickup, 95) * 1000, 1) if pickup else None,
+        "log_rpcs_per_task": round(server.log_rpcs / (args.tasks + len(probes)), 2),
+        "log_writes": int(log_writes_after - log_writes_before),
+        "log_write_ms_per_task": round(log_seconds / args.tasks * 1000, 1),
+        "log_write_share": round(log_seconds / sum(run_seconds), 4) if run_seconds else None,
+        "peak_rss_mb": round(memory.peak_mb, 1),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARKS_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_previous(path: str) -> Optional[dict]:
+    try:
+        with open(path) as f:
+            lines = [line for line in f if line.strip()]
+    except FileNotFoundError:
+        return None
+    return json.loads(lines[-1]) if lines else None
+
+
+def print_results(levels: List[dict], previous: Optional[dict]):
+    before: Dict[int, dict] = {}
+    if previous:
+        before = {level["concurrency"]: level for level in previous.get("levels", [])}
+
+    print(
+        f"{'slots':>5} {'done':>6} {'tasks/min':>10} {'vs prev':>8} {'task s':>7} {'queue s':>8} "
+        f"{'pickup p50':>11} {'p95 ms':>7} {'log ms/task':>12} {'log %':>6} {'peak MB':>8}"
+    )
+    for r in levels:
+        prev = before.get(r["concurrency"])
+        delta = f"{(r['tasks_per_minute'] / prev['tasks_per_minute'] - 1) * 100:+.0f}%" if prev else "-"
+        pickup_p50 = f"{r['pickup_ms_p50']:.0f}" if r["pickup_ms_p50"] is not None else "-"
+        pickup_p95 = f"{r['pickup_ms_p95']:.0f}" if r["pickup_ms_p95"] is not None else "-"
+        print(
+            f"{r['concurrency']:>5} {r['completed']:>3}/{r['tasks']:<2} {r['tasks_per_minute']:>10.1f} {delta:>8} "
+            f"{r['task_seconds_p50']:>7.1f} {r['queue_wait_seconds_p50']:>8.1f} {pickup_p50:>11} {pickup_p95:>7} "
+            f"{r['log_write_ms_per_task']:>12.1f} {(r['log_write_share'] or 0) * 100:>5.1f}% {r['peak_rss_mb']:>8.0f}"
+        )
+    if previous:
+        print(f"(vs prev: run of {previous['timestamp']} at {previous.get('commit') or 'unknown commit'})")
+
+
+async def benchmark(args) -> List[dict]:
+    with FakeSupabase(latency_ms=args.latency_ms) as server, StaticSite() as site:
+        configure_worker_env(server, args)
+        levels = []
+        for concurrency in args.concurrency:
+            levels.append(await run_level(server, site, concurrency, args))
+        return levels
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4], help="MAX_CONCURRENT_TASKS levels to run")
+    parser.add_argument("--tasks", type=int, default=12, help="Tasks in the throughput burst per level")
+    parser.add_argument("--pickup-probes", type=int, default=5, help="Single tasks sent to an idle worker per level")
+    parser.add_argument("--idle-seconds", type=float, default=1.0, help="Idle time before each pickup probe")
+    parser.add_argument("--think-seconds", type=float, default=1.0, help="Simulated LLM latency per call")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Simulated DB round-trip latency")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="Worker POLL_INTERVAL")
+    parser.add_argument("--poll-only", action="store_true", help="Do not simulate Realtime wake-ups")
+    parser.add_argument("--headed", action="store_true", help="Show the browsers")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Seconds to wait for each phase")
+    parser.add_argument("--output", default=RESULTS_PATH, help="JSON Lines file the run is appended to")
+    args = parser.parse_args()
+
+    levels = asyncio.run(benchmark(args))
+
+    previous = load_previous(args.output)
+    print_results(levels, previous)
+
+    record = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "args": {k: v for k, v in vars(args).items() if k != "output"},
+        "levels": levels,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "a") as f:
+        f.write(json.dumps(record) + "\n")
+    print(f"Results appended to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
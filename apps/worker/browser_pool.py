@@ -0,0 +1,427 @@
+"""
+Browser Pool - Warm Chromium processes shared across tasks
+
+Launching Chromium is a large share of the latency of a short task, so the
+worker keeps a small pool of pre-launched browser processes and hands each
+task a fresh, isolated browser context on one of them.
+
+Each pooled browser:
+1. Is a Chromium process exposing the DevTools protocol (CDP) on localhost
+2. Gets a new browser context per lease, disposed on release
+3. Has cookies, cache and storage wiped between leases
+4. Is recycled after N tasks or once its RSS passes a threshold
+5. Is recycled after a lease that loaded any site in its default context
+
+browser-use 0.11 opens new tabs with Target.createTarget and no
+browserContextId, so they land in the browser's shared default context, not
+in the leased one. Storage written there (localStorage, IndexedDB, ...)
+cannot be wiped reliably origin by origin, so such a browser is not reused.
+"""
+
+import os
+import time
+import shutil
+import socket
+import asyncio
+import logging
+import tempfile
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, asdict
+from urllib.parse import urlsplit
+from typing import Optional, List, Set, Tuple, AsyncIterator
+
+import psutil
+from playwright.async_api import async_playwright, Playwright, Browser as PlaywrightBrowser, BrowserContext, Page
+
+logger = logging.getLogger("autoagent.browser_pool")
+
+# Pool configuration
+BROWSER_HEADLESS = os.getenv("BROWSER_HEADLESS", "true").lower() == "true"
+BROWSER_MAX_TASKS = int(os.getenv("BROWSER_MAX_TASKS", "20"))
+BROWSER_MAX_RSS_MB = int(os.getenv("BROWSER_MAX_RSS_MB", "700"))
+BROWSER_LAUNCH_TIMEOUT = float(os.getenv("BROWSER_LAUNCH_TIMEOUT", "30"))
+
+
+@dataclass
+class PoolStats:
+    """Counters describing how well the pool is absorbing browser cold starts."""
+
+    hits: int = 0            # Leases served by an already-running browser
+    launches: int = 0        # Chromium processes started
+    recycles: int = 0        # Browsers retired for task count, RSS or crash
+    wait_seconds: float = 0.0  # Total time callers spent waiting for a browser
+
+    def to_dict(self) -> dict:
+        """Convert to dictionary for JSON serialization."""
+        return asdict(self)
+
+
+class PooledBrowser:
+    """A Chromium process launched with remote debugging enabled."""
+
+    def __init__(self, process: asyncio.subprocess.Process, cdp_url: str, user_data_dir: str):
+        self.process = process
+        self.cdp_url = cdp_url
+        self.user_data_dir = user_data_dir
+        self.connection: Optional[PlaywrightBrowser] = None
+        self.tasks_served = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None and self.connection is not None and self.connection.is_connected()
+
+    def rss_mb(self) -> float:
+        """Resident memory of the browser process tree, in MB."""
+        try:
+            root = psutil.Process(self.process.pid)
+            processes = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return 0.0
+
+        total = 0
+        for proc in processes:
+            try:
+                total += proc.memory_info().rss
+            except psutil.Error:
+                continue
+        return total / (1024 * 1024)
+
+
+class BrowserLease:
+    """A browser handed out to a single task."""
+
+    def __init__(self, browser: PooledBrowser, context: BrowserContext):
+        self.browser = browser
+        self.context = context
+        # Sites loaded in the browser's default context during the lease
+        self.shared_origins: Set[str] = set()
+
+    @property
+    def cdp_url(self) -> str:
+        return self.browser.cdp_url
+
+    @property
+    def default_context(self) -> BrowserContext:
+        return self.browser.connection.contexts[0]
+
+    def watch_default_context(self):
+        """Record the origin of every page and frame loaded in the default context."""
+        self.default_context.on("page", self._watch_page)
+
+    def unwatch_default_context(self):
+        """Stop watching, picking up whatever is still open in the default context."""
+        self.default_context.remove_listener("page", self._watch_page)
+        for page in self.default_context.pages:
+            for frame in page.frames:
+                self._note(frame.url)
+
+    def _watch_page(self, page: Page):
+        self._note(page.url)
+        page.on("framenavigated", lambda frame: self._note(frame.url))
+
+    def _note(self, url: str):
+        origin = _origin(url)
+        if origin is not None:
+            self.shared_origins.add(origin)
+
+
+class BrowserPool:
+    """
+    Pool of warm Chromium processes.
+
+    Usage:
+        pool = BrowserPool(size=2)
+        await pool.start()
+        async with pool.lease() as lease:
+            browser = Browser(cdp_url=lease.cdp_url, keep_alive=True)
+            ...
+        await pool.close()
+    """
+
+    def __init__(
+        self,
+        size: int,
+        headless: bool = BROWSER_HEADLESS,
+        max_tasks_per_browser: int = BROWSER_MAX_TASKS,
+        max_rss_mb: int = BROWSER_MAX_RSS_MB,
+    ):
+        self.size = max(1, size)
+        self.headless = headless
+        self.max_tasks_per_browser = max_tasks_per_browser
+        self.max_rss_mb = max_rss_mb
+        self.stats = PoolStats()
+
+        self._playwright: Optional[Playwright] = None
+        self._idle: List[PooledBrowser] = []
+        self._leased: List[PooledBrowser] = []
+        self._launching = 0
+        self._available = asyncio.Condition()
+        self._closed = False
+
+    async def start(self, warm: Optional[int] = None):
+        """Start Playwright and pre-launch `warm` browsers (defaults to the pool size)."""
+        self._playwright = await async_playwright().start()
+
+        count = self.size if warm is None else min(warm, self.size)
+        launched = await asyncio.gather(*(self._launch() for _ in range(count)), return_exceptions=True)
+
+        async with self._available:
+            for browser in launched:
+                if isinstance(browser, PooledBrowser):
+                    self._idle.append(browser)
+                else:
+                    logger.warning(f"Failed to pre-launch browser: {browser}")
+            self._available.notify_all()
+
+        logger.info(f"Browser pool ready with {len(self._idle)}/{self.size} warm browsers")
+
+    async def close(self):
+        """Shut down every browser in the pool."""
+        self._closed = True
+        async with self._available:
+            browsers = self._idle + self._leased
+            self._idle, self._leased = [], []
+            self._available.notify_all()
+
+        await asyncio.gather(*(self._terminate(b) for b in browsers), return_exceptions=True)
+
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def rss_mb(self) -> float:
+        """Resident memory of every pooled browser, in MB."""
+        return sum(browser.rss_mb() for browser in self._idle + self._leased)
+
+    def rss_by_state(self) -> Tuple[List[float], List[float]]:
+        """
+        Resident memory of each pooled browser, in MB.
+
+        Returns:
+            Tuple of (idle browsers' RSS, leased browsers' RSS)
+        """
+        return [b.rss_mb() for b in self._idle], [b.rss_mb() for b in self._leased]
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[BrowserLease]:
+        """Borrow a browser with a freshly created, isolated context."""
+        browser = await self._acquire()
+        context = None
+        try:
+            context = await browser.connection.new_context()
+            # Tasks drive the page in the new context; the default tab would
+            # otherwise share the default context's storage across tasks.
+            await context.new_page()
+            for page in browser.connection.contexts[0].pages:
+                await page.close()
+        except BaseException:
+            # Cancellation included. Shielded, so the browser is returned even
+            # if the caller is cancelled again while it is being released.
+            await asyncio.shield(self._release(browser, context=context, healthy=False))
+            raise
+
+        lease = BrowserLease(browser, context)
+        lease.watch_default_context()
+        try:
+            yield lease
+        finally:
+            healthy = True
+            try:
+                lease.unwatch_default_context()
+            except Exception as e:
+                # Unknown what the task left behind: do not reuse the browser
+                logger.warning(f"Failed to check the default context: {e}")
+                healthy = False
+            await asyncio.shield(
+                self._release(browser, context=context, healthy=healthy, shared_origins=lease.shared_origins)
+            )
+
+    async def _acquire(self) -> PooledBrowser:
+        started = time.monotonic()
+
+        async with self._available:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Browser pool is closed")
+
+                while self._idle:
+                    browser = self._idle.pop()
+                    if browser.alive:
+                        self._leased.append(browser)
+                        self.stats.hits += 1
+                        self.stats.wait_seconds += time.monotonic() - started
+                        return browser
+                    self.stats.recycles += 1
+                    asyncio.create_task(self._terminate(browser))
+
+                if len(self._leased) + self._launching < self.size:
+                    self._launching += 1
+                    break
+
+                await self._available.wait()
+
+        try:
+            browser = await self._launch()
+        except BaseException:
+            # Cancellation included: give the launch slot back to a waiter
+            self._launching -= 1
+            await asyncio.shield(self._notify_available())
+            raise
+
+        # No await between the launch and the hand-over, so a cancellation
+        # cannot leave the browser counted as launching or leased
+        self._launching -= 1
+        self._leased.append(browser)
+        self.stats.wait_seconds += time.monotonic() - started
+        return browser
+
+    async def _notify_available(self):
+        async with self._available:
+            self._available.notify()
+
+    async def _release(
+        self,
+        browser: PooledBrowser,
+        context: Optional[BrowserContext] = None,
+        healthy: bool = True,
+        shared_origins: Set[str] = frozenset(),
+    ):
+        browser.tasks_served += 1
+
+        if context is not None:
+            try:
+                await context.close()
+            except Exception as e:
+                logger.warning(f"Failed to close browser context: {e}")
+                healthy = False
+
+        if healthy and browser.alive and not shared_origins:
+            healthy = await self._wipe(browser)
+
+        recycle_reason = None
+        if not healthy or not browser.alive:
+            recycle_reason = "unhealthy"
+        elif shared_origins:
+            recycle_reason = f"{len(shared_origins)} sites loaded in the shared default context"
+        elif browser.tasks_served >= self.max_tasks_per_browser:
+            recycle_reason = f"served {browser.tasks_served} tasks"
+        else:
+            rss = browser.rss_mb()
+            if rss > self.max_rss_mb:
+                recycle_reason = f"RSS {rss:.0f}MB > {self.max_rss_mb}MB"
+
+        async with self._available:
+            if browser in self._leased:
+                self._leased.remove(browser)
+            if recycle_reason is None and not self._closed:
+                self._idle.append(browser)
+            self._available.notify()
+
+        if recycle_reason is not None:
+            self.stats.recycles += 1
+            logger.info(f"Recycling browser on {browser.cdp_url}: {recycle_reason}")
+            await self._terminate(browser)
+
+    async def _wipe(self, browser: PooledBrowser) -> bool:
+        """Clear cookies, cache and storage left in the default context."""
+        try:
+            default_context = browser.connection.contexts[0]
+            origins = {_origin(page.url) for page in default_context.pages} - {None}
+
+            session = await browser.connection.new_browser_cdp_session()
+            await session.send("Storage.clearCookies")
+            await session.send("Network.clearBrowserCache")
+            for origin in origins:
+                await session.send("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+            await session.detach()
+
+            await default_context.clear_cookies()
+            # Leave exactly one blank tab for the next lease to replace
+            pages = default_context.pages
+            if not pages:
+                await default_context.new_page()
+            for page in pages[1:]:
+                await page.close()
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to wipe browser state: {e}")
+            return False
+
+    async def _launch(self) -> PooledBrowser:
+        """Start a Chromium process and connect to it over CDP."""
+        if self._playwright is None:
+            raise RuntimeError("Browser pool has not been started")
+
+        port = _free_port()
+        user_data_dir = tempfile.mkdtemp(prefix="autoagent-chromium-")
+        args = [
+            self._playwright.chromium.executable_path,
+            f"--remote-debugging-port={port}",
+            f"--user-data-dir={user_data_dir}",
+            "--no-first-run",
+            "--no-default-browser-check",
+            "--disable-dev-shm-usage",
+        ]
+        if self.headless:
+            args.append("--headless=new")
+        if hasattr(os, "geteuid") and os.geteuid() == 0:
+            args.append("--no-sandbox")
+        args.append("about:blank")
+
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        browser = PooledBrowser(process, f"http://127.0.0.1:{port}", user_data_dir)
+        self.stats.launches += 1
+
+        deadline = time.monotonic() + BROWSER_LAUNCH_TIMEOUT
+        try:
+            while True:
+                try:
+                    browser.connection = await self._playwright.chromium.connect_over_cdp(browser.cdp_url)
+                    break
+                except Exception:
+                    if process.returncode is not None or time.monotonic() > deadline:
+                        raise RuntimeError(f"Chromium failed to start on port {port}")
+                    await asyncio.sleep(0.1)
+        except BaseException:
+            # Failed or cancelled: do not leave the process running
+            await asyncio.shield(self._terminate(browser))
+            raise
+
+        logger.info(f"Launched browser on {browser.cdp_url}")
+        return browser
+
+    async def _terminate(self, browser: PooledBrowser):
+        if browser.connection is not None:
+            try:
+                await browser.connection.close()
+            except Exception:
+                pass
+
+        if browser.process.returncode is None:
+            browser.process.terminate()
+            try:
+                await asyncio.wait_for(browser.process.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                browser.process.kill()
+                await browser.process.wait()
+
+        shutil.rmtree(browser.user_data_dir, ignore_errors=True)
+
+
+def _origin(url: str) -> Optional[str]:
+    """Return scheme://host[:port] for http(s) URLs, None otherwise."""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https"):
+        return None
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _free_port() -> int:
+    """Ask the OS for an unused localhost TCP port."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
@@ -0,0 +1,221 @@
+"""
+Credential Vault - Sign in with the user's saved credentials instead of pausing
+
+Users keep site logins in the secrets_vault table, each with a website_url.
+When a task starts, the worker loads the user's entries into an index keyed
+by host, cached for VAULT_CACHE_TTL seconds so back-to-back tasks share one
+query. When the agent reaches a login form on a site that has an entry, it
+signs in with those credentials and the task keeps going. Tasks only pause
+for input the vault cannot answer: 2FA codes, CAPTCHAs, and sites without an
+entry.
+
+The agent never sees the values themselves. They are handed to browser-use as
+domain-scoped sensitive data, so only placeholders reach the LLM and they can
+only be typed into pages of that site.
+
+Entries used are stamped with last_used_at in batches, one update per
+VAULT_TOUCH_INTERVAL seconds.
+
+The vault page saves website_url, encrypted_username and encrypted_password
+as the user typed them: despite their names, the encrypted_* columns hold
+plaintext at rest, protected by row level security only. Each value read
+goes through the vault's decrypt hook, which returns it unchanged by
+default; once the app encrypts values before saving them, pass the matching
+decrypt function to CredentialVault.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from supabase import AsyncClient
+
+import metrics
+
+logger = logging.getLogger("autoagent.credential_vault")
+
+# Vault configuration
+CREDENTIAL_VAULT_ENABLED = os.getenv("CREDENTIAL_VAULT_ENABLED", "true").lower() == "true"
+VAULT_CACHE_TTL = float(os.getenv("VAULT_CACHE_TTL", "60"))
+VAULT_TOUCH_INTERVAL = float(os.getenv("VAULT_TOUCH_INTERVAL", "30"))
+
+
+@dataclass
+class Credential:
+    """A vault entry usable on one site."""
+
+    id: str
+    name: str
+    host: str
+    username: Optional[str] = field(default=None, repr=False)
+    password: Optional[str] = field(default=None, repr=False)
+
+
+def site_host(url: str) -> Optional[str]:
+    """Lowercase host of a URL or bare domain, without a leading www."""
+    if not url:
+        return None
+    if "://" not in url:
+        url = f"https://{url}"
+    host = (urlsplit(url.strip()).hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return host or None
+
+
+class CredentialVault:
+    """
+    Per-user index of vault entries by host, with a short-TTL cache.
+
+    Usage:
+        vault = CredentialVault(supabase)             # or decrypt=my_decrypt
+        vault.start()
+        vault.prefetch(user_id)                       # at task start
+        credential = await vault.lookup(user_id, url)  # on a login form
+        vault.touch(credential.id)                     # after using it
+        await vault.close()                            # on shutdown
+    """
+
+    def __init__(
+        self,
+        supabase: AsyncClient,
+        enabled: bool = CREDENTIAL_VAULT_ENABLED,
+        cache_ttl: float = VAULT_CACHE_TTL,
+        touch_interval: float = VAULT_TOUCH_INTERVAL,
+        decrypt: Optional[Callable[[str], str]] = None,
+    ):
+        self.supabase = supabase
+        self.enabled = enabled
+        self.cache_ttl = cache_ttl
+        self.touch_interval = touch_interval
+        # Turns a stored encrypted_* value into the one to type; values are
+        # plaintext until the app encrypts them
+        self.decrypt = decrypt or (lambda value: value)
+
+        # user_id -> (loaded at, host -> entries, most recently used first)
+        self._index: Dict[str, Tuple[float, Dict[str, List[Credential]]]] = {}
+        self._loading: Dict[str, asyncio.Task] = {}
+        self._touched: Set[str] = set()
+        self._flusher: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the background last_used_at writer."""
+        if self.enabled:
+            self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def close(self):
+        """Stop the writer and record any pending last_used_at updates."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+
+    def prefetch(self, user_id: str):
+        """Start loading a user's index in the background unless it is cached."""
+        if not self.enabled:
+            return
+        # Credentials are not kept in memory past their TTL
+        for stale in [u for u in self._index if not self._fresh(u)]:
+            del self._index[stale]
+        if user_id not in self._index and user_id not in self._loading:
+            self._loading[user_id] = asyncio.create_task(self._load(user_id))
+
+    async def lookup(self, user_id: str, url: str) -> Optional[Credential]:
+        """
+        The user's entry for the site of a URL, matching parent domains too.
+
+        Args:
+            user_id: The task owner
+            url: The page asking for credentials
+
+        Returns:
+            The most recently used matching entry, or None
+        """
+        host = site_host(url)
+        if not self.enabled or not host:
+            return None
+
+        self.prefetch(user_id)
+        if user_id in self._loading:
+            await asyncio.shield(self._loading[user_id])
+        index = self._index.get(user_id, (0.0, {}))[1]
+
+        # login.example.com also matches an entry saved for example.com
+        labels = host.split(".")
+        for start in range(len(labels) - 1):
+            entries = index.get(".".join(labels[start:]))
+            if entries:
+                return entries[0]
+        return None
+
+    def touch(self, credential_id: str):
+        """Record that an entry was used; written with the next batch."""
+        self._touched.add(credential_id)
+
+    async def flush(self):
+        """Write last_used_at for every entry used since the last flush."""
+        if not self._touched:
+            return
+        ids, self._touched = list(self._touched), set()
+        try:
+            with metrics.db_write("touch_vault_entries"):
+                await self.supabase.table("secrets_vault").update({
+                    "last_used_at": "now()",
+                }).in_("id", ids).execute()
+        except Exception as e:
+            logger.warning(f"Failed to update last_used_at of {len(ids)} vault entries: {e}")
+            self._touched.update(ids)
+
+    def _fresh(self, user_id: str) -> bool:
+        cached = self._index.get(user_id)
+        return cached is not None and time.monotonic() - cached[0] < self.cache_ttl
+
+    async def _load(self, user_id: str):
+        try:
+            with metrics.db_write("load_vault_entries"):
+                result = await self.supabase.table("secrets_vault").select(
+                    "id, name, website_url, encrypted_username, encrypted_password"
+                ).eq("user_id", user_id).not_.is_("website_url", "null").order(
+                    "last_used_at", desc=True, nullsfirst=False
+                ).execute()
+
+            index: Dict[str, List[Credential]] = {}
+            for row in result.data or []:
+                host = site_host(row.get("website_url") or "")
+                if host is None or not (row.get("encrypted_username") or row.get("encrypted_password")):
+                    continue
+                try:
+                    username, password = (
+                        self.decrypt(value) if value else None
+                        for value in (row.get("encrypted_username"), row.get("encrypted_password"))
+                    )
+                except Exception as e:
+                    # One unreadable entry does not hide the others
+                    logger.warning(f"Failed to decrypt vault entry {row['id']}: {e}")
+                    continue
+                index.setdefault(host, []).append(Credential(
+                    id=row["id"],
+                    name=row.get("name") or host,
+                    host=host,
+                    username=username,
+                    password=password,
+                ))
+            self._index[user_id] = (time.monotonic(), index)
+        except Exception as e:
+            # Logins fall back to asking the user
+            logger.warning(f"Failed to load vault entries for user {user_id}: {e}")
+        finally:
+            self._loading.pop(user_id, None)
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.touch_interval)
+            await self.flush()
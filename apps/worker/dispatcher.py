@@ -0,0 +1,141 @@
+"""
+Task Dispatcher - Wake the worker when claimable tasks appear
+
+Subscribes to Supabase Realtime changes on the tasks table so a new task is
+picked up within a second of being inserted, and a cancelled one is stopped
+as soon as the user cancels it. Both subscriptions are filtered on status
+(inserts of pending tasks; updates to pending or cancelled), so the progress
+and lease writes of running tasks are never sent to workers. Polling stays
+on as a safety net, backing off while the queue is idle so an idle worker
+issues fewer queries than a fixed-interval poll. Resumed tasks (set running
+with the user's input) are found by polling too.
+"""
+
+import os
+import asyncio
+import logging
+from typing import Callable, Optional
+
+from supabase import AsyncClient
+
+logger = logging.getLogger("autoagent.dispatcher")
+
+# Polling configuration (seconds)
+POLL_INTERVAL = float(os.getenv("POLL_INTERVAL", "2"))
+POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL", "30"))
+
+# Realtime subscription; off means polling only
+REALTIME_ENABLED = os.getenv("REALTIME_ENABLED", "true").lower() == "true"
+
+
+class TaskNotifier:
+    """
+    Wakes the polling loop on task changes, with adaptive polling fallback.
+
+    Usage:
+        notifier = TaskNotifier()
+        await notifier.start(supabase)
+        while running:
+            claimed = claim_tasks()
+            await notifier.wait(found_work=claimed > 0)
+    """
+
+    def __init__(
+        self,
+        poll_interval: float = POLL_INTERVAL,
+        max_poll_interval: float = POLL_MAX_INTERVAL,
+        realtime: bool = REALTIME_ENABLED,
+        on_cancelled: Optional[Callable[[str], None]] = None,
+    ):
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max(poll_interval, max_poll_interval)
+        self.realtime = realtime
+        # Called with the task ID when a task is cancelled
+        self.on_cancelled = on_cancelled
+
+        self._channel = None
+        self._wakeup = asyncio.Event()
+        self._idle_polls = 0
+
+    @property
+    def subscribed(self) -> bool:
+        return self._channel is not None
+
+    async def start(self, supabase: AsyncClient):
+        """Subscribe to pending inserts and pending/cancelled updates. Falls back to polling on failure."""
+        if not self.realtime:
+            logger.info("Realtime disabled, using polling only")
+            return
+
+        try:
+            channel = supabase.channel("task-dispatch")
+            channel.on_postgres_changes(
+                "INSERT", schema="public", table="tasks",
+                filter="status=eq.pending", callback=self._on_task_change,
+            )
+            # Requeued and cancelled tasks; one filter per binding, so running
+            # tasks (including resumes) cannot be told apart here
+            channel.on_postgres_changes(
+                "UPDATE", schema="public", table="tasks",
+                filter="status=in.(pending,cancelled)", callback=self._on_task_change,
+            )
+            await channel.subscribe()
+            self._channel = channel
+            logger.info("Subscribed to task changes via Supabase Realtime")
+        except Exception as e:
+            logger.warning(f"Realtime unavailable, using polling only: {e}")
+            self._channel = None
+
+    async def stop(self):
+        """Unsubscribe from Realtime."""
+        if self._channel is not None:
+            try:
+                await self._channel.unsubscribe()
+            except Exception as e:
+                logger.warning(f"Failed to unsubscribe from task changes: {e}")
+            self._channel = None
+        self.notify()
+
+    def notify(self):
+        """Wake the polling loop immediately (e.g. when a slot frees up)."""
+        self._wakeup.set()
+
+    async def wait(self, found_work: bool = False) -> bool:
+        """
+        Sleep until a task change is notified or the poll interval elapses.
+
+        The interval resets to POLL_INTERVAL after a poll that found work and
+        doubles, up to POLL_MAX_INTERVAL, after each poll that found nothing.
+
+        Returns:
+            True if woken by a notification, False on timeout
+        """
+        if found_work:
+            self._idle_polls = 0
+        interval = min(self.poll_interval * (2 ** self._idle_polls), self.max_poll_interval)
+
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=interval)
+            notified = True
+        except asyncio.TimeoutError:
+            notified = False
+
+        self._wakeup.clear()
+        if notified:
+            self._idle_polls = 0
+        elif not found_work and interval < self.max_poll_interval:
+            self._idle_polls += 1
+        return notified
+
+    def _on_task_change(self, payload: dict):
+        """Realtime callback: wake up only for changes a worker can claim."""
+        data = payload.get("data") or payload
+        record = data.get("record") or data.get("new") or {}
+        status = record.get("status")
+
+        if status == "cancelled" and self.on_cancelled is not None and record.get("id"):
+            self.on_cancelled(record["id"])
+            return
+
+        if status == "pending":
+            self._wakeup.set()
@@ -0,0 +1,214 @@
+"""
+Execution Profiles - How a task's browser is set up, chosen by task type
+
+A profile decides what the browser spends time and bandwidth on:
+1. Headless or headed Chromium
+2. Requests blocked before they leave the browser, by resource type
+   (images, fonts, media, ...) and by domain (ads and trackers)
+3. An optional fixed viewport
+4. A cap on the iframes browser-use walks when serializing the DOM
+
+Blocking uses the DevTools Fetch domain with request patterns, so only
+requests that match the blocklist are paused (and failed); everything else
+goes straight to the network. Blocking needs a pooled browser, where the
+worker owns the browser context. It covers the leased context and the
+browser's default context, where browser-use opens new tabs.
+
+Each blocker counts what it blocked. Blocked requests never send a
+response, so bytes saved are estimated from typical sizes per resource type.
+"""
+
+import os
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from playwright.async_api import BrowserContext, Page
+
+import metrics
+from browser_pool import BROWSER_HEADLESS
+
+logger = logging.getLogger("autoagent.execution_profiles")
+
+# Resource types the DevTools protocol reports (Network.ResourceType).
+# Documents are never blocked: that would break navigation itself.
+RESOURCE_TYPES = {
+    "Stylesheet", "Image", "Media", "Font", "Script", "TextTrack", "XHR", "Fetch",
+    "Prefetch", "EventSource", "WebSocket", "Manifest", "Ping", "Other",
+}
+
+# Typical transfer size of one response per resource type, in bytes (rough
+# medians from public web crawls); used to estimate the bytes a block saved
+TYPICAL_RESPONSE_BYTES = {
+    "Image": 40_000,
+    "Media": 500_000,
+    "Font": 30_000,
+    "Script": 25_000,
+    "Stylesheet": 12_000,
+}
+DEFAULT_RESPONSE_BYTES = 5_000
+
+# Ad and analytics hosts; their subdomains are blocked too
+DEFAULT_BLOCKED_DOMAINS = (
+    "doubleclick.net,googlesyndication.com,googleadservices.com,google-analytics.com,"
+    "googletagmanager.com,facebook.net,hotjar.com,scorecardresearch.com,adnxs.com,"
+    "criteo.com,taboola.com,outbrain.com,amazon-adsystem.com"
+)
+
+
+def _csv(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _resource_types(names: List[str]) -> List[str]:
+    """Canonical DevTools names for configured resource types; unknown ones are dropped."""
+    canonical = {name.lower(): name for name in RESOURCE_TYPES}
+    types = []
+    for name in names:
+        if name.lower() in canonical:
+            types.append(canonical[name.lower()])
+        else:
+            logger.warning(f"Ignoring unknown resource type in blocklist: {name}")
+    return types
+
+
+def _viewport(value: str) -> Optional[Dict[str, int]]:
+    """Parse WIDTHxHEIGHT; empty keeps the browser's default."""
+    if not value:
+        return None
+    width, _, height = value.lower().partition("x")
+    return {"width": int(width), "height": int(height)}
+
+
+# Profile configuration
+EXECUTION_PROFILE = os.getenv("EXECUTION_PROFILE", "browser_task")
+EXECUTION_BLOCKED_RESOURCE_TYPES = _resource_types(_csv(os.getenv("EXECUTION_BLOCKED_RESOURCE_TYPES", "image,media,font")))
+EXECUTION_BLOCKED_DOMAINS = _csv(os.getenv("EXECUTION_BLOCKED_DOMAINS", DEFAULT_BLOCKED_DOMAINS))
+EXECUTION_VIEWPORT = _viewport(os.getenv("EXECUTION_VIEWPORT", "1280x800"))
+EXECUTION_MAX_IFRAMES = int(os.getenv("EXECUTION_MAX_IFRAMES", "20"))
+
+
+@dataclass
+class ExecutionProfile:
+    """Browser setup for one kind of task."""
+
+    name: str
+    headless: bool = BROWSER_HEADLESS
+    blocked_resource_types: List[str] = field(default_factory=list)
+    blocked_domains: List[str] = field(default_factory=list)
+    viewport: Optional[Dict[str, int]] = None
+    # DOM-size cap: iframe documents browser-use serializes, and how deep it recurses
+    max_iframes: Optional[int] = None
+    max_iframe_depth: Optional[int] = None
+
+    @property
+    def blocks_requests(self) -> bool:
+        return bool(self.blocked_resource_types or self.blocked_domains)
+
+    def browser_options(self) -> dict:
+        """Keyword arguments for browser-use's Browser."""
+        options = {}
+        if self.viewport:
+            options["viewport"] = self.viewport
+        if self.max_iframes is not None:
+            options["max_iframes"] = self.max_iframes
+        if self.max_iframe_depth is not None:
+            options["max_iframe_depth"] = self.max_iframe_depth
+        return options
+
+    def request_patterns(self) -> List[dict]:
+        """Fetch.enable patterns that pause exactly the requests to block."""
+        patterns = [{"urlPattern": "*", "resourceType": t, "requestStage": "Request"} for t in self.blocked_resource_types]
+        for domain in self.blocked_domains:
+            patterns.append({"urlPattern": f"*://{domain}/*", "requestStage": "Request"})
+            patterns.append({"urlPattern": f"*://*.{domain}/*", "requestStage": "Request"})
+        return patterns
+
+
+# Built-in profiles by task type. "browser_task" (the tasks table default)
+# reads its blocklist and viewport from the environment; "full" loads every
+# resource, for tasks that depend on how the page looks.
+PROFILES: Dict[str, ExecutionProfile] = {
+    "browser_task": ExecutionProfile(
+        name="browser_task",
+        blocked_resource_types=EXECUTION_BLOCKED_RESOURCE_TYPES,
+        blocked_domains=EXECUTION_BLOCKED_DOMAINS,
+        viewport=EXECUTION_VIEWPORT,
+        max_iframes=EXECUTION_MAX_IFRAMES,
+        max_iframe_depth=2,
+    ),
+    "full": ExecutionProfile(name="full", viewport=EXECUTION_VIEWPORT),
+}
+
+
+def profile_for(task_type: Optional[str]) -> ExecutionProfile:
+    """
+    Profile for a task type; unknown or missing types get EXECUTION_PROFILE.
+
+    Args:
+        task_type: tasks.task_type of the task
+
+    Returns:
+        The ExecutionProfile to run the task with
+    """
+    if task_type in PROFILES:
+        return PROFILES[task_type]
+    return PROFILES.get(EXECUTION_PROFILE, PROFILES["browser_task"])
+
+
+class RequestBlocker:
+    """
+    Fails the requests a profile blocks, in every page of the given browser contexts.
+
+    Usage:
+        blocker = RequestBlocker(profile)
+        await blocker.attach(lease.context, lease.default_context)
+        ...
+        blocker.summary()  # {"requests_blocked": 42, "bytes_saved_estimate": 1200000, ...}
+    """
+
+    def __init__(self, profile: ExecutionProfile):
+        self.profile = profile
+        self.blocked: Counter = Counter()
+        self._patterns = profile.request_patterns()
+
+    async def attach(self, *contexts: BrowserContext):
+        """Start blocking in the contexts' open pages and any page opened later."""
+        if not self._patterns:
+            return
+        for context in contexts:
+            context.on("page", self._attach_page)
+            for page in context.pages:
+                await self._attach_page(page)
+
+    async def _attach_page(self, page: Page):
+        try:
+            session = await page.context.new_cdp_session(page)
+            session.on("Fetch.requestPaused", lambda event: self._on_request_paused(session, event))
+            await session.send("Fetch.enable", {"patterns": self._patterns})
+        except Exception as e:
+            # The page may close before we get to it
+            logger.debug(f"Request blocking not attached to {page.url}: {e}")
+
+    async def _on_request_paused(self, session, event: dict):
+        resource_type = event.get("resourceType", "Other")
+        try:
+            await session.send("Fetch.failRequest", {"requestId": event["requestId"], "errorReason": "BlockedByClient"})
+        except Exception:
+            return
+        self.blocked[resource_type] += 1
+        metrics.REQUESTS_BLOCKED.labels(resource_type=resource_type).inc()
+        metrics.BLOCKED_BYTES_ESTIMATE.inc(TYPICAL_RESPONSE_BYTES.get(resource_type, DEFAULT_RESPONSE_BYTES))
+
+    def summary(self) -> dict:
+        """What the profile saved, for the task result."""
+        return {
+            "name": self.profile.name,
+            "headless": self.profile.headless,
+            "requests_blocked": sum(self.blocked.values()),
+            "bytes_saved_estimate": sum(
+                count * TYPICAL_RESPONSE_BYTES.get(t, DEFAULT_RESPONSE_BYTES) for t, count in self.blocked.items()
+            ),
+            "blocked_by_type": dict(self.blocked),
+        }
@@ -0,0 +1,124 @@
+"""
+Fan-out - Split list-style prompts into independent subtasks run in parallel
+
+Prompts like "check prices for these 8 products" make one agent visit one
+site after another, spending most of the step budget (and wall-clock time)
+going back and forth. For such prompts the worker:
+1. Checks the prompt looks like a list of items (a cheap test, so most
+   prompts never pay for planning)
+2. Asks the LLM whether it splits into independent subtasks, and into which
+3. Runs the subtasks as separate agents, FANOUT_MAX_PARALLEL at a time, each
+   with FANOUT_SUBTASK_MAX_STEPS steps in its own isolated browser context
+4. Merges the sub-results into one result, with per-subtask timing
+
+Subtasks that depend on each other, or a plan with more than
+FANOUT_MAX_SUBTASKS parts, run as one task as before. So does the rest of a
+task when a subtask needs input from the user (a login, a 2FA code): the
+subtasks that already succeeded are kept, and the single run is told what
+they did and found so it does not do them again.
+"""
+
+import os
+import re
+import logging
+from typing import List, Tuple
+
+from pydantic import BaseModel, Field
+
+from browser_use.llm.base import BaseChatModel
+from browser_use.llm.messages import SystemMessage, UserMessage
+
+logger = logging.getLogger("autoagent.fan_out")
+
+# Fan-out configuration
+FANOUT_ENABLED = os.getenv("FANOUT_ENABLED", "true").lower() == "true"
+FANOUT_MAX_SUBTASKS = int(os.getenv("FANOUT_MAX_SUBTASKS", "10"))
+FANOUT_MAX_PARALLEL = max(1, int(os.getenv("FANOUT_MAX_PARALLEL", "4")))
+FANOUT_SUBTASK_MAX_STEPS = int(os.getenv("FANOUT_SUBTASK_MAX_STEPS", "15"))
+
+# Bulleted or numbered lines: "- item", "* item", "1. item", "2) item"
+LIST_ITEM_PATTERN = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+\S", re.MULTILINE)
+# "each of", "these 5", "the following", "for every" ...
+LIST_WORDS_PATTERN = re.compile(r"\b(each|every|these|following|all of|list of)\b", re.IGNORECASE)
+
+PLANNER_PROMPT = """You split browser automation tasks into independent subtasks that can run in parallel, each in its own browser.
+
+Split the task only if it repeats the same kind of work over several items (products, sites, accounts, ...) and no item needs the outcome of another. Each subtask must be complete on its own: repeat the site, credentials hints and the exact information to collect, for one item only.
+
+If the task is a single flow, or its steps depend on each other, answer independent=false with no subtasks."""
+
+
+class SubtaskPlan(BaseModel):
+    """The planner's answer."""
+
+    independent: bool = Field(description="Whether the task splits into independent subtasks")
+    subtasks: List[str] = Field(default_factory=list, description="One self-contained instruction per item")
+
+
+def looks_decomposable(prompt: str) -> bool:
+    """Cheap test for prompts that list several items to work through."""
+    if len(LIST_ITEM_PATTERN.findall(prompt)) >= 2:
+        return True
+    return bool(LIST_WORDS_PATTERN.search(prompt)) and prompt.count(",") >= 2
+
+
+async def plan_subtasks(llm: BaseChatModel, prompt: str, max_subtasks: int = FANOUT_MAX_SUBTASKS) -> List[str]:
+    """
+    Split a prompt into independent subtasks.
+
+    Args:
+        llm: The model to plan with
+        prompt: The user's instruction
+        max_subtasks: Larger plans are not fanned out
+
+    Returns:
+        The subtasks, or an empty list to run the prompt as one task
+    """
+    response = await llm.ainvoke(
+        [SystemMessage(content=PLANNER_PROMPT), UserMessage(content=prompt)],
+        output_format=SubtaskPlan,
+    )
+    plan: SubtaskPlan = response.completion
+    subtasks = [s.strip() for s in plan.subtasks if s.strip()]
+    if not plan.independent or len(subtasks) < 2:
+        return []
+    if len(subtasks) > max_subtasks:
+        logger.info(f"Not fanning out: plan has {len(subtasks)} subtasks (max {max_subtasks})")
+        return []
+    return subtasks
+
+
+def merge_results(subtasks: List[str], results: List[dict]) -> str:
+    """One result text from the sub-results, in subtask order."""
+    lines = []
+    for i, (subtask, result) in enumerate(zip(subtasks, results), start=1):
+        if result.get("success"):
+            outcome = result.get("result") or "Done."
+        else:
+            outcome = f"Failed: {result.get('error') or result.get('result') or 'unknown error'}"
+        lines.append(f"{i}. {subtask}\n{outcome}")
+    return "\n\n".join(lines)
+
+
+def continuation_prompt(prompt: str, finished: List[Tuple[str, dict]]) -> str:
+    """
+    The prompt for running the rest of a fanned-out task as one task.
+
+    Args:
+        prompt: The user's instruction
+        finished: (subtask, result) of the subtasks that already succeeded
+
+    Returns:
+        The instruction, followed by the finished parts and their results
+    """
+    if not finished:
+        return prompt
+    done = "\n\n".join(
+        f"{i}. {subtask}\n{result.get('result') or 'Done.'}"
+        for i, (subtask, result) in enumerate(finished, start=1)
+    )
+    return (
+        f"{prompt}\n\n"
+        f"These parts of the task are already done. Do not do them again; "
+        f"include their results in your final answer:\n\n{done}"
+    )
@@ -6,11 +6,18 @@ and managing the pause/resume flow.
 """
 
 import re
+import asyncio
 import logging
-from typing import Optional, Tuple
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import ahocorasick
 
 logger = logging.getLogger("autoagent.human_loop")
 
+# Most task IDs sent in one id=in.(...) filter, to keep request URLs short
+WATCH_BATCH_SIZE = 200
+
 # Common patterns that indicate login/2FA is required
 LOGIN_PATTERNS = [
     r"log\s*in",
@@ -44,58 +51,197 @@ CAPTCHA_PATTERNS = [
 ]
 
 
-def detect_input_requirement(page_content: str, page_url: str = "") -> Optional[Tuple[str, str, str]]:
+# Words that tell _analyze_login_page which credentials a login form wants
+USERNAME_HINTS = ["username", "email", "user id", "account"]
+PASSWORD_HINTS = ["password"]
+
+# URL fragments that mark a login page regardless of its content
+LOGIN_URL_HINTS = ["login", "signin", "auth", "sso"]
+
+# detect_input_requirement scans a page this many characters at a time, so
+# it can stop (and stop lowercasing) as soon as the answer is known
+SCAN_CHUNK_SIZE = 64 * 1024
+
+# Text carried over between chunks so matches spanning a boundary are found;
+# also how far a pattern's match may reach from the literal it is found by
+CHUNK_OVERLAP = 256
+
+
+def _required_literal(pattern: str) -> str:
     """
-    Analyze page content to detect if human input is required.
-    
-    Args:
-        page_content: The text content of the page
-        page_url: The current page URL
-        
-    Returns:
-        Tuple of (input_type, field_name, hint) if input required, None otherwise
+    Longest run of plain characters that every match of `pattern` contains.
+
+    Handles the syntax the pattern lists above use: escapes such as \\s*,
+    and . with an optional ? or * quantifier.
     """
-    content_lower = page_content.lower()
-    url_lower = page_url.lower()
-    
-    # Check URL patterns first
-    if any(p in url_lower for p in ["login", "signin", "auth", "sso"]):
-        return _analyze_login_page(content_lower)
-    
-    # Check for 2FA patterns - these take priority
-    for pattern in TWO_FA_PATTERNS:
-        if re.search(pattern, content_lower):
+    runs = re.split(r"\\[a-zA-Z]\*?|\.[?*]?|[?*]", pattern)
+    return max(runs, key=len)
+
+
+def _compile_matcher() -> "ahocorasick.Automaton":
+    """
+    One Aho-Corasick automaton over every pattern and credential hint.
+
+    Each key is a literal that every match of a pattern contains; its value
+    is (literal length, [(signal, regex or None), ...]). A pattern that is
+    more than its literal is confirmed by its precompiled regex around the
+    literal, so regexes only run where the page could match them. Signals
+    are the pattern categories (two_fa, login, captcha) and the hints
+    (username, password).
+    """
+    signals: Dict[str, List[Tuple[str, Optional["re.Pattern[str]"]]]] = {}
+    for category, patterns in (
+        ("two_fa", TWO_FA_PATTERNS),
+        ("login", LOGIN_PATTERNS),
+        ("captcha", CAPTCHA_PATTERNS),
+    ):
+        for pattern in patterns:
+            literal = _required_literal(pattern)
+            regex = None if literal == pattern else re.compile(pattern)
+            signals.setdefault(literal, []).append((category, regex))
+    for hint, words in (("username", USERNAME_HINTS), ("password", PASSWORD_HINTS)):
+        for word in words:
+            signals.setdefault(word, []).append((hint, None))
+
+    automaton = ahocorasick.Automaton()
+    for literal, entries in signals.items():
+        automaton.add_word(literal, (len(literal), entries))
+    automaton.make_automaton()
+    return automaton
+
+
+_MATCHER = _compile_matcher()
+
+
+class InputRequirementScanner:
+    """
+    Single-pass, incremental version of detect_input_requirement.
+
+    Every chunk of page text is scanned once by a precompiled automaton that
+    finds all 2FA, login and CAPTCHA patterns and credential hints together.
+    The priority order is applied to what was found: a login URL, then 2FA,
+    login and CAPTCHA. Scanning stops as soon as more text cannot change the
+    answer: at the first 2FA prompt, or on a login URL once both credential
+    hints have been seen. Nothing but a short overlap is kept between chunks.
+
+    On a login URL only the five hint words matter, and a substring test
+    for each is cheaper than an automaton pass, so the automaton is skipped.
+
+    Usage:
+        scanner = InputRequirementScanner(page_url)
+        for chunk in chunks:
+            if scanner.feed(chunk):
+                break
+        requirement = scanner.result()
+    """
+
+    def __init__(self, page_url: str = ""):
+        url_lower = page_url.lower()
+        self.login_url = any(p in url_lower for p in LOGIN_URL_HINTS)
+        self.found = set()
+        self._tail = ""
+
+    @property
+    def done(self) -> bool:
+        """True once more text cannot change the result."""
+        if self.login_url:
+            return {"username", "password"} <= self.found
+        return "two_fa" in self.found
+
+    def feed(self, chunk: str) -> bool:
+        """
+        Scan the next chunk of page text.
+
+        Returns:
+            True if scanning can stop (see `done`)
+        """
+        if self.done:
+            return True
+
+        text = self._tail + chunk.lower() if self._tail else chunk.lower()
+        self._tail = text[-CHUNK_OVERLAP:]
+
+        if self.login_url:
+            for hint, words in (("username", USERNAME_HINTS), ("password", PASSWORD_HINTS)):
+                if hint not in self.found and any(word in text for word in words):
+                    self.found.add(hint)
+            return self.done
+
+        for end, (length, entries) in _MATCHER.iter(text):
+            for signal, regex in entries:
+                if signal in self.found:
+                    continue
+                if regex is not None:
+                    start = end + 1 - length
+                    if not regex.search(text, max(0, start - CHUNK_OVERLAP), end + 1 + CHUNK_OVERLAP):
+                        continue
+                self.found.add(signal)
+            if self.done:
+                break
+        return self.done
+
+    def result(self) -> Optional[Tuple[str, str, str]]:
+        """Return (input_type, field_name, hint) if input is required, else None."""
+        has_username, has_password = "username" in self.found, "password" in self.found
+
+        # Check URL patterns first
+        if self.login_url:
+            return _analyze_login_page(has_username, has_password)
+
+        # Check for 2FA patterns - these take priority
+        if "two_fa" in self.found:
             return (
                 "text",
                 "Verification Code",
                 "Please enter the 2FA/verification code sent to your device or email."
             )
-    
-    # Check for login patterns
-    for pattern in LOGIN_PATTERNS:
-        if re.search(pattern, content_lower):
-            return _analyze_login_page(content_lower)
-    
-    # Check for CAPTCHA - these need special handling
-    for pattern in CAPTCHA_PATTERNS:
-        if re.search(pattern, content_lower):
+
+        # Check for login patterns
+        if "login" in self.found:
+            return _analyze_login_page(has_username, has_password)
+
+        # Check for CAPTCHA - these need special handling
+        if "captcha" in self.found:
             return (
                 "captcha",
                 "CAPTCHA Verification",
                 "A CAPTCHA is required. Please solve it manually and indicate when done."
             )
+
+        return None
+
+
+def detect_input_requirement(page_content: str, page_url: str = "") -> Optional[Tuple[str, str, str]]:
+    """
+    Analyze page content to detect if human input is required.
     
-    return None
+    Args:
+        page_content: The text content of the page
+        page_url: The current page URL
+        
+    Returns:
+        Tuple of (input_type, field_name, hint) if input required, None otherwise
+    """
+    scanner = InputRequirementScanner(page_url)
+    for i in range(0, len(page_content), SCAN_CHUNK_SIZE):
+        if scanner.feed(page_content[i:i + SCAN_CHUNK_SIZE]):
+            break
+    return scanner.result()
 
 
-def _analyze_login_page(content: str) -> Tuple[str, str, str]:
+def needs_credentials(requirement: Tuple[str, str, str]) -> bool:
     """
-    Analyze a login page to determine what credentials are needed.
+    True if a requirement from detect_input_requirement is a login form that
+    saved credentials can answer, False for 2FA codes and CAPTCHAs.
+    """
+    input_type, field_name, _ = requirement
+    return input_type in ("credentials", "password") or field_name == "Username/Email"
+
+
+def _analyze_login_page(has_username: bool, has_password: bool) -> Tuple[str, str, str]:
+    """
+    Decide what credentials a login page needs from the hints found on it.
     """
-    # Check if it's asking for both username and password
-    has_username = any(word in content for word in ["username", "email", "user id", "account"])
-    has_password = "password" in content
-    
     if has_username and has_password:
         return (
             "credentials",
@@ -134,13 +280,14 @@ class HumanInputRequired(Exception):
         field_name: str,
         hint: str,
         page_url: str = "",
-        screenshot_path: Optional[str] = None
+        screenshot: Optional[str] = None
     ):
         self.input_type = input_type
         self.field_name = field_name
         self.hint = hint
         self.page_url = page_url
-        self.screenshot_path = screenshot_path
+        # Artifact hash (see artifact_store), not a local path
+        self.screenshot = screenshot
         super().__init__(f"Human input required: {field_name}")
     
     def to_dict(self) -> dict:
@@ -150,10 +297,138 @@ class HumanInputRequired(Exception):
             "field_name": self.field_name,
             "hint": self.hint,
             "page_url": self.page_url,
-            "screenshot_path": self.screenshot_path,
+            "screenshot": self.screenshot,
         }
 
 
+@dataclass
+class _Watch:
+    future: asyncio.Future
+    deadline: float
+
+
+class InputWatcher:
+    """
+    Waits for user input on many tasks with one query per poll.
+
+    Each waiting task registers a future. A single loop fetches every
+    watched task with one id=in.(...) query per tick and resolves each
+    future when input arrives (the input), the task is cancelled (None) or
+    its timeout passes (None). The loop exits when nothing is being watched.
+
+    Usage:
+        watcher = InputWatcher(supabase)
+        user_input = await watcher.wait(task_id, timeout_seconds=300)
+    """
+
+    def __init__(self, supabase_client, poll_interval: float = 2.0):
+        self.supabase = supabase_client
+        self.poll_interval = poll_interval
+
+        self._watches: Dict[str, List[_Watch]] = {}
+        self._wakeup = asyncio.Event()
+        self._loop_task: Optional[asyncio.Task] = None
+
+    @property
+    def watching(self) -> int:
+        return len(self._watches)
+
+    async def wait(self, task_id: str, timeout_seconds: float = 300) -> Optional[str]:
+        """Wait for input on a task. Returns the input, or None on cancel/timeout."""
+        loop = asyncio.get_running_loop()
+        watch = _Watch(future=loop.create_future(), deadline=loop.time() + timeout_seconds)
+        self._watches.setdefault(task_id, []).append(watch)
+
+        if self._loop_task is None or self._loop_task.done():
+            self._loop_task = asyncio.create_task(self._run())
+        else:
+            # Check the new task right away rather than at the next tick
+            self.notify()
+
+        return await watch.future
+
+    def notify(self):
+        """Poll immediately (e.g. on a Realtime change for a watched task)."""
+        self._wakeup.set()
+
+    async def _run(self):
+        while self._watches:
+            try:
+                await self._poll()
+            except Exception as e:
+                logger.warning(f"Error polling {len(self._watches)} tasks waiting for input: {e}")
+
+            self._expire()
+            if not self._watches:
+                break
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _poll(self):
+        task_ids = list(self._watches)
+        for start in range(0, len(task_ids), WATCH_BATCH_SIZE):
+            batch = task_ids[start:start + WATCH_BATCH_SIZE]
+            result = await self.supabase.table("tasks").select(
+                "id, user_provided_input, status"
+            ).in_("id", batch).execute()
+
+            for task in result.data or []:
+                task_id = task["id"]
+
+                # Check if user cancelled
+                if task["status"] == "cancelled":
+                    logger.info(f"Task {task_id} was cancelled by user")
+                    self._resolve(task_id, None)
+                    continue
+
+                # Check if input was provided
+                user_input = task.get("user_provided_input")
+                if user_input:
+                    logger.info(f"Received user input for task {task_id}")
+                    self._resolve(task_id, user_input)
+
+    def _resolve(self, task_id: str, value: Optional[str]):
+        for watch in self._watches.pop(task_id, []):
+            if not watch.future.done():
+                watch.future.set_result(value)
+
+    def _expire(self):
+        now = asyncio.get_running_loop().time()
+        for task_id in list(self._watches):
+            remaining = []
+            for watch in self._watches[task_id]:
+                if watch.future.done():
+                    # The waiter was cancelled
+                    continue
+                if now >= watch.deadline:
+                    logger.warning(f"Timeout waiting for user input on task {task_id}")
+                    watch.future.set_result(None)
+                    continue
+                remaining.append(watch)
+
+            if remaining:
+                self._watches[task_id] = remaining
+            else:
+                del self._watches[task_id]
+
+
+# One watcher per Supabase client, shared by every waiting task
+_watchers: Dict[int, InputWatcher] = {}
+
+
+def get_input_watcher(supabase_client, poll_interval: float = 2.0) -> InputWatcher:
+    """Return the shared InputWatcher for a Supabase client, creating it if needed."""
+    watcher = _watchers.get(id(supabase_client))
+    if watcher is None or watcher.supabase is not supabase_client:
+        watcher = InputWatcher(supabase_client, poll_interval=poll_interval)
+        _watchers[id(supabase_client)] = watcher
+    return watcher
+
+
 async def wait_for_user_input(
     supabase_client,
     task_id: str,
@@ -162,39 +437,18 @@ async def wait_for_user_input(
 ) -> Optional[str]:
     """
     Wait for user to provide input via Supabase.
+
+    All waiting tasks share one InputWatcher per client, so hundreds of
+    waiting tasks cost one query per poll instead of one each.
     
     Args:
-        supabase_client: Supabase client instance
+        supabase_client: Async Supabase client instance
         task_id: The task ID to monitor
         timeout_seconds: Maximum time to wait
-        poll_interval: Seconds between polls
+        poll_interval: Seconds between polls (used when the shared watcher is created)
         
     Returns:
-        The user-provided input, or None if timeout
+        The user-provided input, or None if cancelled or timeout
     """
-    import asyncio
-    
-    elapsed = 0
-    
-    while elapsed < timeout_seconds:
-        # Check if user provided input
-        result = supabase_client.table("tasks").select("user_provided_input, status").eq("id", task_id).single().execute()
-        
-        task = result.data
-        if task:
-            # Check if user cancelled
-            if task["status"] == "cancelled":
-                logger.info(f"Task {task_id} was cancelled by user")
-                return None
-            
-            # Check if input was provided
-            user_input = task.get("user_provided_input")
-            if user_input:
-                logger.info(f"Received user input for task {task_id}")
-                return user_input
-        
-        await asyncio.sleep(poll_interval)
-        elapsed += poll_interval
-    
-    logger.warning(f"Timeout waiting for user input on task {task_id}")
-    return None
+    watcher = get_input_watcher(supabase_client, poll_interval=poll_interval)
+    return await watcher.wait(task_id, timeout_seconds)
@@ -0,0 +1,173 @@
+"""
+Lease Keeper - Heartbeat task leases and requeue tasks whose worker is gone
+
+claim_tasks() stamps every claimed task with the worker's ID and a lease
+of TASK_LEASE_SECONDS. While a task runs, this worker renews the lease every
+TASK_HEARTBEAT_INTERVAL seconds, so a short lease is enough and a dead
+worker's tasks are noticed quickly.
+
+Every worker also runs the reaper (reap_expired_tasks) every
+TASK_REAP_INTERVAL seconds:
+1. Running tasks whose lease has expired go back to pending, as do running
+   tasks without a lease that started over TASK_UNLEASED_REAP_SECONDS ago
+2. A task that has already been claimed TASK_MAX_ATTEMPTS times fails instead,
+   so a task that crashes its worker cannot take down one worker after another
+3. On startup, running tasks still stamped with this WORKER_ID belong to a
+   previous run of this worker and are reaped without waiting for their lease
+
+A heartbeat that finds one of its tasks held by no one or by another worker
+(its lease lapsed and it was reaped) reports the task as lost, so the worker
+stops running it. One that finds a task cancelled reports that too, in case
+the Realtime notification was missed.
+"""
+
+import os
+import asyncio
+import logging
+from typing import Callable, Iterable, List, Optional
+
+from supabase import AsyncClient
+
+import metrics
+
+logger = logging.getLogger("autoagent.leases")
+
+# Lease configuration (seconds)
+TASK_LEASE_SECONDS = int(os.getenv("TASK_LEASE_SECONDS", "120"))
+TASK_HEARTBEAT_INTERVAL = float(os.getenv("TASK_HEARTBEAT_INTERVAL", "30"))
+TASK_REAP_INTERVAL = float(os.getenv("TASK_REAP_INTERVAL", "60"))
+TASK_UNLEASED_REAP_SECONDS = int(os.getenv("TASK_UNLEASED_REAP_SECONDS", "600"))
+
+# Claims (first run plus requeues) before an abandoned task is failed
+TASK_MAX_ATTEMPTS = int(os.getenv("TASK_MAX_ATTEMPTS", "3"))
+
+
+class LeaseKeeper:
+    """
+    Renews the leases of the tasks a worker runs and reaps expired ones.
+
+    Usage:
+        keeper = LeaseKeeper(worker_id, held=lambda: list(active_tasks), on_lost=cancel_task)
+        await keeper.start(supabase)   # reaps this worker's leftovers first
+        ...
+        await keeper.close()           # on shutdown, after tasks finish
+    """
+
+    def __init__(
+        self,
+        worker_id: str,
+        held: Callable[[], Iterable[str]],
+        on_lost: Callable[[str], None],
+        on_requeued: Optional[Callable[[], None]] = None,
+        on_cancelled: Optional[Callable[[str], None]] = None,
+        lease_seconds: int = TASK_LEASE_SECONDS,
+        heartbeat_interval: float = TASK_HEARTBEAT_INTERVAL,
+        reap_interval: float = TASK_REAP_INTERVAL,
+        max_attempts: int = TASK_MAX_ATTEMPTS,
+        unleased_reap_seconds: int = TASK_UNLEASED_REAP_SECONDS,
+    ):
+        self.worker_id = worker_id
+        self.held = held
+        self.on_lost = on_lost
+        self.on_requeued = on_requeued
+        self.on_cancelled = on_cancelled
+        self.lease_seconds = lease_seconds
+        # A heartbeat must land well inside the lease it renews
+        self.heartbeat_interval = min(heartbeat_interval, lease_seconds / 3)
+        self.reap_interval = reap_interval
+        self.max_attempts = max_attempts
+        self.unleased_reap_seconds = unleased_reap_seconds
+
+        self.supabase: Optional[AsyncClient] = None
+        self.requeued = 0
+        self.failed = 0
+        self.lost = 0
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self, supabase: AsyncClient):
+        """Reap this worker's leftovers, then start heartbeating and reaping."""
+        self.supabase = supabase
+        try:
+            await self.reap(previous_run=True)
+        except Exception as e:
+            logger.warning(f"Failed to reap tasks left by a previous run: {e}")
+
+        self._tasks = [
+            asyncio.create_task(self._periodically(self.heartbeat_interval, self.heartbeat)),
+            asyncio.create_task(self._periodically(self.reap_interval, self.reap)),
+        ]
+
+    async def close(self):
+        """Stop heartbeating and reaping."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def heartbeat(self):
+        """Extend the lease of every task this worker runs."""
+        task_ids = list(self.held())
+        if not task_ids:
+            return
+
+        with metrics.db_write("renew_task_leases"):
+            result = await self.supabase.rpc(
+                "renew_task_leases",
+                {"p_worker_id": self.worker_id, "p_task_ids": task_ids, "p_lease_seconds": self.lease_seconds},
+            ).execute()
+
+        # Tasks that finished or paused still carry our worker ID; only a
+        # task stamped with another (or no) worker was taken from us
+        for row in result.data or []:
+            if row.get("status") == "cancelled" and self.on_cancelled is not None:
+                self.on_cancelled(row["task_id"])
+            elif not row.get("held"):
+                self.lost += 1
+                metrics.LEASES_LOST.inc()
+                logger.warning(f"Lost the lease on task {row['task_id']}; it was requeued or taken over")
+                self.on_lost(row["task_id"])
+
+    async def reap(self, previous_run: bool = False) -> int:
+        """
+        Requeue (or fail, past the attempt cap) running tasks whose lease
+        expired, or that have run without one for too long.
+
+        Args:
+            previous_run: Also reap running tasks stamped with this worker's ID,
+                whatever their lease (only safe before this worker claims anything)
+
+        Returns:
+            Number of tasks requeued
+        """
+        params = {"p_max_attempts": self.max_attempts, "p_unleased_seconds": self.unleased_reap_seconds}
+        if previous_run:
+            params["p_dead_worker_id"] = self.worker_id
+
+        with metrics.db_write("reap_expired_tasks"):
+            result = await self.supabase.rpc("reap_expired_tasks", params).execute()
+
+        requeued = 0
+        for row in result.data or []:
+            if row["status"] == "pending":
+                requeued += 1
+                logger.info(f"Requeued task {row['task_id']} (attempt {row['attempts']}/{self.max_attempts})")
+            else:
+                self.failed += 1
+                logger.warning(f"Failed task {row['task_id']} after {row['attempts']} abandoned attempts")
+            metrics.TASKS_REAPED.labels(outcome=row["status"]).inc()
+
+        self.requeued += requeued
+        if requeued and self.on_requeued is not None:
+            self.on_requeued()
+        return requeued
+
+    def stats(self) -> dict:
+        return {"requeued": self.requeued, "failed": self.failed, "lost": self.lost}
+
+    async def _periodically(self, interval: float, action: Callable):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await action()
+            except Exception as e:
+                logger.warning(f"{action.__name__} failed: {e}")
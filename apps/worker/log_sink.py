@@ -0,0 +1,134 @@
+"""
+Task Log Sink - Buffered, batched task log writer
+
+Writing one RPC per log message costs a database round trip each time. The
+sink buffers entries per task and inserts them into the task_logs table with
+one insert_task_logs RPC when a batch fills up or the flush interval elapses.
+
+Guarantees:
+1. Entries for a task are delivered in the order they were written
+2. Error and success entries are flushed immediately
+3. Callers flush before status transitions so logs land before the status
+4. close() drains everything still buffered
+"""
+
+import os
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from supabase import AsyncClient
+
+import metrics
+
+logger = logging.getLogger("autoagent.log_sink")
+
+# Batching configuration
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "20"))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "1.0"))
+LOG_MAX_BUFFER = int(os.getenv("LOG_MAX_BUFFER", "1000"))
+
+# Log types that are written through without waiting for a batch
+IMMEDIATE_LOG_TYPES = {"error", "success"}
+
+
+class TaskLogSink:
+    """
+    Buffers task log entries and writes them in batches.
+
+    Usage:
+        sink = TaskLogSink()
+        sink.start(supabase)
+        await sink.write(task_id, "Clicked login", "info")
+        await sink.flush(task_id)       # before a status update
+        await sink.close_task(task_id)  # when the task's run ends
+        await sink.close()              # on shutdown
+    """
+
+    def __init__(
+        self,
+        batch_size: int = LOG_BATCH_SIZE,
+        flush_interval: float = LOG_FLUSH_INTERVAL,
+        max_buffer: int = LOG_MAX_BUFFER,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+
+        self.supabase: Optional[AsyncClient] = None
+        self._buffers: Dict[str, List[dict]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._flusher: Optional[asyncio.Task] = None
+
+    def start(self, supabase: AsyncClient):
+        """Start the background flusher."""
+        self.supabase = supabase
+        self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def close(self):
+        """Stop the background flusher and drain every buffered entry."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+
+        await self.flush()
+
+    async def write(self, task_id: str, message: str, log_type: str = "info"):
+        """Buffer a log entry, flushing if it is urgent or the batch is full."""
+        buffer = self._buffers.setdefault(task_id, [])
+        buffer.append({
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "message": message,
+            "type": log_type,
+        })
+
+        if log_type in IMMEDIATE_LOG_TYPES or len(buffer) >= self.batch_size:
+            await self.flush(task_id)
+
+    async def flush(self, task_id: Optional[str] = None):
+        """Write buffered entries for one task, or for every task if none given."""
+        task_ids = [task_id] if task_id is not None else list(self._buffers)
+        for tid in task_ids:
+            await self._flush_task(tid)
+
+    async def close_task(self, task_id: str):
+        """Flush a finished task's entries and forget its state."""
+        await self._flush_task(task_id)
+        if task_id not in self._buffers:
+            self._locks.pop(task_id, None)
+
+    async def _flush_task(self, task_id: str):
+        # One flush per task at a time keeps batches in write order
+        lock = self._locks.setdefault(task_id, asyncio.Lock())
+        async with lock:
+            entries = self._buffers.pop(task_id, None)
+            if not entries:
+                return
+
+            try:
+                with metrics.db_write("insert_task_logs", task_id):
+                    await self.supabase.rpc(
+                        "insert_task_logs",
+                        {"p_task_id": task_id, "p_entries": entries}
+                    ).execute()
+            except Exception as e:
+                logger.warning(f"Failed to write {len(entries)} log entries for task {task_id}: {e}")
+                # Put the batch back ahead of newer entries and retry next flush
+                retry = entries + self._buffers.get(task_id, [])
+                if len(retry) > self.max_buffer:
+                    logger.warning(f"Dropping {len(retry) - self.max_buffer} oldest log entries for task {task_id}")
+                    retry = retry[-self.max_buffer:]
+                self._buffers[task_id] = retry
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f"Error flushing task logs: {e}")
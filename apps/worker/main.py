@@ -6,14 +6,41 @@ This module starts the worker process that:
 2. Listens for new tasks (INSERT with status='pending')
 3. Executes tasks using browser-use agent
 4. Updates task status and logs in real-time
+
+Startup overlaps its slow parts: browser-use (the agent module) is imported
+in a background thread while the Supabase client connects and Chromium is
+pre-launched. The worker only reports ready, and only claims tasks, once all
+three are done.
 """
 
 import os
+import time
+import signal
+import socket
 import asyncio
 import logging
+import importlib
+from typing import Callable, Dict, List, Optional, Type, TYPE_CHECKING
+
+import psutil
 from dotenv import load_dotenv
-from supabase import create_client, Client
-from agent import BrowserAgent
+from supabase import acreate_client, AsyncClient
+import metrics
+from admission import AdmissionController
+from artifact_store import ArtifactStore
+from browser_pool import BrowserPool
+from credential_vault import CredentialVault
+from dispatcher import TaskNotifier
+from leases import LeaseKeeper, TASK_LEASE_SECONDS
+from log_sink import TaskLogSink
+from progress import ProgressPublisher
+from session_registry import PausedSessionRegistry, RESUME_AFFINITY_SECONDS
+from task_limits import TaskLimits, StopReason
+from trace_cache import TraceCache
+from metrics import WorkerMetrics, db_write
+
+if TYPE_CHECKING:
+    from agent import BrowserAgent
 
 # Load environment variables
 load_dotenv()
@@ -28,7 +55,14 @@ logger = logging.getLogger("autoagent.worker")
 # Supabase configuration
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
-WORKER_ID = os.getenv("WORKER_ID", "worker-1")
+WORKER_ID = os.getenv("WORKER_ID") or f"worker-{socket.gethostname()}"
+
+# Number of tasks this worker process runs at the same time
+MAX_CONCURRENT_TASKS = max(1, int(os.getenv("MAX_CONCURRENT_TASKS", "2")))
+
+# Created once the worker can run a task immediately, removed on shutdown
+# (for container health checks); empty disables it
+WORKER_READY_FILE = os.getenv("WORKER_READY_FILE", "/tmp/autoagent-worker-ready")
 
 if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
     raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set")
@@ -39,87 +73,304 @@ class TaskWorker:
     Worker that listens for pending tasks and executes them using browser-use.
     """
 
-    def __init__(self):
-        self.supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
-        self.agent = BrowserAgent(self.supabase)
+    def __init__(self, max_concurrent_tasks: int = MAX_CONCURRENT_TASKS, llm_factory: Optional[Callable] = None):
+        # Async client: DB calls never block the event loop the agents run on.
+        # Created in start() since client setup is itself async.
+        self.supabase: Optional[AsyncClient] = None
+        self.max_concurrent_tasks = max_concurrent_tasks
         self.running = False
 
+        # Builds the LLM each task runs on (benchmarks swap in a scripted one);
+        # defaults to agent.create_llm once the agent module is loaded
+        self.llm_factory = llm_factory
+
+        # Loaded in the background by start(); browser-use is slow to import
+        self.browser_agent_cls: Optional[Type["BrowserAgent"]] = None
+
+        # Set once the worker can run a task without further warm-up
+        self.ready = asyncio.Event()
+        self._first_task_dispatched = False
+
+        # Paused sessions kept alive for instant resume after a 2FA answer
+        self.session_registry = PausedSessionRegistry()
+
+        # One warm browser per execution slot, plus headroom for the browsers
+        # parked sessions hold on to so they never starve running tasks
+        self.browser_pool = BrowserPool(size=max_concurrent_tasks + self.session_registry.max_sessions)
+
+        # Claims work only while memory and CPU have room for another browser
+        self.admission = AdmissionController(self.browser_pool)
+
+        # Stops runs on cancellation, deadline or token budget
+        self.limits = TaskLimits()
+
+        # Wakes the claim loop on task inserts/updates instead of a fixed sleep
+        self.notifier = TaskNotifier(on_cancelled=self._on_task_cancelled)
+
+        # Renews the leases of running tasks and requeues tasks of dead workers.
+        # Parked tasks are checked too, to drop sessions resumed elsewhere.
+        self.leases = LeaseKeeper(
+            WORKER_ID,
+            held=lambda: list(self.active_tasks) + self.session_registry.task_ids(),
+            on_lost=self._on_lease_lost,
+            on_requeued=self.notifier.notify,
+            on_cancelled=self._on_task_cancelled,
+        )
+
+        # Batches log lines into one insert_task_logs RPC per flush
+        self.log_sink = TaskLogSink()
+
+        # Coalesces per-step progress into at most one tasks row update per interval
+        self.progress = ProgressPublisher(WORKER_ID)
+
+        # Recorded action traces for recurring prompts (needs the client, see start())
+        self.trace_cache: Optional[TraceCache] = None
+
+        # Users' saved logins, so login forms do not wait for a person (see start())
+        self.credential_vault: Optional[CredentialVault] = None
+        self.artifact_store: Optional[ArtifactStore] = None
+
+        # Worker gauges and the Prometheus endpoint
+        self.metrics = WorkerMetrics(self)
+
+        # In-flight executions keyed by task ID. Each slot gets its own
+        # BrowserAgent so browser and task state are never shared.
+        self.active_tasks: Dict[str, asyncio.Task] = {}
+
+    @property
+    def free_slots(self) -> int:
+        """Number of execution slots currently available."""
+        return self.max_concurrent_tasks - len(self.active_tasks)
+
     async def start(self):
         """Start the worker and begin listening for tasks."""
         self.running = True
+        # A ready file left by a crashed run must not report this one ready
+        self._clear_ready()
+        # Up first so startup progress can be scraped
+        self.metrics.start()
+
+        # Launch browsers before taking work so the first task starts warm,
+        # but no more than the instance has memory for
+        warm = self.max_concurrent_tasks
+        if self.admission.enabled:
+            warm = min(warm, self.admission.capacity())
+
+        # The three slow steps run side by side. Importing browser-use 0.11
+        # reads .env, creates its config dir and sets up logging unless the
+        # root logger already has handlers (configured above, so it keeps
+        # ours); none of that needs the event loop, so it runs in a thread.
+        (agent_module, import_seconds), (self.supabase, connect_seconds), (_, pool_seconds) = await asyncio.gather(
+            _timed(asyncio.to_thread(importlib.import_module, "agent")),
+            _timed(acreate_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)),
+            _timed(self.browser_pool.start(warm=warm)),
+        )
+        self.browser_agent_cls = agent_module.BrowserAgent
+        if self.llm_factory is None:
+            self.llm_factory = agent_module.create_llm
+        logger.info(
+            f"Startup: agent import {import_seconds:.1f}s, Supabase connect {connect_seconds:.1f}s, "
+            f"browser pool {pool_seconds:.1f}s (in parallel)"
+        )
+
+        self.trace_cache = TraceCache(self.supabase)
+        self.credential_vault = CredentialVault(self.supabase)
+        self.credential_vault.start()
+        self.artifact_store = ArtifactStore(self.supabase)
+        self.artifact_store.start()
+        self.session_registry.start()
+        self.limits.start()
+        self.log_sink.start(self.supabase)
+        self.progress.start(self.supabase)
+        await self.notifier.start(self.supabase)
+        # Requeues what a previous run of this worker left running
+        await self.leases.start(self.supabase)
+        self._mark_ready()
         logger.info(f"Worker {WORKER_ID} started, listening for tasks...")
 
-        # Process any existing pending tasks first
-        await self._process_pending_tasks()
-
-        # Start real-time subscription
+        # The backlog is claimed by the same loop as new tasks, slot by slot
         await self._listen_for_tasks()
 
+    def request_stop(self):
+        """Stop claiming tasks, so start() returns (e.g. on SIGTERM)."""
+        if self.running:
+            logger.info("Shutdown requested, no longer claiming tasks")
+        self.running = False
+        self.notifier.notify()
+
     async def stop(self):
-        """Stop the worker gracefully."""
+        """Stop the worker gracefully, letting in-flight tasks finish."""
         self.running = False
         logger.info(f"Worker {WORKER_ID} stopping...")
+        await self.notifier.stop()
+
+        if self.active_tasks:
+            logger.info(f"Waiting for {len(self.active_tasks)} in-flight tasks to finish...")
+            await asyncio.gather(*self.active_tasks.values(), return_exceptions=True)
+
+        self._clear_ready()
+        await self.leases.close()
+        await self.limits.close()
+        await self.metrics.stop()
+        await self.session_registry.close()
+        await self.log_sink.close()
+        await self.progress.close()
+        if self.credential_vault is not None:
+            await self.credential_vault.close()
+        if self.artifact_store is not None:
+            await self.artifact_store.close()
+            logger.info(f"Artifact stats: {self.artifact_store.stats()}")
+        await self.browser_pool.close()
+        logger.info(f"Browser pool stats: {self.browser_pool.stats.to_dict()}")
+        logger.info(f"Hot resume stats: {self.session_registry.stats()}")
+        logger.info(f"Admission stats: {self.admission.stats()}")
+        logger.info(f"Progress stats: {self.progress.stats()}")
+        logger.info(f"Lease stats: {self.leases.stats()}")
+        logger.info(f"Stopped runs: {self.limits.stats()}")
+
+    def _mark_ready(self):
+        """Report that the worker can run a task immediately."""
+        seconds = _uptime()
+        metrics.TIME_TO_READY_SECONDS.set(seconds)
+        metrics.WORKER_READY.set(1)
+        self.ready.set()
+
+        if WORKER_READY_FILE:
+            try:
+                with open(WORKER_READY_FILE, "w") as f:
+                    f.write(WORKER_ID)
+            except OSError as e:
+                logger.warning(f"Failed to write ready file {WORKER_READY_FILE}: {e}")
+
+        warm = self.browser_pool.stats.launches
+        if not warm:
+            logger.warning("No browser could be pre-launched; the first task will start cold")
+        logger.info(f"Worker ready {seconds:.1f}s after process start ({warm} warm browsers)")
+
+    def _clear_ready(self):
+        metrics.WORKER_READY.set(0)
+        self.ready.clear()
+        if WORKER_READY_FILE:
+            try:
+                os.remove(WORKER_READY_FILE)
+            except OSError:
+                pass
 
-    async def _process_pending_tasks(self):
-        """Process any pending tasks that were created before worker started."""
-        try:
-            result = self.supabase.table("tasks").select("*").eq("status", "pending").execute()
-            tasks = result.data
+    def _dispatch(self, task: dict, resume: bool = False) -> bool:
+        """
+        Run a task in a free execution slot without blocking the caller.
 
-            if tasks:
-                logger.info(f"Found {len(tasks)} pending tasks to process")
-                for task in tasks:
-                    await self._execute_task(task)
-        except Exception as e:
-            logger.error(f"Error processing pending tasks: {e}")
+        Returns:
+            True if the task was scheduled, False if no slot was free or the
+            task is already running in this worker.
+        """
+        task_id = task["id"]
+        if task_id in self.active_tasks or self.free_slots <= 0:
+            return False
+
+        handler = self._resume_task if resume else self._execute_task
+        execution = asyncio.create_task(handler(task), name=f"task-{task_id}")
+        self.active_tasks[task_id] = execution
+        self.limits.watch(task_id, execution)
+        execution.add_done_callback(lambda _: self._on_slot_freed(task_id))
+
+        if not self._first_task_dispatched:
+            self._first_task_dispatched = True
+            seconds = _uptime()
+            metrics.TIME_TO_FIRST_TASK_SECONDS.set(seconds)
+            logger.info(f"First task dispatched {seconds:.1f}s after process start")
+
+        logger.info(f"Task {task_id} dispatched ({len(self.active_tasks)}/{self.max_concurrent_tasks} slots busy)")
+        return True
+
+    def _on_slot_freed(self, task_id: str):
+        """Release a slot and wake the claim loop to refill it."""
+        self.active_tasks.pop(task_id, None)
+        self.limits.release(task_id)
+        self.notifier.notify()
+
+    def _on_task_cancelled(self, task_id: str):
+        """Stop a cancelled task's run, or close its parked session."""
+        if not self.limits.cancel(task_id):
+            asyncio.create_task(self.session_registry.discard(task_id))
+
+    def _on_lease_lost(self, task_id: str):
+        """Stop running (or close the parked session of) a task requeued or now held by another worker."""
+        execution = self.active_tasks.get(task_id)
+        if execution is not None:
+            logger.warning(f"Cancelling task {task_id}: this worker no longer holds it")
+            execution.cancel()
+        elif task_id in self.session_registry.task_ids():
+            logger.info(f"Closing parked session of task {task_id}: resumed by another worker")
+            asyncio.create_task(self.session_registry.discard(task_id))
+
+    async def _fill_slots(self) -> int:
+        """
+        Claim as many tasks as admission control allows and dispatch them.
+
+        Slots it does not admit stay empty and their tasks stay pending.
+
+        Returns:
+            Number of tasks claimed
+        """
+        claimed = 0
+        decision = self.admission.admit(self.free_slots, len(self.active_tasks))
+
+        if decision.admitted > 0:
+            for task in await self._claim("claim_tasks", decision.admitted):
+                logger.info(f"Claimed pending task: {task['id']}")
+                self._dispatch(task)
+                claimed += 1
+
+        # Also pick up tasks that were waiting for secrets and now have input
+        if decision.admitted - claimed > 0:
+            for task in await self._claim("claim_resumable_tasks", decision.admitted - claimed):
+                logger.info(f"Task {task['id']} has user input, resuming...")
+                self._dispatch(task, resume=True)
+                claimed += 1
+
+        if claimed:
+            self.admission.started(claimed)
+            logger.info(f"Admitted {claimed} tasks: {decision.reason}")
+        return claimed
+
+    async def _claim(self, rpc_name: str, limit: int) -> List[dict]:
+        """
+        Atomically claim up to `limit` tasks for this worker.
+
+        The RPC locks rows with FOR UPDATE SKIP LOCKED and stamps them with
+        WORKER_ID and a lease, so replicas never receive the same task.
+        """
+        params = {"p_worker_id": WORKER_ID, "p_limit": limit, "p_lease_seconds": TASK_LEASE_SECONDS}
+        if rpc_name == "claim_resumable_tasks":
+            # Tasks parked by another worker wait for it this long
+            params["p_affinity_seconds"] = RESUME_AFFINITY_SECONDS
+        result = await self.supabase.rpc(rpc_name, params).execute()
+        return result.data or []
 
     async def _listen_for_tasks(self):
         """
-        Listen for new tasks via polling.
-        
-        Note: Supabase Python client realtime support is still evolving.
-        Using polling as a reliable fallback.
+        Claim tasks whenever the notifier wakes us.
+
+        Supabase Realtime pushes new, requeued and cancelled tasks so new work
+        is picked up immediately. Polling remains as a fallback, starting at
+        POLL_INTERVAL and backing off while the queue is idle; it also finds
+        tasks whose user provided input.
         """
-        logger.info("Starting task polling loop...")
+        logger.info("Starting task dispatch loop...")
         
         while self.running:
+            claimed = 0
             try:
-                # Check for pending tasks
-                result = (
-                    self.supabase.table("tasks")
-                    .select("*")
-                    .eq("status", "pending")
-                    .order("created_at", desc=False)
-                    .limit(1)
-                    .execute()
-                )
-
-                if result.data:
-                    task = result.data[0]
-                    logger.info(f"Found pending task: {task['id']}")
-                    await self._execute_task(task)
-
-                # Also check for tasks that were waiting for secrets and now have input
-                result = (
-                    self.supabase.table("tasks")
-                    .select("*")
-                    .eq("status", "running")
-                    .not_.is_("user_provided_input", "null")
-                    .limit(1)
-                    .execute()
-                )
-
-                if result.data:
-                    task = result.data[0]
-                    if task.get("user_provided_input"):
-                        logger.info(f"Task {task['id']} has user input, resuming...")
-                        await self._resume_task(task)
-
+                claimed = await self._fill_slots()
             except Exception as e:
-                logger.error(f"Error in polling loop: {e}")
+                logger.error(f"Error in dispatch loop: {e}")
 
-            # Poll every 10 seconds to save quota
-            await asyncio.sleep(10)
+            # Keep polling at the base interval while shedding load, and while
+            # a parked session waits for input (Realtime does not send resumes)
+            await self.notifier.wait(
+                found_work=claimed > 0 or self.admission.shedding or len(self.session_registry) > 0
+            )
 
     async def _execute_task(self, task: dict):
         """Execute a single task using the browser agent."""
@@ -129,40 +380,67 @@ class TaskWorker:
         logger.info(f"Executing task {task_id}: {prompt[:50]}...")
 
         try:
-            # Update status to running
-            self.supabase.table("tasks").update({
-                "status": "running",
-                "started_at": "now()",
-            }).eq("id", task_id).execute()
-
+            # Status is already 'running': claim_tasks set it when claiming
             # Log the start
             await self._append_log(task_id, f"Starting task execution...", "info")
             await self._append_log(task_id, f"Prompt: {prompt}", "info")
 
-            # Execute with browser-use
-            result = await self.agent.run_task(task_id, prompt)
-
-            # Update task with result
-            self.supabase.table("tasks").update({
-                "status": "completed",
-                "result": result,
-                "completed_at": "now()",
-            }).eq("id", task_id).execute()
+            # Execute with browser-use, using an agent dedicated to this slot
+            agent = self.browser_agent_cls(
+                self.supabase, self.browser_pool, self.log_sink, self.session_registry, self.trace_cache,
+                llm_factory=self.llm_factory, credential_vault=self.credential_vault,
+                artifact_store=self.artifact_store, progress=self.progress,
+            )
+            result = await agent.run_task(
+                task_id, prompt, user_id=task.get("user_id"), task_type=task.get("task_type"),
+            )
+
+            # The agent already moved the task to waiting_for_secret
+            if result.get("waiting_for_input"):
+                logger.info(f"Task {task_id} paused, waiting for user input")
+                return
+
+            # Update task with result, unless it was cancelled or requeued meanwhile
+            await self.log_sink.flush(task_id)
+            with db_write("update_task_status"):
+                await self.supabase.table("tasks").update({
+                    "status": "completed",
+                    "result": result,
+                    "progress": 100,
+                    "completed_at": "now()",
+                    "lease_expires_at": None,
+                    "browser_state": None,
+                }).eq("id", task_id).eq("worker_id", WORKER_ID).eq("status", "running").execute()
 
             await self._append_log(task_id, "Task completed successfully!", "success")
             logger.info(f"Task {task_id} completed successfully")
 
+        except asyncio.CancelledError:
+            reason = self.limits.reason(task_id)
+            if reason is None:
+                # Shutdown, or the task was taken over by another worker
+                raise
+            await self._record_stop(task_id, reason)
+
         except Exception as e:
             logger.error(f"Task {task_id} failed: {e}")
             
-            self.supabase.table("tasks").update({
-                "status": "failed",
-                "error_message": str(e),
-                "completed_at": "now()",
-            }).eq("id", task_id).execute()
+            await self.log_sink.flush(task_id)
+            with db_write("update_task_status"):
+                await self.supabase.table("tasks").update({
+                    "status": "failed",
+                    "error_message": str(e),
+                    "completed_at": "now()",
+                    "lease_expires_at": None,
+                    "browser_state": None,
+                }).eq("id", task_id).eq("worker_id", WORKER_ID).eq("status", "running").execute()
 
             await self._append_log(task_id, f"Task failed: {str(e)}", "error")
 
+        finally:
+            self.progress.close_task(task_id)
+            await self.log_sink.close_task(task_id)
+
     async def _resume_task(self, task: dict):
         """Resume a task after user provided input."""
         task_id = task["id"]
@@ -174,49 +452,113 @@ class TaskWorker:
             await self._append_log(task_id, "Received user input, resuming...", "info")
 
             # Clear the user_provided_input so we don't pick it up again
-            self.supabase.table("tasks").update({
+            await self.supabase.table("tasks").update({
                 "user_provided_input": None,
             }).eq("id", task_id).execute()
 
-            # Resume agent with the secret
-            result = await self.agent.resume_with_input(task_id, user_input)
-
-            self.supabase.table("tasks").update({
-                "status": "completed",
-                "result": result,
-                "completed_at": "now()",
-            }).eq("id", task_id).execute()
+            # Resume agent with the secret, on its still-running session if parked
+            agent = self.session_registry.take(task_id)
+            if agent is not None:
+                result = await agent.resume_live(task_id, user_input)
+            else:
+                agent = self.browser_agent_cls(
+                    self.supabase, self.browser_pool, self.log_sink, self.session_registry, self.trace_cache,
+                    llm_factory=self.llm_factory, credential_vault=self.credential_vault,
+                    artifact_store=self.artifact_store, progress=self.progress,
+                )
+                result = await agent.resume_with_input(task_id, user_input)
+
+            if result.get("waiting_for_input"):
+                logger.info(f"Task {task_id} paused again, waiting for user input")
+                return
+
+            await self.log_sink.flush(task_id)
+            with db_write("update_task_status"):
+                await self.supabase.table("tasks").update({
+                    "status": "completed",
+                    "result": result,
+                    "progress": 100,
+                    "completed_at": "now()",
+                    "lease_expires_at": None,
+                    "browser_state": None,
+                }).eq("id", task_id).eq("worker_id", WORKER_ID).eq("status", "running").execute()
 
             await self._append_log(task_id, "Task completed successfully!", "success")
 
+        except asyncio.CancelledError:
+            reason = self.limits.reason(task_id)
+            if reason is None:
+                raise
+            await self._record_stop(task_id, reason)
+
         except Exception as e:
             logger.error(f"Task {task_id} failed after resume: {e}")
             
-            self.supabase.table("tasks").update({
-                "status": "failed",
-                "error_message": str(e),
-            }).eq("id", task_id).execute()
+            await self.log_sink.flush(task_id)
+            with db_write("update_task_status"):
+                await self.supabase.table("tasks").update({
+                    "status": "failed",
+                    "error_message": str(e),
+                    "lease_expires_at": None,
+                    "browser_state": None,
+                }).eq("id", task_id).eq("worker_id", WORKER_ID).eq("status", "running").execute()
+
+        finally:
+            self.progress.close_task(task_id)
+            await self.log_sink.close_task(task_id)
+
+    async def _record_stop(self, task_id: str, reason: StopReason):
+        """Mark a stopped run's task with the reason it was stopped."""
+        logger.info(f"Task {task_id} stopped: {reason.message}")
+        await self._append_log(task_id, f"Task stopped: {reason.message}", "error")
+        await self.log_sink.flush(task_id)
+        with db_write("update_task_status"):
+            await self.supabase.table("tasks").update({
+                "status": reason.status,
+                "error_message": reason.message,
+                "completed_at": "now()",
+                "lease_expires_at": None,
+                "browser_state": None,
+            }).eq("id", task_id).eq("worker_id", WORKER_ID).execute()
 
     async def _append_log(self, task_id: str, message: str, log_type: str = "info"):
-        """Append a log entry to the task's logs array."""
-        try:
-            # Use the RPC function we defined in the schema
-            self.supabase.rpc(
-                "append_task_log",
-                {"task_id": task_id, "log_message": message, "log_type": log_type}
-            ).execute()
-        except Exception as e:
-            logger.warning(f"Failed to append log: {e}")
+        """Append a log entry to the task's logs (batched by the log sink)."""
+        await self.log_sink.write(task_id, message, log_type)
+
+
+def _uptime() -> float:
+    """Seconds since this process started (interpreter start-up included)."""
+    return time.time() - psutil.Process().create_time()
+
+
+async def _timed(awaitable) -> tuple:
+    """Await something and return (result, seconds it took)."""
+    started = time.monotonic()
+    result = await awaitable
+    return result, time.monotonic() - started
+
+
+def install_signal_handlers(worker: TaskWorker):
+    """
+    SIGTERM (docker stop, the supervisor) and Ctrl+C stop claiming work;
+    stop() then lets in-flight tasks finish. browser-use's own handlers are
+    disabled (see agent.py), so these stay in place while agents run.
+    """
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.request_stop)
 
 
 async def main():
     """Main entry point."""
+    if not os.getenv("ANTHROPIC_API_KEY"):
+        raise ValueError("ANTHROPIC_API_KEY must be set")
+
     worker = TaskWorker()
-    
+    install_signal_handlers(worker)
+
     try:
         await worker.start()
-    except KeyboardInterrupt:
-        logger.info("Keyboard interrupt received")
     finally:
         await worker.stop()
 
@@ -0,0 +1,315 @@
+"""
+Worker Metrics - Per-step timing and worker gauges
+
+Breaks each task's wall-clock time down by where it goes, and exposes worker
+health on a Prometheus-style HTTP endpoint.
+
+Per task (summarized into the task result, and aggregated as histograms):
+1. LLM call latency and tokens in/out
+2. Browser action latency
+3. Page-load time of each newly loaded page
+4. DB write latency
+
+Per worker (gauges, sampled every METRICS_SAMPLE_INTERVAL seconds):
+queue depth, active slots, browser RSS and event-loop lag. Startup gauges
+(readiness, time to ready, time to first task) are set by TaskWorker.
+
+Under the supervisor (supervisor.py) every worker process records into
+PROMETHEUS_MULTIPROC_DIR and the supervisor serves the host-wide roll-up:
+counters and histograms add up, slot, RSS and readiness gauges are summed
+over live processes, and queue depth, loop lag and time to ready take the
+worst process.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from typing import Callable, Dict, List, Optional, Iterator
+
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+logger = logging.getLogger("autoagent.metrics")
+
+# Metrics configuration
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+METRICS_SAMPLE_INTERVAL = float(os.getenv("METRICS_SAMPLE_INTERVAL", "15"))
+
+# Per-step hot path
+STEP_SECONDS = Histogram(
+    "autoagent_step_seconds", "Wall-clock time of one agent step",
+    buckets=(0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300),
+)
+LLM_CALL_SECONDS = Histogram(
+    "autoagent_llm_call_seconds", "LLM call latency",
+    buckets=(0.5, 1, 2, 5, 10, 20, 30, 60, 120),
+)
+LLM_TOKENS = Counter("autoagent_llm_tokens_total", "LLM tokens", ["direction"])
+ACTION_SECONDS = Histogram(
+    "autoagent_browser_action_seconds", "Latency of the browser actions of one step",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30),
+)
+PAGE_LOAD_SECONDS = Histogram(
+    "autoagent_page_load_seconds", "Navigation start to load event of a page",
+    buckets=(0.25, 0.5, 1, 2, 5, 10, 20, 30),
+)
+DB_WRITE_SECONDS = Histogram(
+    "autoagent_db_write_seconds", "Latency of worker database writes", ["operation"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5),
+)
+REQUESTS_BLOCKED = Counter(
+    "autoagent_requests_blocked_total", "Requests failed by the execution profile's blocklist", ["resource_type"],
+)
+BLOCKED_BYTES_ESTIMATE = Counter(
+    "autoagent_blocked_bytes_estimate_total", "Estimated response bytes saved by blocked requests",
+)
+ARTIFACTS = Counter(
+    "autoagent_artifacts_total", "Step screenshots offered to the artifact store", ["outcome"],
+)
+ARTIFACT_BYTES = Counter(
+    "autoagent_artifact_bytes_total", "Screenshot bytes as captured (raw) and as newly stored (stored)", ["stage"],
+)
+ARTIFACT_UPLOADS = Counter("autoagent_artifact_uploads_total", "Artifact uploads to storage", ["outcome"])
+PROGRESS_REPORTS = Counter("autoagent_progress_reports_total", "Per-step progress reports from agents")
+PROGRESS_WRITES = Counter("autoagent_progress_writes_total", "Coalesced progress updates written to tasks rows")
+
+# Worker gauges
+QUEUE_DEPTH = Gauge("autoagent_queue_depth", "Pending tasks in the queue", multiprocess_mode="livemax")
+ACTIVE_SLOTS = Gauge("autoagent_active_slots", "Execution slots running a task", multiprocess_mode="livesum")
+TOTAL_SLOTS = Gauge("autoagent_total_slots", "Execution slots of this worker", multiprocess_mode="livesum")
+BROWSER_RSS_MB = Gauge("autoagent_browser_rss_mb", "Resident memory of pooled browsers, in MB", multiprocess_mode="livesum")
+ADMISSION_DEFERRED = Counter("autoagent_admission_deferred_total", "Free slots left idle by admission control")
+WORKER_READY = Gauge("autoagent_worker_ready", "1 once the worker can run a task immediately", multiprocess_mode="livesum")
+TIME_TO_READY_SECONDS = Gauge("autoagent_time_to_ready_seconds", "Process start to worker ready", multiprocess_mode="livemax")
+TIME_TO_FIRST_TASK_SECONDS = Gauge(
+    "autoagent_time_to_first_task_seconds", "Process start to the first task dispatched", multiprocess_mode="livemin",
+)
+TASKS_REAPED = Counter("autoagent_tasks_reaped_total", "Tasks with an expired lease, requeued or failed", ["outcome"])
+VAULT_SIGN_INS = Counter("autoagent_vault_sign_ins_total", "Login forms answered with vault credentials instead of the user")
+TASKS_STOPPED = Counter("autoagent_tasks_stopped_total", "Runs stopped by cancellation, deadline or token budget", ["reason"])
+LEASES_LOST = Counter("autoagent_leases_lost_total", "Running tasks this worker found requeued or taken over")
+LOOP_LAG_SECONDS = Gauge(
+    "autoagent_event_loop_lag_seconds", "Worst event-loop timer delay over the last sample interval", multiprocess_mode="livemax",
+)
+
+
+@dataclass
+class StepTiming:
+    """Where one agent step spent its time."""
+
+    step: int
+    seconds: float = 0.0
+    llm_seconds: float = 0.0
+    llm_calls: int = 0
+    tokens_in: int = 0
+    tokens_out: int = 0
+    action_seconds: float = 0.0
+    page_load_seconds: float = 0.0
+    db_write_seconds: float = 0.0
+
+
+@dataclass
+class TaskMetrics:
+    """Per-step timings of one task run."""
+
+    task_id: str
+    steps: List[StepTiming] = field(default_factory=list)
+    started_at: float = field(default_factory=time.monotonic)
+    # Time recorded outside any step (e.g. log writes before the first step)
+    unassigned: StepTiming = field(default_factory=lambda: StepTiming(step=0))
+    _step_started: Optional[float] = None
+
+    @property
+    def current(self) -> StepTiming:
+        return self.steps[-1] if self._step_started is not None else self.unassigned
+
+    def start_step(self, step: int):
+        self.steps.append(StepTiming(step=step))
+        self._step_started = time.monotonic()
+
+    def end_step(self):
+        if self._step_started is None:
+            return
+        timing = self.steps[-1]
+        timing.seconds = time.monotonic() - self._step_started
+        STEP_SECONDS.observe(timing.seconds)
+        self._step_started = None
+
+    def record_llm_call(self, seconds: float, tokens_in: int, tokens_out: int):
+        timing = self.current
+        timing.llm_seconds += seconds
+        timing.llm_calls += 1
+        timing.tokens_in += tokens_in
+        timing.tokens_out += tokens_out
+        LLM_CALL_SECONDS.observe(seconds)
+        LLM_TOKENS.labels("in").inc(tokens_in)
+        LLM_TOKENS.labels("out").inc(tokens_out)
+
+    def record_actions(self, seconds: float):
+        self.current.action_seconds += seconds
+        ACTION_SECONDS.observe(seconds)
+
+    def record_page_load(self, seconds: float):
+        self.current.page_load_seconds += seconds
+        PAGE_LOAD_SECONDS.observe(seconds)
+
+    def record_db_write(self, seconds: float):
+        self.current.db_write_seconds += seconds
+
+    def summary(self) -> dict:
+        """Totals and per-step breakdown for the task result."""
+        timings = self.steps + [self.unassigned]
+        totals = {
+            "wall_seconds": time.monotonic() - self.started_at,
+            "steps": len(self.steps),
+        }
+        for name in ("llm_seconds", "llm_calls", "tokens_in", "tokens_out",
+                     "action_seconds", "page_load_seconds", "db_write_seconds"):
+            totals[name] = sum(getattr(t, name) for t in timings)
+
+        accounted = totals["llm_seconds"] + totals["action_seconds"] + totals["db_write_seconds"]
+        totals["other_seconds"] = max(0.0, totals["wall_seconds"] - accounted)
+
+        summary = {k: round(v, 3) if isinstance(v, float) else v for k, v in totals.items()}
+        summary["per_step"] = [
+            {k: round(v, 3) if isinstance(v, float) else v for k, v in asdict(t).items()}
+            for t in self.steps
+        ]
+        return summary
+
+
+# Metrics of the task runs in flight, so shared writers can attribute time
+_active: Dict[str, TaskMetrics] = {}
+
+
+def track_task(task_id: str) -> TaskMetrics:
+    """Start collecting metrics for a task run."""
+    metrics = TaskMetrics(task_id)
+    _active[task_id] = metrics
+    return metrics
+
+
+def untrack_task(task_id: str):
+    _active.pop(task_id, None)
+
+
+def tokens_used(task_id: str) -> int:
+    """LLM tokens (in and out) the task's current run, and its subtasks, have used so far."""
+    runs = [m for key, m in _active.items() if key == task_id or key.startswith(f"{task_id}/")]
+    return sum(t.tokens_in + t.tokens_out for m in runs for t in m.steps + [m.unassigned])
+
+
+@contextmanager
+def db_write(operation: str, task_id: Optional[str] = None) -> Iterator[None]:
+    """Time a database write, attributing it to the task if it is being tracked."""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        seconds = time.monotonic() - started
+        DB_WRITE_SECONDS.labels(operation).observe(seconds)
+        metrics = _active.get(task_id) if task_id else None
+        if metrics is not None:
+            metrics.record_db_write(seconds)
+
+
+def instrument_llm(llm, get_metrics: Callable[[], TaskMetrics]):
+    """Wrap llm.ainvoke to time every call and count its tokens."""
+    original_ainvoke = llm.ainvoke
+
+    async def timed_ainvoke(*args, **kwargs):
+        started = time.monotonic()
+        result = await original_ainvoke(*args, **kwargs)
+        usage = getattr(result, "usage", None)
+        get_metrics().record_llm_call(
+            time.monotonic() - started,
+            getattr(usage, "prompt_tokens", 0) or 0,
+            getattr(usage, "completion_tokens", 0) or 0,
+        )
+        return result
+
+    setattr(llm, "ainvoke", timed_ainvoke)
+    return llm
+
+
+def instrument_actions(agent, get_metrics: Callable[[], TaskMetrics]):
+    """Wrap agent.multi_act to time the browser actions of every step."""
+    original_multi_act = agent.multi_act
+
+    async def timed_multi_act(*args, **kwargs):
+        started = time.monotonic()
+        try:
+            return await original_multi_act(*args, **kwargs)
+        finally:
+            get_metrics().record_actions(time.monotonic() - started)
+
+    setattr(agent, "multi_act", timed_multi_act)
+    return agent
+
+
+class WorkerMetrics:
+    """
+    Samples worker gauges and serves all metrics over HTTP.
+
+    Usage:
+        worker_metrics = WorkerMetrics(worker)
+        worker_metrics.start()
+        ...
+        await worker_metrics.stop()
+    """
+
+    def __init__(self, worker, port: int = METRICS_PORT, sample_interval: float = METRICS_SAMPLE_INTERVAL):
+        self.worker = worker
+        self.port = port
+        self.sample_interval = sample_interval
+        self._sampler: Optional[asyncio.Task] = None
+        self._lag_probe: Optional[asyncio.Task] = None
+        self._max_lag = 0.0
+
+    def start(self):
+        """Start the HTTP endpoint (if METRICS_PORT is set) and the samplers."""
+        if self.port:
+            try:
+                start_http_server(self.port)
+                logger.info(f"Serving metrics on :{self.port}/metrics")
+            except OSError as e:
+                logger.warning(f"Metrics endpoint unavailable on port {self.port}: {e}")
+
+        TOTAL_SLOTS.set(self.worker.max_concurrent_tasks)
+        self._sampler = asyncio.create_task(self._sample_periodically())
+        self._lag_probe = asyncio.create_task(self._probe_loop_lag())
+
+    async def stop(self):
+        for task in (self._sampler, self._lag_probe):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._sampler = self._lag_probe = None
+
+    async def _sample_periodically(self):
+        while True:
+            ACTIVE_SLOTS.set(len(self.worker.active_tasks))
+            BROWSER_RSS_MB.set(self.worker.browser_pool.rss_mb())
+            LOOP_LAG_SECONDS.set(self._max_lag)
+            self._max_lag = 0.0
+            try:
+                result = await self.worker.supabase.table("tasks").select(
+                    "id", count="exact", head=True
+                ).eq("status", "pending").execute()
+                QUEUE_DEPTH.set(result.count or 0)
+            except Exception as e:
+                logger.debug(f"Failed to sample queue depth: {e}")
+            await asyncio.sleep(self.sample_interval)
+
+    async def _probe_loop_lag(self, interval: float = 0.5):
+        # A timer that fires late means something blocked the loop
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            self._max_lag = max(self._max_lag, loop.time() - expected)
@@ -0,0 +1,152 @@
+"""
+Task Progress - Coalesced progress and partial results on the tasks row
+
+While a task runs, clients watch its tasks row. The agent reports after
+every step:
+1. progress: steps used against the step budget, 0-99 (100 is written with
+   the final result)
+2. result: {"partial": true, "extracted": [...]}, the latest content the
+   agent extracted from pages, until the final result replaces it
+
+Reports only update what is pending in memory. Every PROGRESS_FLUSH_INTERVAL
+seconds each task with pending changes gets at most one row update, holding
+only the fields whose value differs from what was last written. Updates are
+fenced on this worker and the running status, so a late write can never
+land on a task that has finished, paused or moved to another worker.
+"""
+
+import os
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from supabase import AsyncClient
+
+import metrics
+
+logger = logging.getLogger("autoagent.progress")
+
+# Progress configuration
+PROGRESS_FLUSH_INTERVAL = float(os.getenv("PROGRESS_FLUSH_INTERVAL", "2.0"))
+PROGRESS_MAX_PARTIAL_RESULTS = int(os.getenv("PROGRESS_MAX_PARTIAL_RESULTS", "5"))
+PROGRESS_MAX_PARTIAL_CHARS = int(os.getenv("PROGRESS_MAX_PARTIAL_CHARS", "2000"))
+
+
+class ProgressPublisher:
+    """
+    Coalesces per-step progress reports into small, infrequent row updates.
+
+    Usage:
+        publisher = ProgressPublisher(worker_id)
+        publisher.start(supabase)
+        publisher.report(task_id, progress=40, partial_results=["Price: $12"])
+        publisher.close_task(task_id)  # when the task's run ends
+        await publisher.close()        # on shutdown
+    """
+
+    def __init__(
+        self,
+        worker_id: str,
+        flush_interval: float = PROGRESS_FLUSH_INTERVAL,
+        max_partial_results: int = PROGRESS_MAX_PARTIAL_RESULTS,
+        max_partial_chars: int = PROGRESS_MAX_PARTIAL_CHARS,
+    ):
+        self.worker_id = worker_id
+        self.flush_interval = flush_interval
+        self.max_partial_results = max_partial_results
+        self.max_partial_chars = max_partial_chars
+
+        self.supabase: Optional[AsyncClient] = None
+        self.reports = 0
+        self.writes = 0
+        # task_id -> fields reported since the last write / as last written
+        self._pending: Dict[str, dict] = {}
+        self._written: Dict[str, dict] = {}
+        self._flusher: Optional[asyncio.Task] = None
+
+    def start(self, supabase: AsyncClient):
+        """Start the background flusher."""
+        self.supabase = supabase
+        self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def close(self):
+        """Stop the background flusher and write what is still pending."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+
+        await self.flush()
+
+    def report(self, task_id: str, progress: Optional[int] = None, partial_results: Optional[List[str]] = None):
+        """
+        Record a task's latest progress; written with the next flush.
+
+        Args:
+            task_id: The task
+            progress: Percent done, capped at 99 while the task runs
+            partial_results: Everything extracted so far (only the latest
+                PROGRESS_MAX_PARTIAL_RESULTS are published, each truncated)
+        """
+        pending = self._pending.setdefault(task_id, {})
+        if progress is not None:
+            pending["progress"] = max(0, min(99, int(progress)))
+        if partial_results:
+            pending["result"] = {
+                "partial": True,
+                "extracted": [text[:self.max_partial_chars] for text in partial_results[-self.max_partial_results:]],
+            }
+        self.reports += 1
+        metrics.PROGRESS_REPORTS.inc()
+
+    def close_task(self, task_id: str):
+        """Forget a finished run; its final status update supersedes anything pending."""
+        self._pending.pop(task_id, None)
+        self._written.pop(task_id, None)
+
+    async def flush(self, task_id: Optional[str] = None):
+        """Write pending changes for one task, or for every task if none given."""
+        task_ids = [task_id] if task_id is not None else list(self._pending)
+        for tid in task_ids:
+            await self._flush_task(tid)
+
+    def stats(self) -> dict:
+        return {"reports": self.reports, "writes": self.writes}
+
+    async def _flush_task(self, task_id: str):
+        pending = self._pending.pop(task_id, None)
+        if not pending:
+            return
+
+        written = self._written.setdefault(task_id, {})
+        changed = {field: value for field, value in pending.items() if written.get(field) != value}
+        if not changed:
+            return
+
+        try:
+            with metrics.db_write("update_task_progress", task_id):
+                await self.supabase.table("tasks").update(changed).eq(
+                    "id", task_id
+                ).eq("worker_id", self.worker_id).eq("status", "running").execute()
+        except Exception as e:
+            logger.warning(f"Failed to write progress for task {task_id}: {e}")
+            # Retry with the next flush (newer values win), unless the run ended
+            if task_id in self._written:
+                self._pending[task_id] = {**changed, **self._pending.get(task_id, {})}
+            return
+
+        self.writes += 1
+        metrics.PROGRESS_WRITES.inc()
+        # If the run ended during the write, this dict is already forgotten
+        written.update(changed)
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f"Error flushing task progress: {e}")
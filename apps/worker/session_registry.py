@@ -0,0 +1,203 @@
+"""
+Paused Session Registry - Keep paused browser sessions alive for hot resume
+
+A task that pauses for a 2FA code usually gets its answer within seconds.
+Even with a browser-state snapshot, a cold resume pays for a browser launch
+and page reloads. The registry keeps the paused BrowserAgent, with its live
+browser and agent, in memory so the resume can continue immediately.
+
+Bounds:
+1. At most HOT_RESUME_MAX_SESSIONS sessions
+2. At most HOT_RESUME_MAX_MEMORY_MB of browser RSS across sessions
+3. Sessions older than HOT_RESUME_TTL seconds are closed
+
+The least recently parked session is evicted first. An evicted task still has
+its snapshot in tasks.browser_state, so its resume falls back to a cold one.
+
+A parked task is marked with parked_at, and claim_resumable_tasks() leaves it
+to this worker for RESUME_AFFINITY_SECONDS after the input arrives. If
+another worker resumes it after all, the lease heartbeat reports the task as
+no longer held and the worker discards the session.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from agent import BrowserAgent
+
+logger = logging.getLogger("autoagent.session_registry")
+
+# Registry configuration
+HOT_RESUME_MAX_SESSIONS = int(os.getenv("HOT_RESUME_MAX_SESSIONS", "2"))
+HOT_RESUME_MAX_MEMORY_MB = float(os.getenv("HOT_RESUME_MAX_MEMORY_MB", "1500"))
+HOT_RESUME_TTL = float(os.getenv("HOT_RESUME_TTL", "180"))
+RESUME_AFFINITY_SECONDS = int(os.getenv("RESUME_AFFINITY_SECONDS", "15"))
+
+
+@dataclass
+class PausedSession:
+    """A paused BrowserAgent whose browser is still running."""
+
+    task_id: str
+    agent: "BrowserAgent"
+    parked_at: float
+    rss_mb: float
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.parked_at
+
+
+class PausedSessionRegistry:
+    """
+    Bounded, LRU-evicted registry of paused sessions keyed by task ID.
+
+    Usage:
+        registry = PausedSessionRegistry()
+        registry.start()
+        parked = await registry.park(task_id, agent)  # on pause
+        agent = registry.take(task_id)                # on resume, None if evicted
+        await registry.close()                        # on shutdown
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = HOT_RESUME_MAX_SESSIONS,
+        max_memory_mb: float = HOT_RESUME_MAX_MEMORY_MB,
+        ttl: float = HOT_RESUME_TTL,
+    ):
+        self.max_sessions = max(0, max_sessions)
+        self.max_memory_mb = max_memory_mb
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._sessions: "OrderedDict[str, PausedSession]" = OrderedDict()
+        self._sweeper: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_sessions > 0
+
+    @property
+    def memory_mb(self) -> float:
+        return sum(s.rss_mb for s in self._sessions.values())
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def start(self):
+        """Start the background TTL sweeper."""
+        if self.enabled:
+            self._sweeper = asyncio.create_task(self._sweep_periodically())
+
+    async def close(self):
+        """Stop the sweeper and close every parked session."""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+        await self._close_all(list(self._sessions.values()), "shutdown")
+        self._sessions.clear()
+
+    async def park(self, task_id: str, agent: "BrowserAgent") -> bool:
+        """
+        Keep a paused agent's session alive, evicting older sessions to fit.
+
+        Returns:
+            True if the session was parked; False if it does not fit, in which
+            case the caller closes it as usual
+        """
+        if not self.enabled:
+            return False
+
+        rss_mb = agent.browser_rss_mb()
+        if rss_mb > self.max_memory_mb:
+            logger.info(f"Not parking task {task_id}: browser uses {rss_mb:.0f}MB")
+            return False
+
+        evicted: List[PausedSession] = []
+        previous = self._sessions.pop(task_id, None)
+        if previous is not None:
+            evicted.append(previous)
+        while self._sessions and (
+            len(self._sessions) >= self.max_sessions
+            or self.memory_mb + rss_mb > self.max_memory_mb
+        ):
+            _, oldest = self._sessions.popitem(last=False)
+            evicted.append(oldest)
+
+        self._sessions[task_id] = PausedSession(task_id, agent, time.monotonic(), rss_mb)
+        logger.info(
+            f"Parked session for task {task_id} ({rss_mb:.0f}MB, "
+            f"{len(self._sessions)} parked, {self.memory_mb:.0f}MB total)"
+        )
+
+        # Close evicted sessions without holding up the pausing task
+        if evicted:
+            asyncio.create_task(self._close_all(evicted, "evicted"))
+        return True
+
+    def take(self, task_id: str) -> Optional["BrowserAgent"]:
+        """Remove and return the live session for a task, or None if there is none."""
+        session = self._sessions.pop(task_id, None)
+        if session is None or session.age > self.ttl:
+            self.misses += 1
+            if session is not None:
+                asyncio.create_task(self._close_all([session], "expired"))
+            return None
+
+        self.hits += 1
+        logger.info(f"Hot resume for task {task_id} after {session.age:.1f}s")
+        return session.agent
+
+    def task_ids(self) -> List[str]:
+        """Tasks with a parked session."""
+        return list(self._sessions)
+
+    async def discard(self, task_id: str):
+        """Close a task's parked session, e.g. when the task was cancelled."""
+        session = self._sessions.pop(task_id, None)
+        if session is not None:
+            await self._close_all([session], "discarded")
+
+    def stats(self) -> dict:
+        return {
+            "parked": len(self._sessions),
+            "memory_mb": round(self.memory_mb, 1),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    async def _close_all(self, sessions: List[PausedSession], reason: str):
+        for session in sessions:
+            if reason != "shutdown":
+                self.evictions += 1
+            logger.info(f"Closing parked session for task {session.task_id} ({reason})")
+            try:
+                await session.agent.close_session()
+            except Exception as e:
+                logger.warning(f"Failed to close parked session for task {session.task_id}: {e}")
+
+    async def _sweep_periodically(self):
+        interval = max(1.0, min(self.ttl / 4, 30.0))
+        while True:
+            await asyncio.sleep(interval)
+            expired = [s for s in self._sessions.values() if s.age > self.ttl]
+            for session in expired:
+                del self._sessions[session.task_id]
+            if expired:
+                await self._close_all(expired, "expired")
@@ -0,0 +1,247 @@
+"""
+Worker Supervisor - Run several worker processes on one host
+
+One worker process runs every task on a single event loop, so a host with
+more cores than one loop can use runs several. The supervisor:
+1. Starts WORKER_PROCESSES workers (main.py), each with its own event loop
+   and a WORKER_ID suffixed with its slot number
+2. Restarts a worker that exits unexpectedly, backing off while it keeps
+   crashing
+3. On SIGTERM or SIGINT, forwards SIGTERM so every worker stops claiming and
+   finishes its in-flight tasks; a second signal kills them
+4. Serves the host's metrics on METRICS_PORT, rolled up over all workers
+5. Reports the host ready (WORKER_READY_FILE) while any worker is ready
+
+Workers share the claim path as they would across hosts: claim_tasks() hands
+each pending task to exactly one worker ID. A slot keeps its WORKER_ID across
+restarts, so a restarted worker reaps the tasks its crashed predecessor left
+running. MAX_CONCURRENT_TASKS and the browser pool are per worker process;
+host-wide budgets (admission headroom, the artifact cache) are split between
+the processes, which learn their slot from WORKER_SLOT and WORKER_PROCESSES.
+"""
+
+import os
+import sys
+import time
+import signal
+import shutil
+import socket
+import asyncio
+import logging
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(
+    level=getattr(logging, os.getenv("LOG_LEVEL", "INFO")),
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger("autoagent.supervisor")
+
+
+def _cpu_count() -> int:
+    """CPUs this container may use: its cgroup quota, else its CPU affinity."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return max(1, int(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+# Supervisor configuration
+WORKER_PROCESSES = os.getenv("WORKER_PROCESSES", "auto")
+WORKER_ID = os.getenv("WORKER_ID") or f"worker-{socket.gethostname()}"
+WORKER_READY_FILE = os.getenv("WORKER_READY_FILE", "/tmp/autoagent-worker-ready")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR", "/tmp/autoagent-metrics")
+
+# Restart backoff (seconds); a worker that ran this long is considered healthy
+RESTART_BACKOFF_MIN = 1.0
+RESTART_BACKOFF_MAX = 60.0
+HEALTHY_RUN_SECONDS = 300.0
+
+# How often worker ready files are checked (seconds)
+READY_CHECK_INTERVAL = 2.0
+
+
+def process_count(value: str = WORKER_PROCESSES) -> int:
+    """Number of worker processes: a number, or "auto" for one per usable CPU."""
+    if value.strip().lower() == "auto":
+        return _cpu_count()
+    return max(1, int(value))
+
+
+class WorkerSlot:
+    """One supervised worker process, restarted whenever it dies."""
+
+    def __init__(self, index: int, count: int):
+        self.index = index
+        self.count = count
+        self.worker_id = f"{WORKER_ID}-{index}"
+        self.ready_file = f"{WORKER_READY_FILE}.{index}" if WORKER_READY_FILE else ""
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.restarts = 0
+
+    def env(self) -> Dict[str, str]:
+        env = dict(os.environ)
+        env.update({
+            "WORKER_ID": self.worker_id,
+            "WORKER_READY_FILE": self.ready_file,
+            "WORKER_SLOT": str(self.index),
+            "WORKER_PROCESSES": str(self.count),
+            "PROMETHEUS_MULTIPROC_DIR": PROMETHEUS_MULTIPROC_DIR,
+            # The supervisor serves the rolled-up endpoint
+            "METRICS_PORT": "0",
+        })
+        return env
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.ready_file) and os.path.exists(self.ready_file)
+
+
+class Supervisor:
+    """
+    Starts, restarts and stops the worker processes of one host.
+
+    Usage:
+        supervisor = Supervisor(process_count())
+        await supervisor.run()  # until SIGTERM/SIGINT and every worker has exited
+    """
+
+    def __init__(self, processes: int):
+        self.slots = [WorkerSlot(i, processes) for i in range(processes)]
+        self.stopping = False
+        self._signals = 0
+
+    async def run(self):
+        """Run the workers until a stop signal, then wait for them to exit."""
+        self._prepare_metrics_dir()
+        self._serve_metrics()
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self.request_stop)
+
+        logger.info(f"Starting {len(self.slots)} worker processes ({WORKER_ID}-0..{len(self.slots) - 1})")
+        ready_reporter = asyncio.create_task(self._report_ready())
+        try:
+            await asyncio.gather(*(self._supervise(slot) for slot in self.slots))
+        finally:
+            ready_reporter.cancel()
+            self._set_ready(False)
+        logger.info("All worker processes exited")
+
+    def request_stop(self):
+        """Stop the workers gracefully; on a second request, kill them."""
+        self._signals += 1
+        self.stopping = True
+        sig = signal.SIGTERM if self._signals == 1 else signal.SIGKILL
+        if self._signals == 1:
+            logger.info("Shutdown requested, stopping workers after their in-flight tasks")
+        else:
+            logger.warning("Second shutdown request, killing workers")
+        for slot in self.slots:
+            if slot.process is not None and slot.process.returncode is None:
+                slot.process.send_signal(sig)
+
+    async def _supervise(self, slot: WorkerSlot):
+        backoff = RESTART_BACKOFF_MIN
+        while not self.stopping:
+            started = time.monotonic()
+            slot.process = await asyncio.create_subprocess_exec(
+                sys.executable, "main.py",
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                env=slot.env(),
+            )
+            logger.info(f"Started {slot.worker_id} (pid {slot.process.pid})")
+            if self.stopping:
+                # The stop request came in while it was starting
+                slot.process.send_signal(signal.SIGTERM)
+            returncode = await slot.process.wait()
+            self._process_exited(slot)
+
+            if self.stopping:
+                logger.info(f"{slot.worker_id} exited with code {returncode}")
+                break
+
+            if time.monotonic() - started >= HEALTHY_RUN_SECONDS:
+                backoff = RESTART_BACKOFF_MIN
+            slot.restarts += 1
+            logger.warning(
+                f"{slot.worker_id} exited unexpectedly with code {returncode}; "
+                f"restarting in {backoff:.0f}s (restart {slot.restarts})"
+            )
+            await self._sleep_unless_stopping(backoff)
+            backoff = min(backoff * 2, RESTART_BACKOFF_MAX)
+
+    async def _sleep_unless_stopping(self, seconds: float):
+        deadline = time.monotonic() + seconds
+        while not self.stopping and time.monotonic() < deadline:
+            await asyncio.sleep(min(1.0, deadline - time.monotonic()))
+
+    def _process_exited(self, slot: WorkerSlot):
+        # A killed worker cannot remove its ready file or its live gauges
+        if slot.ready_file:
+            try:
+                os.remove(slot.ready_file)
+            except FileNotFoundError:
+                pass
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(slot.process.pid, PROMETHEUS_MULTIPROC_DIR)
+
+    def _prepare_metrics_dir(self):
+        # Values from a previous run would be added to this run's
+        shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+        os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = PROMETHEUS_MULTIPROC_DIR
+
+    def _serve_metrics(self):
+        if not METRICS_PORT:
+            return
+        # Imported after PROMETHEUS_MULTIPROC_DIR is set
+        from prometheus_client import CollectorRegistry, multiprocess, start_http_server
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=PROMETHEUS_MULTIPROC_DIR)
+        try:
+            start_http_server(METRICS_PORT, registry=registry)
+            logger.info(f"Host metrics endpoint on :{METRICS_PORT}/metrics")
+        except OSError as e:
+            logger.warning(f"Failed to start metrics endpoint on :{METRICS_PORT}: {e}")
+
+    async def _report_ready(self):
+        while True:
+            self._set_ready(any(slot.ready for slot in self.slots))
+            await asyncio.sleep(READY_CHECK_INTERVAL)
+
+    def _set_ready(self, ready: bool):
+        if not WORKER_READY_FILE:
+            return
+        try:
+            if ready and not os.path.exists(WORKER_READY_FILE):
+                with open(WORKER_READY_FILE, "w") as f:
+                    f.write(WORKER_ID)
+            elif not ready and os.path.exists(WORKER_READY_FILE):
+                os.remove(WORKER_READY_FILE)
+        except OSError as e:
+            logger.warning(f"Failed to update ready file {WORKER_READY_FILE}: {e}")
+
+
+async def main():
+    """Supervisor entry point."""
+    await Supervisor(process_count()).run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
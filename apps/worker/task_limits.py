@@ -0,0 +1,149 @@
+"""
+Task Limits - Stop task runs that were cancelled or ran out of time or tokens
+
+Every dispatched run is watched until it ends. A run is stopped when:
+1. The user cancels the task (status 'cancelled', seen via Realtime or the
+   lease heartbeat)
+2. It has run for longer than TASK_DEADLINE_SECONDS
+3. Its LLM calls have used more than TASK_TOKEN_BUDGET tokens
+
+Stopping cancels the run's asyncio task, which interrupts the agent step in
+flight (including an LLM request) and releases the browser on the way out.
+The worker then records why the run was stopped on the task. Deadline and
+token budget apply per run: time spent paused for user input does not count.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import metrics
+
+logger = logging.getLogger("autoagent.task_limits")
+
+# Limits per run; 0 disables a limit
+TASK_DEADLINE_SECONDS = float(os.getenv("TASK_DEADLINE_SECONDS", "1800"))
+TASK_TOKEN_BUDGET = int(os.getenv("TASK_TOKEN_BUDGET", "1000000"))
+
+# How often deadlines and token use are checked (seconds)
+TASK_LIMIT_CHECK_INTERVAL = 1.0
+
+
+@dataclass
+class StopReason:
+    """Why a run was stopped, and how to record it on the task."""
+
+    kind: str      # "cancelled", "deadline" or "token_budget"
+    status: str    # Task status to record
+    message: str
+
+
+@dataclass
+class _Run:
+    execution: asyncio.Task
+    started: float
+    reason: Optional[StopReason] = None
+
+
+class TaskLimits:
+    """
+    Watches in-flight runs and stops them on cancellation, deadline or token budget.
+
+    Usage:
+        limits = TaskLimits()
+        limits.start()
+        limits.watch(task_id, execution)
+        limits.cancel(task_id)           # the user cancelled the task
+        reason = limits.reason(task_id)  # in the run: why it was stopped, if it was
+        limits.release(task_id)          # when the run ends
+        await limits.close()
+    """
+
+    def __init__(
+        self,
+        deadline_seconds: float = TASK_DEADLINE_SECONDS,
+        token_budget: int = TASK_TOKEN_BUDGET,
+        check_interval: float = TASK_LIMIT_CHECK_INTERVAL,
+    ):
+        self.deadline_seconds = deadline_seconds
+        self.token_budget = token_budget
+        self.check_interval = check_interval
+
+        self.stopped: Dict[str, int] = {}
+        self._runs: Dict[str, _Run] = {}
+        self._checker: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start checking deadlines and token budgets."""
+        if self.deadline_seconds > 0 or self.token_budget > 0:
+            self._checker = asyncio.create_task(self._check_periodically())
+
+    async def close(self):
+        if self._checker is not None:
+            self._checker.cancel()
+            try:
+                await self._checker
+            except asyncio.CancelledError:
+                pass
+            self._checker = None
+
+    def watch(self, task_id: str, execution: asyncio.Task):
+        """Start watching a dispatched run."""
+        self._runs[task_id] = _Run(execution, time.monotonic())
+
+    def release(self, task_id: str):
+        """Stop watching a run that ended."""
+        self._runs.pop(task_id, None)
+
+    def reason(self, task_id: str) -> Optional[StopReason]:
+        """Why the task's run was stopped, or None if it was not."""
+        run = self._runs.get(task_id)
+        return run.reason if run is not None else None
+
+    def cancel(self, task_id: str) -> bool:
+        """
+        Stop a run because the user cancelled its task.
+
+        Returns:
+            True if the task was running here
+        """
+        return self._stop(task_id, StopReason("cancelled", "cancelled", "Cancelled by user"))
+
+    def stats(self) -> dict:
+        return dict(self.stopped)
+
+    def _stop(self, task_id: str, reason: StopReason) -> bool:
+        run = self._runs.get(task_id)
+        if run is None or run.reason is not None:
+            return False
+
+        run.reason = reason
+        self.stopped[reason.kind] = self.stopped.get(reason.kind, 0) + 1
+        metrics.TASKS_STOPPED.labels(reason=reason.kind).inc()
+        logger.info(f"Stopping task {task_id}: {reason.message}")
+        run.execution.cancel()
+        return True
+
+    def _check(self):
+        now = time.monotonic()
+        for task_id, run in list(self._runs.items()):
+            if run.reason is not None:
+                continue
+            if self.deadline_seconds > 0 and now - run.started > self.deadline_seconds:
+                self._stop(task_id, StopReason(
+                    "deadline", "failed", f"Task exceeded its {self.deadline_seconds:.0f}s deadline",
+                ))
+                continue
+            tokens = metrics.tokens_used(task_id)
+            if self.token_budget > 0 and tokens > self.token_budget:
+                self._stop(task_id, StopReason(
+                    "token_budget", "failed", f"Task used {tokens} LLM tokens, over its budget of {self.token_budget}",
+                ))
+
+    async def _check_periodically(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            self._check()
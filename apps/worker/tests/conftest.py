@@ -0,0 +1,14 @@
+import os
+import sys
+
+WORKER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Worker modules are flat modules run from apps/worker; the fakes live in benchmarks/
+sys.path.insert(0, WORKER_DIR)
+sys.path.insert(0, os.path.join(WORKER_DIR, "benchmarks"))
+
+# main.py reads these at import time; tests never reach a real project
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:9")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test-service-key")
+os.environ.setdefault("METRICS_PORT", "0")
+os.environ.setdefault("WORKER_READY_FILE", "")
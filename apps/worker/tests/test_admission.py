@@ -0,0 +1,30 @@
+"""Worker processes on one host split its memory headroom instead of each claiming all of it."""
+
+from admission import AdmissionController, ResourceSample
+
+SAMPLE = ResourceSample(available_mb=1350, total_mb=2048, cpu_percent=10, idle_browser_mb=0)
+
+
+def _controller(share: float) -> AdmissionController:
+    admission = AdmissionController(task_memory_mb=300, reserve_mb=150, share=share)
+    admission.sample = lambda: SAMPLE
+    return admission
+
+
+def test_single_process_uses_all_headroom():
+    # (1350 - 150) / 300
+    assert _controller(1.0).admit(free_slots=8, active=1).admitted == 4
+
+
+def test_processes_together_do_not_over_commit():
+    processes = [_controller(1 / 4) for _ in range(4)]
+    admitted = [admission.admit(free_slots=8, active=1).admitted for admission in processes]
+    assert sum(admitted) <= 4
+    assert admitted == [1, 1, 1, 1]
+
+
+def test_own_idle_browsers_count_in_full():
+    admission = _controller(1 / 4)
+    admission.sample = lambda: ResourceSample(1350, 2048, 10, idle_browser_mb=600)
+    # 1200 / 4 + 600
+    assert admission.admit(free_slots=8, active=1).admitted == 3
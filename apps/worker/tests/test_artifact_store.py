@@ -0,0 +1,118 @@
+"""Artifacts are only evicted once uploaded, and failed uploads are retried."""
+
+import os
+import asyncio
+
+from PIL import Image
+
+import artifact_store
+from artifact_store import ArtifactStore, PENDING_SUFFIX, object_path
+
+
+class FakeBucket:
+    def __init__(self, storage):
+        self.storage = storage
+
+    async def upload(self, path, file, file_options):
+        if self.storage.failures_left > 0:
+            self.storage.failures_left -= 1
+            raise RuntimeError("storage unavailable")
+        self.storage.objects[path] = file
+
+
+class FakeStorage:
+    def __init__(self, failures: int = 0):
+        self.failures_left = failures
+        self.objects = {}
+
+    def from_(self, bucket):
+        return FakeBucket(self)
+
+
+class FakeSupabase:
+    def __init__(self, failures: int = 0):
+        self.storage = FakeStorage(failures)
+
+
+def _screenshot(tmp_path, i: int) -> str:
+    # Noise does not compress, so every artifact is about the same size
+    path = tmp_path / f"step-{i}.png"
+    Image.frombytes("RGB", (64, 64), os.urandom(64 * 64 * 3)).save(path)
+    return str(path)
+
+
+def _cached_files(cache_dir) -> set:
+    return {
+        os.path.splitext(name)[0]
+        for _, _, files in os.walk(cache_dir)
+        for name in files
+        if name.endswith(".webp")
+    }
+
+
+async def _until(condition, timeout: float = 5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_failed_uploads_are_retried_and_never_evicted(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifact_store, "UPLOAD_RETRY_MIN", 0.05)
+    cache_dir = tmp_path / "cache"
+
+    async def run():
+        supabase = FakeSupabase(failures=100)
+        # Room for fewer than four artifacts
+        store = ArtifactStore(supabase, cache_dir=str(cache_dir), cache_mb=0.01, upload_concurrency=1)
+        store.start()
+
+        shas = [await store.put_screenshot(f"task-{i}", _screenshot(tmp_path, i)) for i in range(4)]
+        await _until(lambda: supabase.storage.failures_left < 97)
+
+        # Over the cap, but nothing uploaded yet: everything stays
+        assert _cached_files(cache_dir) == set(shas)
+        assert store.stats()["evicted"] == 0
+        assert store.stats()["uploads_pending"] == 4
+
+        # Storage recovers: the retries upload everything, then the cache shrinks
+        supabase.storage.failures_left = 0
+        await _until(lambda: len(supabase.storage.objects) == 4)
+        assert set(supabase.storage.objects) == {object_path(sha) for sha in shas}
+        assert store._cached_bytes <= store.cache_bytes
+        assert 0 < store.stats()["evicted"] == 4 - len(_cached_files(cache_dir))
+        await store.close()
+
+    asyncio.run(run())
+
+
+def test_restart_uploads_what_the_previous_run_left(tmp_path):
+    cache_dir = tmp_path / "cache"
+
+    async def run():
+        # First run: storage is down until shutdown
+        down = FakeSupabase(failures=100)
+        store = ArtifactStore(down, cache_dir=str(cache_dir), upload_concurrency=1)
+        store.start()
+        pending = await store.put_screenshot("task-1", _screenshot(tmp_path, 1))
+        await _until(lambda: down.storage.failures_left < 100)
+        await store.close()
+
+        # An artifact uploaded by an earlier run has no marker
+        uploaded = "ab" * 32
+        path = cache_dir / object_path(uploaded)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"uploaded earlier")
+
+        # Second run: the pending artifact is queued again, the other is not
+        up = FakeSupabase()
+        store = ArtifactStore(up, cache_dir=str(cache_dir), upload_concurrency=1)
+        store.start()
+        await _until(lambda: object_path(pending) in up.storage.objects)
+        await store.close()
+
+        assert list(up.storage.objects) == [object_path(pending)]
+        assert not os.path.exists(str(cache_dir / object_path(pending)) + PENDING_SUFFIX)
+        assert store._uploaded == {pending, uploaded}
+
+    asyncio.run(run())
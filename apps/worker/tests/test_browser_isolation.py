@@ -0,0 +1,120 @@
+"""A lease never sees storage a previous lease wrote, including in tabs outside its context."""
+
+import os
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from browser_pool import BrowserPool, PooledBrowser
+from test_browser_pool import FakeConnection, FakeProcess, _pool_with
+
+
+def _chromium_installed() -> bool:
+    try:
+        from playwright.sync_api import sync_playwright
+        with sync_playwright() as playwright:
+            return os.path.exists(playwright.chromium.executable_path)
+    except Exception:
+        return False
+
+
+class FakePage:
+    def __init__(self, url: str):
+        self.url = url
+        self.frames = [self]
+        self.listeners = {}
+
+    def on(self, event, handler):
+        self.listeners.setdefault(event, []).append(handler)
+
+
+def test_browser_used_outside_its_context_is_recycled():
+    async def run():
+        connection = FakeConnection()
+        pool = _pool_with(connection)
+        async with pool.lease():
+            # browser-use opens a tab in the default context, then navigates it
+            tab = FakePage("about:blank")
+            for handler in connection.contexts[0].listeners["page"]:
+                handler(tab)
+            for handler in tab.listeners["framenavigated"]:
+                handler(FakePage("https://mail.example.com/inbox"))
+
+        assert pool.stats.recycles == 1
+        assert pool._idle == []
+
+    asyncio.run(run())
+
+
+def test_browser_with_only_blank_default_tabs_is_kept():
+    async def run():
+        connection = FakeConnection()
+        pool = _pool_with(connection)
+        # Wiping needs a real CDP session; count the browser as wiped
+        pool._wipe = lambda browser: asyncio.sleep(0, result=True)
+        async with pool.lease():
+            for handler in connection.contexts[0].listeners["page"]:
+                handler(FakePage("about:blank"))
+
+        assert pool.stats.recycles == 0
+        assert len(pool._idle) == 1
+
+    asyncio.run(run())
+
+
+class _Page(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = b"<html><body>site</body></html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+async def _open_tab_like_browser_use(lease, url: str):
+    """Target.createTarget without a browserContextId, as browser-use 0.11 does."""
+    session = await lease.browser.connection.new_browser_cdp_session()
+    await session.send("Target.createTarget", {"url": url})
+    await session.detach()
+    for _ in range(100):
+        for page in lease.default_context.pages:
+            if page.url.startswith(url):
+                await page.wait_for_load_state()
+                return page
+        await asyncio.sleep(0.05)
+    raise AssertionError(f"tab for {url} did not appear")
+
+
+@pytest.mark.skipif(not _chromium_installed(), reason="Chromium is not installed (playwright install chromium)")
+def test_second_lease_cannot_see_storage_from_a_new_tab_of_the_first():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Page)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    async def run():
+        pool = BrowserPool(size=1)
+        await pool.start()
+        try:
+            async with pool.lease() as lease:
+                tab = await _open_tab_like_browser_use(lease, url)
+                await tab.evaluate("localStorage.setItem('secret', 'first user')")
+                await tab.evaluate("indexedDB.open('secret-db')")
+
+            async with pool.lease() as lease:
+                tab = await _open_tab_like_browser_use(lease, url)
+                assert await tab.evaluate("localStorage.getItem('secret')") is None
+                databases = await tab.evaluate("indexedDB.databases().then(dbs => dbs.map(db => db.name))")
+                assert "secret-db" not in databases
+        finally:
+            await pool.close()
+
+    try:
+        asyncio.run(run())
+    finally:
+        server.shutdown()
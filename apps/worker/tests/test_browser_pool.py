@@ -0,0 +1,166 @@
+"""A cancelled task must never keep a pool slot: no leaked launches or leases."""
+
+import stat
+import asyncio
+
+from browser_pool import BrowserPool, PooledBrowser
+
+
+class FakeProcess:
+    pid = 0
+
+    def __init__(self):
+        self.returncode = None
+
+    def terminate(self):
+        self.returncode = -15
+
+    kill = terminate
+
+    async def wait(self):
+        return self.returncode
+
+
+class FakeContext:
+    def __init__(self, hang: bool = False):
+        self.hang = hang
+        self.closed = False
+        self.pages = []
+        self.listeners = {}
+
+    def on(self, event, handler):
+        self.listeners.setdefault(event, []).append(handler)
+
+    def remove_listener(self, event, handler):
+        self.listeners[event].remove(handler)
+
+    async def new_page(self):
+        if self.hang:
+            await asyncio.sleep(3600)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self, hang_new_context: bool = False, hang_new_page: bool = False):
+        self.hang_new_context = hang_new_context
+        self.hang_new_page = hang_new_page
+        self.contexts = [FakeContext()]
+        self.created = []
+
+    def is_connected(self):
+        return True
+
+    async def new_context(self):
+        if self.hang_new_context:
+            await asyncio.sleep(3600)
+        context = FakeContext(hang=self.hang_new_page)
+        self.created.append(context)
+        return context
+
+    async def close(self):
+        pass
+
+
+class HangingChromium:
+    """connect_over_cdp never succeeds, as with a Chromium that is slow to start."""
+
+    def __init__(self, executable_path: str):
+        self.executable_path = executable_path
+
+    async def connect_over_cdp(self, url):
+        await asyncio.sleep(3600)
+
+
+class FakePlaywright:
+    def __init__(self, executable_path: str):
+        self.chromium = HangingChromium(executable_path)
+
+
+def _pool_with(connection: FakeConnection) -> BrowserPool:
+    pool = BrowserPool(size=1)
+    browser = PooledBrowser(FakeProcess(), "http://127.0.0.1:1", "/nonexistent")
+    browser.connection = connection
+    pool._idle.append(browser)
+    return pool
+
+
+async def _cancel_after(coro, delay: float = 0.05):
+    task = asyncio.create_task(coro)
+    await asyncio.sleep(delay)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    # Let shielded releases finish
+    await asyncio.sleep(0.05)
+
+
+async def _hold_lease(pool: BrowserPool):
+    async with pool.lease():
+        await asyncio.sleep(3600)
+
+
+def test_cancel_while_creating_context_releases_browser():
+    async def run():
+        pool = _pool_with(FakeConnection(hang_new_context=True))
+        await _cancel_after(_hold_lease(pool))
+        assert pool._leased == []
+
+    asyncio.run(run())
+
+
+def test_cancel_while_opening_page_closes_context():
+    async def run():
+        connection = FakeConnection(hang_new_page=True)
+        pool = _pool_with(connection)
+        await _cancel_after(_hold_lease(pool))
+        assert pool._leased == []
+        assert connection.created and connection.created[0].closed
+
+    asyncio.run(run())
+
+
+def test_cancel_during_lease_releases_browser():
+    async def run():
+        pool = _pool_with(FakeConnection())
+        await _cancel_after(_hold_lease(pool))
+        assert pool._leased == []
+
+        # The slot is usable again
+        pool._idle.append(PooledBrowser(FakeProcess(), "http://127.0.0.1:2", "/nonexistent"))
+        pool._idle[-1].connection = FakeConnection()
+        async with pool.lease() as lease:
+            assert lease.cdp_url == "http://127.0.0.1:2"
+
+    asyncio.run(run())
+
+
+def test_cancel_during_launch_frees_slot_and_stops_process(tmp_path):
+    # Stands in for Chromium: ignores its arguments and keeps running
+    chromium = tmp_path / "chromium"
+    chromium.write_text("#!/bin/sh\nexec sleep 60\n")
+    chromium.chmod(chromium.stat().st_mode | stat.S_IEXEC)
+
+    async def run():
+        pool = BrowserPool(size=1)
+        pool._playwright = FakePlaywright(str(chromium))
+        terminated = []
+        original_terminate = pool._terminate
+
+        async def terminate(browser):
+            terminated.append(browser)
+            await original_terminate(browser)
+
+        pool._terminate = terminate
+        await _cancel_after(_hold_lease(pool), delay=0.3)
+
+        assert pool._launching == 0
+        assert pool._leased == []
+        # The Chromium stand-in was stopped, not orphaned
+        assert len(terminated) == 1
+        assert terminated[0].process.returncode is not None
+
+    asyncio.run(run())
@@ -0,0 +1,99 @@
+"""The worker signs in with vault entries exactly as the vault page saves them."""
+
+import base64
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from urllib.parse import parse_qsl, urlsplit
+
+from supabase import acreate_client
+
+from credential_vault import CredentialVault
+from fake_postgrest import FAKE_SERVICE_KEY, FakePostgREST
+
+
+class FakeVault(FakePostgREST):
+    """Serves a secrets_vault table, filtered like the worker's query."""
+
+    def __init__(self):
+        super().__init__(latency_ms=0)
+        self.rows = []
+
+    def add_entry(self, user_id: str, name: str, website_url: str, username, password) -> dict:
+        """Insert a row with the columns apps/web/src/pages/vault.tsx writes."""
+        now = datetime.now(timezone.utc).isoformat()
+        row = {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "name": name,
+            "description": None,
+            "encrypted_username": username,
+            "encrypted_password": password,
+            "encrypted_notes": None,
+            "website_url": website_url,
+            "category": "other",
+            "last_used_at": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        self.rows.append(row)
+        return row
+
+    def handle(self, method, path, headers, body):
+        url = urlsplit(path)
+        if url.path != "/rest/v1/secrets_vault":
+            return 200, [], {}
+        filters = dict(parse_qsl(url.query))
+        rows = [
+            r for r in self.rows
+            if filters.get("user_id") == f"eq.{r['user_id']}"
+            and not (filters.get("website_url") == "not.is.null" and r["website_url"] is None)
+        ]
+        return 200, rows, {}
+
+
+def _lookup(server, user_id, urls, **kwargs):
+    async def run():
+        supabase = await acreate_client(server.url, FAKE_SERVICE_KEY)
+        vault = CredentialVault(supabase, enabled=True, **kwargs)
+        return [await vault.lookup(user_id, url) for url in urls]
+
+    return asyncio.run(run())
+
+
+def test_entries_saved_by_the_vault_page_sign_in_on_their_site():
+    with FakeVault() as server:
+        user_id = str(uuid.uuid4())
+        github = server.add_entry(user_id, "GitHub", "https://github.com", "octocat", "hunter2")
+        bank = server.add_entry(user_id, "Bank", "https://www.bank.example/login", None, "s3cret")
+        server.add_entry(str(uuid.uuid4()), "Other user", "https://github.com", "someone", "else")
+
+        on_github, on_bank, elsewhere = _lookup(
+            server, user_id,
+            ["https://github.com/login", "https://online.bank.example/", "https://shop.example.com/"],
+        )
+
+        assert (on_github.id, on_github.username, on_github.password) == (github["id"], "octocat", "hunter2")
+        # The username is optional in the form and saved as null
+        assert (on_bank.id, on_bank.username, on_bank.password) == (bank["id"], None, "s3cret")
+        assert elsewhere is None
+
+
+def test_decrypt_hook_reads_encrypted_values_and_skips_unreadable_ones():
+    def encrypt(value: str) -> str:
+        return base64.b64encode(value.encode()).decode()
+
+    def decrypt(value: str) -> str:
+        return base64.b64decode(value, validate=True).decode()
+
+    with FakeVault() as server:
+        user_id = str(uuid.uuid4())
+        server.add_entry(user_id, "GitHub", "github.com", encrypt("octocat"), encrypt("hunter2"))
+        server.add_entry(user_id, "Mail", "mail.example.com", "plain user", "plain password!")
+
+        on_github, on_mail = _lookup(
+            server, user_id, ["https://github.com/login", "https://mail.example.com/"], decrypt=decrypt
+        )
+
+        assert (on_github.username, on_github.password) == ("octocat", "hunter2")
+        assert on_mail is None
@@ -0,0 +1,45 @@
+"""Workers subscribe only to task changes they act on."""
+
+import asyncio
+
+from dispatcher import TaskNotifier
+
+
+class FakeChannel:
+    def __init__(self):
+        self.bindings = []
+
+    def on_postgres_changes(self, event, schema, table, filter=None, callback=None):
+        self.bindings.append((event, table, filter))
+
+    async def subscribe(self):
+        pass
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.channel_ = FakeChannel()
+
+    def channel(self, name):
+        return self.channel_
+
+
+def test_subscriptions_are_filtered_on_status():
+    supabase = FakeSupabase()
+    asyncio.run(TaskNotifier(realtime=True).start(supabase))
+
+    assert supabase.channel_.bindings == [
+        ("INSERT", "tasks", "status=eq.pending"),
+        ("UPDATE", "tasks", "status=in.(pending,cancelled)"),
+    ]
+
+
+def test_wakes_for_pending_and_stops_cancelled_tasks():
+    cancelled = []
+    notifier = TaskNotifier(realtime=True, on_cancelled=cancelled.append)
+
+    notifier._on_task_change({"data": {"record": {"id": "t1", "status": "cancelled"}}})
+    assert cancelled == ["t1"] and not notifier._wakeup.is_set()
+
+    notifier._on_task_change({"data": {"record": {"id": "t2", "status": "pending"}}})
+    assert notifier._wakeup.is_set()
@@ -0,0 +1,142 @@
+"""A fanned-out task that needs input runs only its unfinished subtasks as one."""
+
+import asyncio
+
+import pytest
+
+import agent as agent_module
+import metrics
+from agent import BrowserAgent, LoginRequiredError
+
+SUBTASKS = ["Price of item 1 on shop.example", "Price of item 2 on shop.example", "Price of item 3 on shop.example"]
+PROMPT = "Check prices of each of these items: 1, 2, 3 on shop.example"
+
+
+class FakeLLM:
+    async def ainvoke(self, *args, **kwargs):
+        raise AssertionError("planning is stubbed")
+
+
+class FakeLogSink:
+    def __init__(self):
+        self.messages = []
+
+    async def write(self, task_id, message, log_type):
+        self.messages.append(message)
+
+
+class FakeTraceCache:
+    async def get(self, user_id, prompt):
+        return None
+
+
+class FakeAgent:
+    """Stands in for browser-use's Agent; records how it was created."""
+
+    created = []
+
+    def __init__(self, task, llm, browser, **kwargs):
+        self.task = task
+        self.sensitive_data = kwargs.get("sensitive_data")
+        FakeAgent.created.append(self)
+
+
+@pytest.fixture
+def parent(monkeypatch):
+    """A BrowserAgent whose planner, subtasks, browser and agent run are faked."""
+    async def plan(llm, prompt):
+        return list(SUBTASKS)
+
+    started = []
+    original_run_task = BrowserAgent.run_task
+
+    async def run_task(self, task_id, prompt, **kwargs):
+        if self.subtask is None:
+            return await original_run_task(self, task_id, prompt, **kwargs)
+        started.append(self.subtask)
+        if self.subtask == "1":
+            return {"success": True, "result": "Item 1 costs $10", "steps_taken": 3}
+        await asyncio.sleep(0.01)
+        if self.subtask == "2":
+            raise LoginRequiredError(field_name="Password")
+        await asyncio.sleep(60)
+
+    async def open_browser(self, storage_state=None):
+        return object()
+
+    async def run_agent(self, task_id, trace=None, record=False):
+        metrics.untrack_task(self._run_key())
+        return {"success": True, "result": self._agent.task, "record": record}
+
+    FakeAgent.created = []
+    monkeypatch.setattr(agent_module, "plan_subtasks", plan)
+    monkeypatch.setattr(agent_module, "Agent", FakeAgent)
+    monkeypatch.setattr(agent_module.metrics, "instrument_actions", lambda agent, get_metrics: None)
+    monkeypatch.setattr(BrowserAgent, "run_task", run_task)
+    monkeypatch.setattr(BrowserAgent, "_open_browser", open_browser)
+    monkeypatch.setattr(BrowserAgent, "_run_agent", run_agent)
+
+    browser_agent = BrowserAgent(None, None, FakeLogSink(), trace_cache=FakeTraceCache(), llm_factory=FakeLLM)
+    browser_agent.started_subtasks = started
+    return browser_agent
+
+
+def test_finished_subtasks_are_kept_when_one_needs_input(parent):
+    result = asyncio.run(parent.run_task("task-1", PROMPT, user_id="user-1"))
+
+    assert parent.started_subtasks == ["1", "2", "3"]
+    assert [subtask for subtask, _ in parent._finished_subtasks] == [SUBTASKS[0]]
+    # The single run is told what subtask 1 found, and not to do it again
+    prompt = FakeAgent.created[-1].task
+    assert prompt.startswith(PROMPT)
+    assert "Do not do them again" in prompt
+    assert f"1. {SUBTASKS[0]}\nItem 1 costs $10" in prompt
+    assert parent._prompt == prompt
+    # A continuation is not a trace to replay for the original prompt
+    assert result["record"] is False
+    assert any("running the 2 unfinished subtasks as one task" in m for m in parent.log_sink.messages)
+
+
+class FakeQuery:
+    def __init__(self, row):
+        self.row = row
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    async def execute(self):
+        return type("Result", (), {"data": self.row})()
+
+
+class FakeSupabase:
+    def __init__(self, task):
+        self.task = task
+
+    def table(self, name):
+        return FakeQuery(self.task)
+
+
+def test_resume_without_snapshot_keeps_the_input_out_of_prompts_and_logs(parent, monkeypatch):
+    secret = "hunter2-482913"
+    planned = []
+
+    async def plan(llm, prompt):
+        planned.append(prompt)
+        return list(SUBTASKS)
+
+    monkeypatch.setattr(agent_module, "plan_subtasks", plan)
+    parent.supabase = FakeSupabase({
+        "id": "task-1", "prompt": PROMPT, "browser_state": None,
+        "required_input": {"field_name": "Password"}, "task_type": None,
+    })
+
+    result = asyncio.run(parent.resume_with_input("task-1", secret))
+
+    # One run, no planner and no subtasks, the value only in sensitive_data
+    assert planned == [] and parent.started_subtasks == []
+    agent = FakeAgent.created[-1]
+    assert agent.sensitive_data == {agent_module.USER_INPUT_SECRET: secret}
+    assert f"<secret>{agent_module.USER_INPUT_SECRET}</secret> in the Password field" in agent.task
+    assert secret not in agent.task and secret not in parent._prompt
+    assert not any(secret in m for m in parent.log_sink.messages)
+    assert result["record"] is False
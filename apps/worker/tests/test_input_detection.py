@@ -0,0 +1,115 @@
+"""
+detect_input_requirement answers like the per-pattern scan it replaced, and
+how much faster it is on checked-in page-text fixtures.
+
+The benchmarks are skipped by default (see pytest.ini); run them with:
+    python -m pytest tests/test_input_detection.py --benchmark-enable
+"""
+
+import os
+import re
+from typing import Optional, Tuple
+
+import pytest
+
+from human_loop import (
+    CAPTCHA_PATTERNS,
+    LOGIN_PATTERNS,
+    TWO_FA_PATTERNS,
+    InputRequirementScanner,
+    detect_input_requirement,
+)
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pages")
+
+OTHER_URL = "https://shop.example.com/orders/1042"
+LOGIN_URL = "https://accounts.example.com/signin"
+
+# Fixture -> (field asked for on OTHER_URL, on LOGIN_URL)
+EXPECTED = {
+    "checkout": (None, "Username/Email"),
+    "sign_in": ("Username & Password", "Username & Password"),
+    "sign_in_dialog": ("Username & Password", "Username & Password"),
+    "two_step_verification": ("Verification Code", "Username/Email"),
+    "captcha": ("CAPTCHA Verification", "Username/Email"),
+}
+
+
+def legacy_detect(page_content: str, page_url: str = "") -> Optional[Tuple[str, str, str]]:
+    """The implementation detect_input_requirement replaced."""
+    content_lower = page_content.lower()
+    url_lower = page_url.lower()
+
+    def analyze(content: str):
+        has_username = any(word in content for word in ["username", "email", "user id", "account"])
+        has_password = "password" in content
+        if has_username and has_password:
+            return ("credentials", "Username & Password", "Please provide your login credentials (username/email and password).")
+        elif has_password:
+            return ("password", "Password", "Please enter your password to continue.")
+        elif has_username:
+            return ("text", "Username/Email", "Please enter your username or email address.")
+        return ("password", "Credentials", "Please provide the required login information.")
+
+    if any(p in url_lower for p in ["login", "signin", "auth", "sso"]):
+        return analyze(content_lower)
+    for pattern in TWO_FA_PATTERNS:
+        if re.search(pattern, content_lower):
+            return ("text", "Verification Code", "Please enter the 2FA/verification code sent to your device or email.")
+    for pattern in LOGIN_PATTERNS:
+        if re.search(pattern, content_lower):
+            return analyze(content_lower)
+    for pattern in CAPTCHA_PATTERNS:
+        if re.search(pattern, content_lower):
+            return ("captcha", "CAPTCHA Verification", "A CAPTCHA is required. Please solve it manually and indicate when done.")
+    return None
+
+
+def scan_chunked(page_content: str, page_url: str, chunk_size: int):
+    """Feed the page the way a streamed page dump arrives."""
+    scanner = InputRequirementScanner(page_url)
+    for i in range(0, len(page_content), chunk_size):
+        if scanner.feed(page_content[i:i + chunk_size]):
+            break
+    return scanner.result()
+
+
+def load_page(name: str) -> str:
+    with open(os.path.join(PAGES_DIR, f"{name}.txt"), encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.fixture(scope="module", params=sorted(EXPECTED))
+def page(request):
+    return request.param, load_page(request.param)
+
+
+@pytest.mark.parametrize("url", [OTHER_URL, LOGIN_URL], ids=["other_url", "login_url"])
+def test_matches_legacy(page, url):
+    name, text = page
+    expected_field = EXPECTED[name][url == LOGIN_URL]
+    expected = legacy_detect(text, url)
+
+    assert (expected[1] if expected else None) == expected_field
+    assert detect_input_requirement(text, url) == expected
+    # Small chunks put pattern matches across chunk boundaries
+    for chunk_size in (7, 100, 4096):
+        assert scan_chunked(text, url, chunk_size) == expected
+
+
+IMPLEMENTATIONS = {
+    "legacy": legacy_detect,
+    "matcher": detect_input_requirement,
+    "chunked": lambda text, url: scan_chunked(text, url, 64 * 1024),
+}
+
+
+@pytest.mark.parametrize("repeat", [1, 16], ids=["page", "page_x16"])
+@pytest.mark.parametrize("url", [OTHER_URL, LOGIN_URL], ids=["other_url", "login_url"])
+@pytest.mark.parametrize("implementation", sorted(IMPLEMENTATIONS))
+def test_benchmark(benchmark, page, url, repeat, implementation):
+    name, text = page
+    text = text * repeat
+    benchmark.group = f"{name}-{'login' if url == LOGIN_URL else 'other'}-x{repeat}"
+    result = benchmark(IMPLEMENTATIONS[implementation], text, url)
+    assert result == legacy_detect(text, url)
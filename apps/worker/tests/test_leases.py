@@ -0,0 +1,153 @@
+"""Claim, heartbeat and reap: the worker's lease flow against the fake task queue."""
+
+import asyncio
+
+from supabase import acreate_client
+
+from fake_postgrest import FAKE_SERVICE_KEY
+from fake_supabase import FakeSupabase, _at_offset
+from leases import LeaseKeeper
+import main
+
+
+def _keeper(worker_id: str, held=(), **kwargs):
+    events = {"lost": [], "cancelled": [], "requeued": 0}
+
+    def on_requeued():
+        events["requeued"] += 1
+
+    keeper = LeaseKeeper(
+        worker_id,
+        held=lambda: list(held),
+        on_lost=events["lost"].append,
+        on_cancelled=events["cancelled"].append,
+        on_requeued=on_requeued,
+        **kwargs,
+    )
+    return keeper, events
+
+
+async def _claim(supabase, worker_id: str, lease_seconds: int = 120) -> list:
+    result = await supabase.rpc(
+        "claim_tasks", {"p_worker_id": worker_id, "p_limit": 10, "p_lease_seconds": lease_seconds}
+    ).execute()
+    return result.data
+
+
+def test_heartbeat_renews_held_leases_and_reports_lost_and_cancelled():
+    async def run(server):
+        supabase = await acreate_client(server.url, FAKE_SERVICE_KEY)
+        kept, taken, cancelled = (server.add_task(f"task {i}") for i in range(3))
+        await _claim(supabase, "worker-a", lease_seconds=5)
+
+        server.tasks[taken["id"]]["worker_id"] = "worker-b"
+        server.tasks[cancelled["id"]]["status"] = "cancelled"
+        before = server.tasks[kept["id"]]["lease_expires_at"]
+
+        held = [kept["id"], taken["id"], cancelled["id"]]
+        keeper, events = _keeper("worker-a", held=held, lease_seconds=120)
+        keeper.supabase = supabase
+        await keeper.heartbeat()
+
+        assert server.tasks[kept["id"]]["lease_expires_at"] > before
+        assert events["lost"] == [taken["id"]]
+        assert events["cancelled"] == [cancelled["id"]]
+        assert keeper.lost == 1
+
+    with FakeSupabase(latency_ms=0) as server:
+        asyncio.run(run(server))
+
+
+def test_reaper_requeues_expired_tasks_and_fails_them_past_the_cap():
+    async def run(server):
+        supabase = await acreate_client(server.url, FAKE_SERVICE_KEY)
+        retried, exhausted, live = (server.add_task(f"task {i}") for i in range(3))
+        server.tasks[exhausted["id"]]["attempts"] = 2
+        await _claim(supabase, "worker-dead")
+        for task in (retried, exhausted):
+            server.tasks[task["id"]]["lease_expires_at"] = _at_offset(-1)
+
+        keeper, events = _keeper("worker-a", max_attempts=3)
+        keeper.supabase = supabase
+        assert await keeper.reap() == 1
+
+        assert server.tasks[retried["id"]]["status"] == "pending"
+        assert server.tasks[retried["id"]]["worker_id"] is None
+        assert server.tasks[exhausted["id"]]["status"] == "failed"
+        assert server.tasks[live["id"]]["status"] == "running"
+        assert events["requeued"] == 1 and keeper.failed == 1
+
+        # The requeued task is claimed again, counting another attempt
+        claimed = await _claim(supabase, "worker-a")
+        assert [(t["id"], t["attempts"]) for t in claimed] == [(retried["id"], 2)]
+
+    with FakeSupabase(latency_ms=0) as server:
+        asyncio.run(run(server))
+
+
+def test_restarted_worker_reaps_its_leftovers_without_waiting_for_the_lease():
+    async def run(server):
+        supabase = await acreate_client(server.url, FAKE_SERVICE_KEY)
+        mine, other = server.add_task("mine"), server.add_task("other")
+        await _claim(supabase, "worker-a")
+        server.tasks[other["id"]]["worker_id"] = "worker-b"
+
+        keeper, _ = _keeper("worker-a")
+        await keeper.start(supabase)
+        await keeper.close()
+
+        assert server.tasks[mine["id"]]["status"] == "pending"
+        assert server.tasks[other["id"]]["status"] == "running"
+
+    with FakeSupabase(latency_ms=0) as server:
+        asyncio.run(run(server))
+
+
+def test_reaper_requeues_running_tasks_without_a_lease():
+    async def run(server):
+        supabase = await acreate_client(server.url, FAKE_SERVICE_KEY)
+        running = {"status": "running", "worker_id": "worker-old", "attempts": 1}
+        stale = server.add_task("stale", **running, started_at=_at_offset(-3600))
+        recent = server.add_task("recent", **running, started_at=_at_offset(-10))
+        resumable = server.add_task(
+            "resumable", **running, started_at=_at_offset(-3600), user_provided_input="123456"
+        )
+
+        keeper, _ = _keeper("worker-a", unleased_reap_seconds=600)
+        keeper.supabase = supabase
+        assert await keeper.reap() == 1
+
+        assert server.tasks[stale["id"]]["status"] == "pending"
+        assert server.tasks[recent["id"]]["status"] == "running"
+        # Left to claim_resumable_tasks()
+        assert server.tasks[resumable["id"]]["status"] == "running"
+
+    with FakeSupabase(latency_ms=0) as server:
+        asyncio.run(run(server))
+
+
+def test_worker_claims_its_free_slots_and_heartbeats_what_it_runs():
+    async def run(server):
+        supabase = await acreate_client(server.url, FAKE_SERVICE_KEY)
+        tasks = [server.add_task(f"task {i}") for i in range(3)]
+
+        worker = main.TaskWorker()
+        worker.supabase = supabase
+        worker.admission.enabled = False
+        dispatched = []
+        worker._dispatch = lambda task, resume=False: dispatched.append(task["id"])
+
+        assert await worker._fill_slots() == worker.max_concurrent_tasks == 2
+        claimed = [server.tasks[task_id] for task_id in dispatched]
+        assert [t["id"] for t in claimed] == [t["id"] for t in tasks[:2]]
+        assert all(t["worker_id"] == main.WORKER_ID and t["lease_expires_at"] and t["attempts"] == 1 for t in claimed)
+        assert server.tasks[tasks[2]["id"]]["status"] == "pending"
+
+        # Its lease keeper renews exactly the tasks it runs
+        worker.active_tasks.update({task_id: None for task_id in dispatched})
+        worker.leases.supabase = supabase
+        await worker.leases.heartbeat()
+        assert worker.leases.lost == 0
+
+    with FakeSupabase(latency_ms=0) as server:
+        asyncio.run(run(server))
@@ -0,0 +1,64 @@
+"""Request blocking covers tabs browser-use opens outside the leased context."""
+
+import asyncio
+
+from execution_profiles import ExecutionProfile, RequestBlocker
+
+
+class FakeSession:
+    def __init__(self):
+        self.handlers = {}
+        self.sent = []
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    async def send(self, method, params=None):
+        self.sent.append(method)
+
+
+class FakeContext:
+    def __init__(self):
+        self.pages = []
+        self.listeners = []
+        self.sessions = []
+
+    def on(self, event, handler):
+        self.listeners.append(handler)
+
+    async def new_cdp_session(self, page):
+        session = FakeSession()
+        self.sessions.append(session)
+        return session
+
+    async def open_page(self):
+        page = FakePage(self)
+        self.pages.append(page)
+        for handler in self.listeners:
+            await handler(page)
+        return page
+
+
+class FakePage:
+    url = "about:blank"
+
+    def __init__(self, context):
+        self.context = context
+
+
+def test_tabs_in_the_default_context_are_blocked_and_counted():
+    async def run():
+        leased, default = FakeContext(), FakeContext()
+        blocker = RequestBlocker(ExecutionProfile(name="test", blocked_resource_types=["Image"]))
+        await blocker.attach(leased, default)
+
+        # A new tab, opened the way browser-use does
+        await default.open_page()
+        session = default.sessions[0]
+        assert session.sent == ["Fetch.enable"]
+
+        await session.handlers["Fetch.requestPaused"]({"requestId": "1", "resourceType": "Image"})
+        await asyncio.sleep(0)
+        assert blocker.summary()["requests_blocked"] == 1
+
+    asyncio.run(run())
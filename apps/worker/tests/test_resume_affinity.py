@@ -0,0 +1,59 @@
+"""A parked session is closed once another worker resumes its task."""
+
+import asyncio
+
+import main
+
+
+class FakeAgent:
+    def __init__(self):
+        self.closed = False
+
+    def browser_rss_mb(self) -> float:
+        return 100.0
+
+    async def close_session(self):
+        self.closed = True
+
+
+class FakeRPC:
+    def __init__(self, data):
+        self.data = data
+
+    async def execute(self):
+        return self
+
+
+class RenewLeases:
+    """renew_task_leases(): the parked task is now stamped with another worker."""
+
+    def __init__(self, taken: str):
+        self.taken = taken
+        self.calls = []
+
+    def rpc(self, name, params):
+        self.calls.append((name, params))
+        return FakeRPC([
+            {"task_id": task_id, "held": task_id != self.taken, "status": "running"}
+            for task_id in params["p_task_ids"]
+        ])
+
+
+def test_heartbeat_discards_session_resumed_elsewhere():
+    async def run():
+        worker = main.TaskWorker()
+        kept, taken = FakeAgent(), FakeAgent()
+        assert await worker.session_registry.park("task-kept", kept)
+        assert await worker.session_registry.park("task-taken", taken)
+
+        supabase = RenewLeases(taken="task-taken")
+        worker.leases.supabase = supabase
+        await worker.leases.heartbeat()
+        await asyncio.sleep(0)
+
+        # Parked tasks are part of the heartbeat
+        assert set(supabase.calls[0][1]["p_task_ids"]) == {"task-kept", "task-taken"}
+        assert taken.closed and not kept.closed
+        assert worker.session_registry.task_ids() == ["task-kept"]
+
+    asyncio.run(run())
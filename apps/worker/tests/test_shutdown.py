@@ -0,0 +1,62 @@
+"""SIGTERM during an agent run must drain the worker, not exit the process."""
+
+import os
+import sys
+import subprocess
+
+from conftest import WORKER_DIR
+
+# Runs in its own process: the test sends it SIGTERM
+SCRIPT = r'''
+import os
+import signal
+import asyncio
+
+import main
+import agent  # disables browser-use's signal handlers
+from browser_use.utils import SignalHandler
+
+
+async def fake_agent_run():
+    # What Agent.run() does around every run
+    handler = SignalHandler(loop=asyncio.get_running_loop(), exit_on_second_int=True)
+    handler.register()
+    try:
+        os.kill(os.getpid(), signal.SIGTERM)
+        await asyncio.sleep(0.2)
+        print("run finished", flush=True)
+    finally:
+        handler.unregister()
+
+
+async def run():
+    worker = main.TaskWorker()
+    worker.running = True
+    main.install_signal_handlers(worker)
+
+    await fake_agent_run()
+    assert not worker.running, "SIGTERM during the run did not reach the worker"
+
+    # After the run the worker's handlers must still be installed
+    worker.running = True
+    os.kill(os.getpid(), signal.SIGTERM)
+    await asyncio.sleep(0.1)
+    assert not worker.running, "SIGTERM after the run did not reach the worker"
+    print("drained", flush=True)
+
+
+asyncio.run(run())
+'''
+
+
+def test_sigterm_during_agent_run_drains():
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT],
+        cwd=WORKER_DIR,
+        env={**os.environ, "ANONYMIZED_TELEMETRY": "false"},
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.splitlines()[-2:] == ["run finished", "drained"]
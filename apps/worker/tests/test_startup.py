@@ -0,0 +1,40 @@
+"""The worker's assumptions about importing browser-use in the background hold for the pinned release."""
+
+import os
+import sys
+import subprocess
+
+from conftest import WORKER_DIR
+
+# Runs in its own process: importing browser-use changes process-wide state
+SCRIPT = r'''
+import sys
+import logging
+import importlib
+
+import main
+assert "browser_use" not in sys.modules, "main imported browser-use up front"
+
+handlers = list(logging.getLogger().handlers)
+agent = importlib.import_module("agent")
+assert logging.getLogger().handlers == handlers, "browser-use replaced the worker's log handlers"
+assert callable(agent.create_llm) and agent.BrowserAgent
+
+from importlib.metadata import version
+print(version("browser-use"), flush=True)
+'''
+
+
+def test_agent_import_keeps_worker_setup():
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT],
+        cwd=WORKER_DIR,
+        env={**os.environ, "ANONYMIZED_TELEMETRY": "false"},
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    # Matches browser-use>=0.11.2,<0.12 in requirements.txt
+    major, minor, patch = (int(part) for part in result.stdout.split()[-1].split(".")[:3])
+    assert (major, minor) == (0, 11) and patch >= 2
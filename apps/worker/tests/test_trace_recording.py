@@ -0,0 +1,62 @@
+"""Runs that signed in with vault credentials are not recorded for replay."""
+
+import asyncio
+
+import metrics
+from agent import BrowserAgent
+
+
+class FakeHistory:
+    history = [object(), object()]
+
+    def is_successful(self):
+        return True
+
+    def final_result(self):
+        return "Downloaded the invoice"
+
+    def model_dump(self, mode=None):
+        return {"history": []}
+
+
+class FakeAgent:
+    n_steps = 2
+    sensitive_data = None
+
+    async def run(self, **kwargs):
+        return FakeHistory()
+
+
+class FakeTraceCache:
+    def __init__(self):
+        self.saved = []
+
+    async def save(self, user_id, prompt, history, steps, seconds):
+        self.saved.append((user_id, prompt))
+
+
+class FakeLogSink:
+    async def write(self, task_id, message, log_type):
+        pass
+
+
+def _run(vault_hosts):
+    trace_cache = FakeTraceCache()
+    agent = BrowserAgent(None, None, FakeLogSink(), None, trace_cache)
+    agent.current_task_id = "task-1"
+    agent._user_id = "user-1"
+    agent._prompt = "download this month's invoice"
+    agent._agent = FakeAgent()
+    agent._vault_hosts = set(vault_hosts)
+    agent.task_metrics = metrics.track_task("task-1")
+    result = asyncio.run(agent._run_agent("task-1", record=True))
+    assert result["success"]
+    return trace_cache.saved
+
+
+def test_successful_run_is_recorded():
+    assert _run([]) == [("user-1", "download this month's invoice")]
+
+
+def test_run_with_vault_sign_in_is_not_recorded():
+    assert _run(["billing.example.com"]) == []
@@ -0,0 +1,108 @@
+"""
+Trace Cache - Record successful action traces and replay them
+
+Many tasks repeat the same prompt on a schedule ("download this month's
+invoice from X"). The first successful run records the agent's action
+history in the task_traces table, keyed by user and normalized prompt.
+Later runs replay those actions without asking the LLM what to do next.
+Replay re-locates every element it interacts with and stops at the first
+step that does not verify, and the LLM takes over from there.
+
+A failed replay clears the stored trace, so the next LLM run records a
+fresh one. Replay counters stay on the row to give the hit rate. Runs that
+signed in with vault credentials are not recorded: their trace only holds
+placeholders for the secrets.
+"""
+
+import os
+import re
+import hashlib
+import logging
+from typing import Optional
+
+from supabase import AsyncClient
+
+logger = logging.getLogger("autoagent.trace_cache")
+
+# Trace cache configuration
+TRACE_CACHE_ENABLED = os.getenv("TRACE_CACHE_ENABLED", "true").lower() == "true"
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    return re.sub(r"\s+", " ", prompt).strip().rstrip(".!").strip().lower()
+
+
+def prompt_hash(prompt: str) -> str:
+    """Key of a prompt in the trace store."""
+    return hashlib.sha256(normalize_prompt(prompt).encode("utf-8")).hexdigest()
+
+
+class TraceCache:
+    """
+    Stores one replayable action trace per (user, normalized prompt).
+
+    Usage:
+        cache = TraceCache(supabase)
+        trace = await cache.get(user_id, prompt)
+        stats = await cache.record_replay(user_id, prompt, success=True)
+        await cache.save(user_id, prompt, history.model_dump(), steps, seconds)
+    """
+
+    def __init__(self, supabase: AsyncClient, enabled: bool = TRACE_CACHE_ENABLED):
+        self.supabase = supabase
+        self.enabled = enabled
+
+    async def get(self, user_id: str, prompt: str) -> Optional[dict]:
+        """Return the stored trace row for a prompt, or None if there is none."""
+        if not self.enabled:
+            return None
+
+        try:
+            result = await self.supabase.table("task_traces").select(
+                "history, step_count, recorded_duration_seconds, replays, replay_failures"
+            ).eq("user_id", user_id).eq("prompt_hash", prompt_hash(prompt)).not_.is_(
+                "history", "null"
+            ).limit(1).execute()
+        except Exception as e:
+            logger.warning(f"Failed to load action trace: {e}")
+            return None
+
+        return result.data[0] if result.data else None
+
+    async def save(self, user_id: str, prompt: str, history: dict, step_count: int, duration_seconds: float):
+        """Record the action history of a successful run."""
+        if not self.enabled:
+            return
+
+        try:
+            await self.supabase.rpc("save_task_trace", {
+                "p_user_id": user_id,
+                "p_prompt_hash": prompt_hash(prompt),
+                "p_prompt": normalize_prompt(prompt),
+                "p_history": history,
+                "p_step_count": step_count,
+                "p_duration_seconds": duration_seconds,
+            }).execute()
+            logger.info(f"Recorded {step_count}-step action trace for user {user_id}")
+        except Exception as e:
+            logger.warning(f"Failed to save action trace: {e}")
+
+    async def record_replay(self, user_id: str, prompt: str, success: bool) -> dict:
+        """
+        Count a replay attempt; a failed replay also clears the stale trace.
+
+        Returns:
+            dict with the trace's replays and replay_failures after this attempt
+        """
+        try:
+            result = await self.supabase.rpc("record_trace_replay", {
+                "p_user_id": user_id,
+                "p_prompt_hash": prompt_hash(prompt),
+                "p_success": success,
+            }).execute()
+            rows = result.data or []
+            return rows[0] if rows else {}
+        except Exception as e:
+            logger.warning(f"Failed to record trace replay: {e}")
+            return {}
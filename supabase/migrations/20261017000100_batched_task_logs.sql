@@ -0,0 +1,26 @@
+-- ============================================================================
+-- BATCHED TASK LOGS
+-- Append several log entries to a task in a single call.
+-- ============================================================================
+-- The worker buffers log lines and flushes them together, so the logs array
+-- is rewritten once per batch instead of once per message.
+-- entries: JSON array of {timestamp, message, type} objects, oldest first.
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION public.append_task_logs(
+    task_id UUID,
+    entries JSONB
+)
+RETURNS VOID AS $$
+BEGIN
+    IF jsonb_typeof(entries) <> 'array' OR jsonb_array_length(entries) = 0 THEN
+        RETURN;
+    END IF;
+
+    UPDATE public.tasks
+    SET 
+        logs = logs || entries,
+        updated_at = NOW()
+    WHERE id = task_id;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
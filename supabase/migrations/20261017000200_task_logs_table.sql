@@ -0,0 +1,135 @@
+-- ============================================================================
+-- TASK LOGS TABLE
+-- Append-only log storage, replacing the tasks.logs JSONB array
+-- ============================================================================
+-- Appending to tasks.logs rewrites an ever-growing TOASTed value, and every
+-- realtime UPDATE on tasks ships the whole log history to clients. Log lines
+-- now live in their own table, keyed by (task_id, seq), so appends are plain
+-- inserts and readers page with "seq > N".
+--
+-- seq comes from a single identity sequence: it increases within a task (with
+-- gaps), which is all cursor-based paging needs.
+-- ============================================================================
+
+CREATE TABLE public.task_logs (
+    task_id UUID NOT NULL REFERENCES public.tasks(id) ON DELETE CASCADE,
+    seq BIGINT GENERATED ALWAYS AS IDENTITY,
+    user_id UUID NOT NULL REFERENCES public.profiles(id) ON DELETE CASCADE,
+
+    message TEXT NOT NULL,
+    type TEXT NOT NULL DEFAULT 'info',
+    logged_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+
+    PRIMARY KEY (task_id, seq)
+);
+
+-- Enable RLS
+ALTER TABLE public.task_logs ENABLE ROW LEVEL SECURITY;
+
+-- Policies for task logs (user_id is denormalized so checks avoid a join)
+CREATE POLICY "Users can view logs of their own tasks"
+    ON public.task_logs FOR SELECT
+    USING (auth.uid() = user_id);
+
+CREATE POLICY "Service role can manage all task logs"
+    ON public.task_logs FOR ALL
+    USING (auth.role() = 'service_role');
+
+-- Clients subscribe to INSERTs filtered by task_id: one small payload per line
+ALTER PUBLICATION supabase_realtime ADD TABLE public.task_logs;
+
+-- ============================================================================
+-- MOVE EXISTING LOGS
+-- ============================================================================
+INSERT INTO public.task_logs (task_id, user_id, message, type, logged_at)
+SELECT
+    t.id,
+    t.user_id,
+    COALESCE(entry.value->>'message', ''),
+    COALESCE(entry.value->>'type', 'info'),
+    COALESCE((entry.value->>'timestamp')::timestamptz, t.created_at)
+FROM public.tasks t
+CROSS JOIN LATERAL jsonb_array_elements(t.logs) WITH ORDINALITY AS entry(value, ord)
+WHERE jsonb_typeof(t.logs) = 'array'
+ORDER BY t.id, entry.ord;
+
+UPDATE public.tasks SET logs = '[]' WHERE logs IS DISTINCT FROM '[]';
+
+COMMENT ON COLUMN public.tasks.logs IS 'Deprecated: log lines are stored in public.task_logs';
+
+-- ============================================================================
+-- LOG FUNCTIONS
+-- ============================================================================
+
+-- Insert a batch of log entries ([{timestamp, message, type}], oldest first)
+CREATE OR REPLACE FUNCTION public.insert_task_logs(
+    p_task_id UUID,
+    p_entries JSONB
+)
+RETURNS BIGINT AS $$
+DECLARE
+    last_seq BIGINT;
+BEGIN
+    IF jsonb_typeof(p_entries) <> 'array' OR jsonb_array_length(p_entries) = 0 THEN
+        RETURN NULL;
+    END IF;
+
+    WITH inserted AS (
+        INSERT INTO public.task_logs (task_id, user_id, message, type, logged_at)
+        SELECT
+            t.id,
+            t.user_id,
+            COALESCE(entry.value->>'message', ''),
+            COALESCE(entry.value->>'type', 'info'),
+            COALESCE((entry.value->>'timestamp')::timestamptz, NOW())
+        FROM public.tasks t
+        CROSS JOIN LATERAL jsonb_array_elements(p_entries) WITH ORDINALITY AS entry(value, ord)
+        WHERE t.id = p_task_id
+        ORDER BY entry.ord
+        RETURNING seq
+    )
+    SELECT MAX(seq) INTO last_seq FROM inserted;
+
+    RETURN last_seq;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Page through a task's logs after a cursor
+CREATE OR REPLACE FUNCTION public.get_task_logs(
+    p_task_id UUID,
+    p_since_seq BIGINT DEFAULT 0,
+    p_limit INTEGER DEFAULT 200
+)
+RETURNS SETOF public.task_logs AS $$
+    SELECT *
+    FROM public.task_logs
+    WHERE task_id = p_task_id
+    AND seq > p_since_seq
+    ORDER BY seq
+    LIMIT LEAST(GREATEST(p_limit, 0), 1000);
+$$ LANGUAGE sql STABLE SECURITY INVOKER;
+
+-- Older entry points now write to task_logs as well
+CREATE OR REPLACE FUNCTION public.append_task_log(
+    task_id UUID,
+    log_message TEXT,
+    log_type TEXT DEFAULT 'info'
+)
+RETURNS VOID AS $$
+BEGIN
+    PERFORM public.insert_task_logs(
+        task_id,
+        jsonb_build_array(jsonb_build_object('timestamp', NOW(), 'message', log_message, 'type', log_type))
+    );
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+CREATE OR REPLACE FUNCTION public.append_task_logs(
+    task_id UUID,
+    entries JSONB
+)
+RETURNS VOID AS $$
+BEGIN
+    PERFORM public.insert_task_logs(task_id, entries);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
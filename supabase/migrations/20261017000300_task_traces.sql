@@ -0,0 +1,93 @@
+-- ============================================================================
+-- TASK TRACES
+-- Recorded action traces for replaying recurring prompts without the LLM
+-- ============================================================================
+-- One row per (user, normalized prompt). history holds the browser-use
+-- AgentHistoryList of the last successful LLM run. A replay that fails to
+-- verify clears history, and the next LLM run records a new trace. The
+-- replay counters are kept either way.
+-- ============================================================================
+
+CREATE TABLE public.task_traces (
+    user_id UUID NOT NULL REFERENCES public.profiles(id) ON DELETE CASCADE,
+    prompt_hash TEXT NOT NULL,                       -- sha256 of the normalized prompt
+    prompt TEXT NOT NULL,                            -- Normalized prompt
+
+    history JSONB DEFAULT NULL,                      -- Replayable action history (NULL once stale)
+    step_count INTEGER NOT NULL DEFAULT 0,
+    recorded_duration_seconds REAL NOT NULL DEFAULT 0, -- Wall time of the recorded LLM run
+
+    replays INTEGER NOT NULL DEFAULT 0,              -- Replays that completed
+    replay_failures INTEGER NOT NULL DEFAULT 0,      -- Replays handed back to the LLM
+
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    last_used_at TIMESTAMPTZ DEFAULT NULL,
+
+    PRIMARY KEY (user_id, prompt_hash)
+);
+
+-- Enable RLS
+ALTER TABLE public.task_traces ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view own task traces"
+    ON public.task_traces FOR SELECT
+    USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can delete own task traces"
+    ON public.task_traces FOR DELETE
+    USING (auth.uid() = user_id);
+
+CREATE POLICY "Service role can manage all task traces"
+    ON public.task_traces FOR ALL
+    USING (auth.role() = 'service_role');
+
+CREATE TRIGGER set_updated_at_task_traces
+    BEFORE UPDATE ON public.task_traces
+    FOR EACH ROW EXECUTE FUNCTION public.handle_updated_at();
+
+-- ============================================================================
+-- TRACE FUNCTIONS
+-- ============================================================================
+
+-- Store the trace of a successful run, keeping the replay counters
+CREATE OR REPLACE FUNCTION public.save_task_trace(
+    p_user_id UUID,
+    p_prompt_hash TEXT,
+    p_prompt TEXT,
+    p_history JSONB,
+    p_step_count INTEGER,
+    p_duration_seconds REAL
+)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO public.task_traces (user_id, prompt_hash, prompt, history, step_count, recorded_duration_seconds)
+    VALUES (p_user_id, p_prompt_hash, p_prompt, p_history, p_step_count, p_duration_seconds)
+    ON CONFLICT (user_id, prompt_hash) DO UPDATE SET
+        prompt = EXCLUDED.prompt,
+        history = EXCLUDED.history,
+        step_count = EXCLUDED.step_count,
+        recorded_duration_seconds = EXCLUDED.recorded_duration_seconds;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Count a replay attempt; a failed one clears the trace so it is re-recorded
+CREATE OR REPLACE FUNCTION public.record_trace_replay(
+    p_user_id UUID,
+    p_prompt_hash TEXT,
+    p_success BOOLEAN
+)
+RETURNS TABLE (replays INTEGER, replay_failures INTEGER) AS $$
+BEGIN
+    RETURN QUERY
+    UPDATE public.task_traces t
+    SET
+        replays = t.replays + CASE WHEN p_success THEN 1 ELSE 0 END,
+        replay_failures = t.replay_failures + CASE WHEN p_success THEN 0 ELSE 1 END,
+        history = CASE WHEN p_success THEN t.history ELSE NULL END,
+        last_used_at = NOW()
+    WHERE t.user_id = p_user_id
+    AND t.prompt_hash = p_prompt_hash
+    RETURNING t.replays, t.replay_failures;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
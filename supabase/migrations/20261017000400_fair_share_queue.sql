@@ -0,0 +1,196 @@
+-- ============================================================================
+-- FAIR-SHARE TASK QUEUE
+-- Weighted fair queuing across users, weighted by subscription tier
+-- ============================================================================
+-- claim_tasks() used to hand out pending tasks strictly by created_at, so one
+-- user with a large backlog delayed everyone queued behind it. It now uses
+-- start-time fair queuing:
+--
+--   * Every user has a finish tag in task_queue_shares; the queue has one
+--     virtual clock in task_queue_clock.
+--   * A user's next task starts at GREATEST(clock, finish tag). The user with
+--     the smallest start tag is served next (oldest task first on ties).
+--   * Serving a task advances the user's finish tag by 1 / tier weight and
+--     moves the clock to the served start tag.
+--
+-- A user with one task is therefore served within a round of the busiest
+-- users. Per-tier weights and running-task caps live in
+-- subscription_tier_limits; users at their cap are skipped
+-- (get_active_task_count over running and waiting_for_secret tasks).
+--
+-- Claims serialize on the clock row. Candidate users come from a loose index
+-- scan over idx_tasks_pending_user_created, so the cost grows with the
+-- number of users with pending work, not with the size of the backlog.
+-- ============================================================================
+
+-- Scheduling weight and concurrent-task cap per subscription tier
+CREATE TABLE public.subscription_tier_limits (
+    tier TEXT PRIMARY KEY CHECK (tier IN ('free', 'pro', 'enterprise')),
+    weight REAL NOT NULL CHECK (weight > 0),          -- Share of worker capacity under contention
+    max_running INTEGER NOT NULL CHECK (max_running > 0) -- Tasks running or paused at once
+);
+
+INSERT INTO public.subscription_tier_limits (tier, weight, max_running) VALUES
+    ('free', 1, 1),
+    ('pro', 4, 3),
+    ('enterprise', 8, 10);
+
+-- Per-user finish tag of the fair queue
+CREATE TABLE public.task_queue_shares (
+    user_id UUID PRIMARY KEY REFERENCES public.profiles(id) ON DELETE CASCADE,
+    finish_tag DOUBLE PRECISION NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- The queue's virtual clock (a single row)
+CREATE TABLE public.task_queue_clock (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    virtual_time DOUBLE PRECISION NOT NULL DEFAULT 0
+);
+
+INSERT INTO public.task_queue_clock (id, virtual_time) VALUES (TRUE, 0);
+
+-- Enable RLS
+ALTER TABLE public.subscription_tier_limits ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.task_queue_shares ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.task_queue_clock ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Anyone can view tier limits"
+    ON public.subscription_tier_limits FOR SELECT
+    USING (TRUE);
+
+CREATE POLICY "Service role can manage tier limits"
+    ON public.subscription_tier_limits FOR ALL
+    USING (auth.role() = 'service_role');
+
+CREATE POLICY "Service role can manage queue shares"
+    ON public.task_queue_shares FOR ALL
+    USING (auth.role() = 'service_role');
+
+CREATE POLICY "Service role can manage queue clock"
+    ON public.task_queue_clock FOR ALL
+    USING (auth.role() = 'service_role');
+
+CREATE TRIGGER set_updated_at_task_queue_shares
+    BEFORE UPDATE ON public.task_queue_shares
+    FOR EACH ROW EXECUTE FUNCTION public.handle_updated_at();
+
+-- Claim path: users with pending work, and each user's oldest pending task
+CREATE INDEX IF NOT EXISTS idx_tasks_pending_user_created
+    ON public.tasks(user_id, created_at)
+    WHERE status = 'pending';
+
+-- Per-user active task counts
+CREATE INDEX IF NOT EXISTS idx_tasks_user_status
+    ON public.tasks(user_id, status);
+
+-- Count a user's tasks in the given states (by default every unfinished one)
+DROP FUNCTION IF EXISTS public.get_active_task_count(UUID);
+
+CREATE OR REPLACE FUNCTION public.get_active_task_count(
+    p_user_id UUID,
+    p_statuses task_status[] DEFAULT ARRAY['pending', 'running', 'waiting_for_secret']::task_status[]
+)
+RETURNS INTEGER AS $$
+DECLARE
+    active_count INTEGER;
+BEGIN
+    SELECT COUNT(*) INTO active_count
+    FROM public.tasks
+    WHERE user_id = p_user_id
+    AND status = ANY(p_statuses);
+
+    RETURN active_count;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Claim up to p_limit pending tasks for a worker, in weighted fair order
+CREATE OR REPLACE FUNCTION public.claim_tasks(
+    p_worker_id TEXT,
+    p_limit INTEGER DEFAULT 1,
+    p_lease_seconds INTEGER DEFAULT 1800
+)
+RETURNS SETOF public.tasks AS $$
+DECLARE
+    v_clock DOUBLE PRECISION;
+    v_candidate RECORD;
+    v_task public.tasks;
+    v_claimed INTEGER := 0;
+BEGIN
+    -- One claimer at a time keeps the virtual clock and finish tags consistent
+    SELECT virtual_time INTO v_clock
+    FROM public.task_queue_clock
+    WHERE id
+    FOR UPDATE;
+
+    WHILE v_claimed < GREATEST(p_limit, 0) LOOP
+        v_task := NULL;
+
+        FOR v_candidate IN
+            WITH RECURSIVE pending_users(user_id) AS (
+                (SELECT user_id FROM public.tasks
+                 WHERE status = 'pending'
+                 ORDER BY user_id LIMIT 1)
+                UNION ALL
+                SELECT (SELECT t.user_id FROM public.tasks t
+                        WHERE t.status = 'pending' AND t.user_id > p.user_id
+                        ORDER BY t.user_id LIMIT 1)
+                FROM pending_users p
+                WHERE p.user_id IS NOT NULL
+            )
+            SELECT
+                u.user_id,
+                GREATEST(v_clock, COALESCE(s.finish_tag, 0)) AS start_tag,
+                COALESCE(l.weight, 1) AS weight,
+                COALESCE(l.max_running, 1) AS max_running,
+                (SELECT MIN(t.created_at) FROM public.tasks t
+                 WHERE t.status = 'pending' AND t.user_id = u.user_id) AS oldest_pending
+            FROM pending_users u
+            LEFT JOIN public.profiles pr ON pr.id = u.user_id
+            LEFT JOIN public.subscription_tier_limits l ON l.tier = pr.subscription_tier
+            LEFT JOIN public.task_queue_shares s ON s.user_id = u.user_id
+            WHERE u.user_id IS NOT NULL
+            ORDER BY start_tag, oldest_pending
+        LOOP
+            CONTINUE WHEN public.get_active_task_count(
+                v_candidate.user_id, ARRAY['running', 'waiting_for_secret']::task_status[]
+            ) >= v_candidate.max_running;
+
+            UPDATE public.tasks t
+            SET
+                status = 'running',
+                started_at = COALESCE(t.started_at, NOW()),
+                worker_id = p_worker_id,
+                lease_expires_at = NOW() + make_interval(secs => p_lease_seconds),
+                updated_at = NOW()
+            WHERE t.id = (
+                SELECT id FROM public.tasks
+                WHERE status = 'pending' AND user_id = v_candidate.user_id
+                ORDER BY created_at
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING t.* INTO v_task;
+
+            -- The user's oldest task is locked elsewhere (e.g. being cancelled)
+            CONTINUE WHEN v_task.id IS NULL;
+
+            INSERT INTO public.task_queue_shares (user_id, finish_tag)
+            VALUES (v_candidate.user_id, v_candidate.start_tag + 1.0 / v_candidate.weight)
+            ON CONFLICT (user_id) DO UPDATE SET finish_tag = EXCLUDED.finish_tag;
+
+            v_clock := v_candidate.start_tag;
+            EXIT;
+        END LOOP;
+
+        -- Nothing claimable: queue empty or every waiting user at their cap
+        EXIT WHEN v_task.id IS NULL;
+
+        v_claimed := v_claimed + 1;
+        RETURN NEXT v_task;
+    END LOOP;
+
+    UPDATE public.task_queue_clock SET virtual_time = v_clock WHERE id;
+    RETURN;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
@@ -0,0 +1,200 @@
+-- ============================================================================
+-- TASK LEASE HEARTBEATS AND REAPER
+-- Running tasks keep a short lease alive; tasks of dead workers are requeued
+-- ============================================================================
+-- A claimed task carries worker_id and lease_expires_at. The worker running
+-- it calls renew_task_leases() every few seconds, so the lease can be short
+-- (TASK_LEASE_SECONDS, two minutes by default). Workers also call
+-- reap_expired_tasks() periodically:
+--
+--   * Running tasks whose lease expired go back to pending, keeping their
+--     place in the queue (created_at is unchanged).
+--   * claim_tasks() counts claims in tasks.attempts. A task that expires
+--     with attempts >= p_max_attempts fails instead of being requeued.
+--   * A restarted worker passes its own ID as p_dead_worker_id. Its previous
+--     run's tasks are then reaped at once, without waiting for the lease.
+--
+-- Paused tasks that received input (status running, user_provided_input set)
+-- are left to claim_resumable_tasks(), which already takes over expired leases.
+-- ============================================================================
+
+ALTER TABLE public.tasks
+    ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0; -- Times a worker claimed the task to run it
+
+-- Reaper path: running tasks by lease expiry
+CREATE INDEX IF NOT EXISTS idx_tasks_running_lease
+    ON public.tasks(lease_expires_at)
+    WHERE status = 'running';
+
+-- Claim up to p_limit pending tasks for a worker, in weighted fair order
+CREATE OR REPLACE FUNCTION public.claim_tasks(
+    p_worker_id TEXT,
+    p_limit INTEGER DEFAULT 1,
+    p_lease_seconds INTEGER DEFAULT 1800
+)
+RETURNS SETOF public.tasks AS $$
+DECLARE
+    v_clock DOUBLE PRECISION;
+    v_candidate RECORD;
+    v_task public.tasks;
+    v_claimed INTEGER := 0;
+BEGIN
+    -- One claimer at a time keeps the virtual clock and finish tags consistent
+    SELECT virtual_time INTO v_clock
+    FROM public.task_queue_clock
+    WHERE id
+    FOR UPDATE;
+
+    WHILE v_claimed < GREATEST(p_limit, 0) LOOP
+        v_task := NULL;
+
+        FOR v_candidate IN
+            WITH RECURSIVE pending_users(user_id) AS (
+                (SELECT user_id FROM public.tasks
+                 WHERE status = 'pending'
+                 ORDER BY user_id LIMIT 1)
+                UNION ALL
+                SELECT (SELECT t.user_id FROM public.tasks t
+                        WHERE t.status = 'pending' AND t.user_id > p.user_id
+                        ORDER BY t.user_id LIMIT 1)
+                FROM pending_users p
+                WHERE p.user_id IS NOT NULL
+            )
+            SELECT
+                u.user_id,
+                GREATEST(v_clock, COALESCE(s.finish_tag, 0)) AS start_tag,
+                COALESCE(l.weight, 1) AS weight,
+                COALESCE(l.max_running, 1) AS max_running,
+                (SELECT MIN(t.created_at) FROM public.tasks t
+                 WHERE t.status = 'pending' AND t.user_id = u.user_id) AS oldest_pending
+            FROM pending_users u
+            LEFT JOIN public.profiles pr ON pr.id = u.user_id
+            LEFT JOIN public.subscription_tier_limits l ON l.tier = pr.subscription_tier
+            LEFT JOIN public.task_queue_shares s ON s.user_id = u.user_id
+            WHERE u.user_id IS NOT NULL
+            ORDER BY start_tag, oldest_pending
+        LOOP
+            CONTINUE WHEN public.get_active_task_count(
+                v_candidate.user_id, ARRAY['running', 'waiting_for_secret']::task_status[]
+            ) >= v_candidate.max_running;
+
+            UPDATE public.tasks t
+            SET
+                status = 'running',
+                started_at = COALESCE(t.started_at, NOW()),
+                worker_id = p_worker_id,
+                lease_expires_at = NOW() + make_interval(secs => p_lease_seconds),
+                attempts = t.attempts + 1,
+                updated_at = NOW()
+            WHERE t.id = (
+                SELECT id FROM public.tasks
+                WHERE status = 'pending' AND user_id = v_candidate.user_id
+                ORDER BY created_at
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING t.* INTO v_task;
+
+            -- The user's oldest task is locked elsewhere (e.g. being cancelled)
+            CONTINUE WHEN v_task.id IS NULL;
+
+            INSERT INTO public.task_queue_shares (user_id, finish_tag)
+            VALUES (v_candidate.user_id, v_candidate.start_tag + 1.0 / v_candidate.weight)
+            ON CONFLICT (user_id) DO UPDATE SET finish_tag = EXCLUDED.finish_tag;
+
+            v_clock := v_candidate.start_tag;
+            EXIT;
+        END LOOP;
+
+        -- Nothing claimable: queue empty or every waiting user at their cap
+        EXIT WHEN v_task.id IS NULL;
+
+        v_claimed := v_claimed + 1;
+        RETURN NEXT v_task;
+    END LOOP;
+
+    UPDATE public.task_queue_clock SET virtual_time = v_clock WHERE id;
+    RETURN;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Extend the leases a worker holds; reports for each task whether it still holds it
+CREATE OR REPLACE FUNCTION public.renew_task_leases(
+    p_worker_id TEXT,
+    p_task_ids UUID[],
+    p_lease_seconds INTEGER DEFAULT 120
+)
+RETURNS TABLE (task_id UUID, held BOOLEAN) AS $$
+BEGIN
+    UPDATE public.tasks
+    SET lease_expires_at = NOW() + make_interval(secs => p_lease_seconds)
+    WHERE id = ANY(p_task_ids)
+    AND worker_id = p_worker_id
+    AND status = 'running'
+    AND lease_expires_at IS NOT NULL;
+
+    -- Finished or paused tasks keep the worker ID and still count as held
+    RETURN QUERY
+    SELECT t.id, t.worker_id IS NOT DISTINCT FROM p_worker_id
+    FROM public.tasks t
+    WHERE t.id = ANY(p_task_ids);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Requeue running tasks whose lease expired, failing those out of attempts
+CREATE OR REPLACE FUNCTION public.reap_expired_tasks(
+    p_max_attempts INTEGER DEFAULT 3,
+    p_dead_worker_id TEXT DEFAULT NULL,
+    p_limit INTEGER DEFAULT 100
+)
+RETURNS TABLE (task_id UUID, status task_status, attempts INTEGER) AS $$
+DECLARE
+    v_task RECORD;
+BEGIN
+    FOR v_task IN
+        WITH expired AS (
+            SELECT id
+            FROM public.tasks
+            WHERE tasks.status = 'running'
+            AND user_provided_input IS NULL
+            AND (
+                lease_expires_at < NOW()
+                OR (p_dead_worker_id IS NOT NULL AND worker_id = p_dead_worker_id)
+            )
+            ORDER BY lease_expires_at
+            LIMIT GREATEST(p_limit, 0)
+            FOR UPDATE SKIP LOCKED
+        )
+        UPDATE public.tasks t
+        SET
+            status = CASE WHEN t.attempts >= p_max_attempts THEN 'failed'::task_status ELSE 'pending'::task_status END,
+            error_message = CASE
+                WHEN t.attempts >= p_max_attempts
+                THEN format('Task abandoned by its worker %s times', t.attempts)
+                ELSE t.error_message
+            END,
+            completed_at = CASE WHEN t.attempts >= p_max_attempts THEN NOW() ELSE NULL END,
+            worker_id = NULL,
+            lease_expires_at = NULL,
+            updated_at = NOW()
+        FROM expired
+        WHERE t.id = expired.id
+        RETURNING t.id, t.status, t.attempts
+    LOOP
+        PERFORM public.insert_task_logs(v_task.id, jsonb_build_array(jsonb_build_object(
+            'timestamp', NOW(),
+            'message', CASE
+                WHEN v_task.status = 'pending'
+                THEN format('Worker stopped responding, task requeued (attempt %s of %s)', v_task.attempts, p_max_attempts)
+                ELSE format('Worker stopped responding %s times, giving up', v_task.attempts)
+            END,
+            'type', CASE WHEN v_task.status = 'pending' THEN 'warning' ELSE 'error' END
+        )));
+
+        task_id := v_task.id;
+        status := v_task.status;
+        attempts := v_task.attempts;
+        RETURN NEXT;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
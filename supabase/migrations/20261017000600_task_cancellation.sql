@@ -0,0 +1,37 @@
+-- ============================================================================
+-- TASK CANCELLATION
+-- Running tasks learn about cancellation from their lease heartbeat
+-- ============================================================================
+-- Workers stop a run as soon as its task is set to 'cancelled'. They learn
+-- about it from Supabase Realtime and, as a fallback, from the lease
+-- heartbeat: renew_task_leases() now also returns each task's status.
+-- Workers also stop runs that pass TASK_DEADLINE_SECONDS or
+-- TASK_TOKEN_BUDGET, and record the reason in error_message.
+-- ============================================================================
+
+-- The result columns change, so the function is recreated
+DROP FUNCTION IF EXISTS public.renew_task_leases(TEXT, UUID[], INTEGER);
+
+-- Extend the leases a worker holds; reports for each task whether it still
+-- holds it and its status (so cancelled runs can be stopped)
+CREATE OR REPLACE FUNCTION public.renew_task_leases(
+    p_worker_id TEXT,
+    p_task_ids UUID[],
+    p_lease_seconds INTEGER DEFAULT 120
+)
+RETURNS TABLE (task_id UUID, held BOOLEAN, status task_status) AS $$
+BEGIN
+    UPDATE public.tasks t
+    SET lease_expires_at = NOW() + make_interval(secs => p_lease_seconds)
+    WHERE t.id = ANY(p_task_ids)
+    AND t.worker_id = p_worker_id
+    AND t.status = 'running'
+    AND t.lease_expires_at IS NOT NULL;
+
+    -- Finished or paused tasks keep the worker ID and still count as held
+    RETURN QUERY
+    SELECT t.id, t.worker_id IS NOT DISTINCT FROM p_worker_id, t.status
+    FROM public.tasks t
+    WHERE t.id = ANY(p_task_ids);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
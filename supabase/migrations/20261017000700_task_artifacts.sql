@@ -0,0 +1,33 @@
+-- ============================================================================
+-- TASK ARTIFACTS
+-- Storage bucket for content-addressed task screenshots
+-- ============================================================================
+-- Workers store step screenshots downscaled and re-encoded as WebP, named by
+-- the SHA-256 of their bytes: <first 2 hex chars>/<sha256>.webp. The same
+-- image is stored once, whichever task produced it. Tasks reference
+-- artifacts by hash, in result->'artifacts'->'screenshots' and in
+-- required_input->>'screenshot'.
+--
+-- The bucket is private. Workers upload with the service role; users can
+-- read the artifacts their own tasks reference.
+-- ============================================================================
+
+INSERT INTO storage.buckets (id, name, public, allowed_mime_types)
+VALUES ('task-artifacts', 'task-artifacts', FALSE, ARRAY['image/webp'])
+ON CONFLICT (id) DO NOTHING;
+
+CREATE POLICY "Users can view artifacts of their tasks"
+    ON storage.objects FOR SELECT
+    USING (
+        bucket_id = 'task-artifacts'
+        AND EXISTS (
+            SELECT 1 FROM public.tasks t
+            WHERE t.user_id = auth.uid()
+            AND (
+                t.result->'artifacts'->'screenshots' @> jsonb_build_array(
+                    jsonb_build_object('sha256', split_part(storage.filename(name), '.', 1))
+                )
+                OR t.required_input->>'screenshot' = split_part(storage.filename(name), '.', 1)
+            )
+        )
+    );
@@ -0,0 +1,20 @@
+-- ============================================================================
+-- RESTRICT TASK CLAIMING TO WORKERS
+-- Only the service role may call claim_tasks() and claim_resumable_tasks()
+-- ============================================================================
+-- Both functions are SECURITY DEFINER and return whole tasks rows, including
+-- other users' prompts and user_provided_input (the secrets users type in).
+-- Functions are executable by PUBLIC by default, and Supabase also grants
+-- anon and authenticated EXECUTE on new functions in public. So anyone with
+-- the anon key could claim the queue under a made-up worker ID and read
+-- every pending secret. Workers connect with the service role key.
+--
+-- A function that is dropped and recreated (e.g. to change its parameters)
+-- gets the default grants back, so such a migration must repeat these lines.
+-- ============================================================================
+
+REVOKE EXECUTE ON FUNCTION public.claim_tasks(TEXT, INTEGER, INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.claim_tasks(TEXT, INTEGER, INTEGER) TO service_role;
+
+REVOKE EXECUTE ON FUNCTION public.claim_resumable_tasks(TEXT, INTEGER, INTEGER, INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.claim_resumable_tasks(TEXT, INTEGER, INTEGER, INTEGER) TO service_role;
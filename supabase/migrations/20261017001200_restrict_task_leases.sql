@@ -0,0 +1,18 @@
+-- ============================================================================
+-- RESTRICT TASK LEASES TO WORKERS
+-- Only the service role may call renew_task_leases() and reap_expired_tasks()
+-- ============================================================================
+-- Both functions are SECURITY DEFINER. With the default grants, any client
+-- could requeue or fail other users' running tasks (p_dead_worker_id reaps
+-- every task of any worker) or keep a hijacked lease alive. Workers connect
+-- with the service role key.
+--
+-- A function that is dropped and recreated (e.g. to change its parameters)
+-- gets the default grants back, so such a migration must repeat these lines.
+-- ============================================================================
+
+REVOKE EXECUTE ON FUNCTION public.renew_task_leases(TEXT, UUID[], INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.renew_task_leases(TEXT, UUID[], INTEGER) TO service_role;
+
+REVOKE EXECUTE ON FUNCTION public.reap_expired_tasks(INTEGER, TEXT, INTEGER, INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.reap_expired_tasks(INTEGER, TEXT, INTEGER, INTEGER) TO service_role;
@@ -0,0 +1,16 @@
+-- ============================================================================
+-- RESTRICT TASK TRACES TO WORKERS
+-- Only the service role may call save_task_trace() and record_trace_replay()
+-- ============================================================================
+-- Both functions are SECURITY DEFINER and take an arbitrary p_user_id. With
+-- the default grants, any client could plant a history under another user's
+-- prompt hash. The worker would then replay those browser actions in that
+-- user's next run of the prompt, without the LLM. Workers connect with the
+-- service role key.
+-- ============================================================================
+
+REVOKE EXECUTE ON FUNCTION public.save_task_trace(UUID, TEXT, TEXT, JSONB, INTEGER, REAL) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.save_task_trace(UUID, TEXT, TEXT, JSONB, INTEGER, REAL) TO service_role;
+
+REVOKE EXECUTE ON FUNCTION public.record_trace_replay(UUID, TEXT, BOOLEAN) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.record_trace_replay(UUID, TEXT, BOOLEAN) TO service_role;
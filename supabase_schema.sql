@@ -168,7 +168,7 @@ CREATE TABLE public.tasks (
     user_provided_input TEXT DEFAULT NULL,   -- The secret/input provided by user
     
     -- Execution logs (agent writes here in real-time)
-    logs JSONB DEFAULT '[]',                 -- Array of log entries [{timestamp, message, type}]
+    logs JSONB DEFAULT '[]',                 -- Deprecated: log lines live in task_logs
     
     -- Results
     result JSONB DEFAULT NULL,               -- Final result/output of the task
@@ -177,6 +177,12 @@ CREATE TABLE public.tasks (
     -- Browser state (for pause/resume)
     browser_state JSONB DEFAULT NULL,        -- Serialized browser state for resumption
     
+    -- Worker claim (see claim_tasks)
+    worker_id TEXT DEFAULT NULL,             -- Worker currently holding the task
+    lease_expires_at TIMESTAMPTZ DEFAULT NULL, -- When that worker's claim lapses
+    attempts INTEGER NOT NULL DEFAULT 0,     -- Times a worker claimed the task to run it
+    parked_at TIMESTAMPTZ DEFAULT NULL,      -- When worker_id parked the live session of the paused task
+    
     -- Timestamps
     created_at TIMESTAMPTZ DEFAULT NOW(),
     started_at TIMESTAMPTZ DEFAULT NULL,
@@ -214,18 +220,112 @@ CREATE POLICY "Service role can manage all tasks"
 CREATE INDEX idx_tasks_status ON public.tasks(status);
 CREATE INDEX idx_tasks_user_id ON public.tasks(user_id);
 CREATE INDEX idx_tasks_created_at ON public.tasks(created_at);
+CREATE INDEX idx_tasks_pending_created_at ON public.tasks(created_at) WHERE status = 'pending';
+CREATE INDEX idx_tasks_running_with_input ON public.tasks(updated_at)
+    WHERE status = 'running' AND user_provided_input IS NOT NULL;
+CREATE INDEX idx_tasks_pending_user_created ON public.tasks(user_id, created_at) WHERE status = 'pending';
+CREATE INDEX idx_tasks_user_status ON public.tasks(user_id, status);
+CREATE INDEX idx_tasks_running_lease ON public.tasks(lease_expires_at) WHERE status = 'running';
+
+-- ============================================================================
+-- TASK LOGS TABLE
+-- Append-only execution logs, paged by (task_id, seq)
+-- ============================================================================
+CREATE TABLE public.task_logs (
+    task_id UUID NOT NULL REFERENCES public.tasks(id) ON DELETE CASCADE,
+    seq BIGINT NOT NULL,                     -- Per task, in commit order (assigned by insert_task_logs)
+    user_id UUID NOT NULL REFERENCES public.profiles(id) ON DELETE CASCADE,
+
+    message TEXT NOT NULL,
+    type TEXT NOT NULL DEFAULT 'info',
+    logged_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+
+    PRIMARY KEY (task_id, seq)
+);
+
+-- Enable RLS
+ALTER TABLE public.task_logs ENABLE ROW LEVEL SECURITY;
+
+-- Policies for task logs (user_id is denormalized so checks avoid a join)
+CREATE POLICY "Users can view logs of their own tasks"
+    ON public.task_logs FOR SELECT
+    USING (auth.uid() = user_id);
+
+CREATE POLICY "Service role can manage all task logs"
+    ON public.task_logs FOR ALL
+    USING (auth.role() = 'service_role');
 
 -- ============================================================================
 -- REALTIME CONFIGURATION
--- Enable realtime for tasks and messages tables
+-- Enable realtime for tasks, messages and task logs tables
 -- ============================================================================
 ALTER PUBLICATION supabase_realtime ADD TABLE public.tasks;
 ALTER PUBLICATION supabase_realtime ADD TABLE public.messages;
+ALTER PUBLICATION supabase_realtime ADD TABLE public.task_logs;
 
 -- ============================================================================
 -- HELPER FUNCTIONS
 -- ============================================================================
 
+-- Insert a batch of log entries ([{timestamp, message, type}], oldest first);
+-- returns the seq of the last one
+CREATE OR REPLACE FUNCTION public.insert_task_logs(
+    p_task_id UUID,
+    p_entries JSONB
+)
+RETURNS BIGINT AS $$
+DECLARE
+    v_user_id UUID;
+    v_last_seq BIGINT;
+BEGIN
+    IF jsonb_typeof(p_entries) <> 'array' OR jsonb_array_length(p_entries) = 0 THEN
+        RETURN NULL;
+    END IF;
+
+    -- Held until commit: the next inserter for this task waits here, then
+    -- sees this batch when it reads the highest seq
+    SELECT user_id INTO v_user_id
+    FROM public.tasks
+    WHERE id = p_task_id
+    FOR NO KEY UPDATE;
+
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+
+    SELECT COALESCE(MAX(seq), 0) INTO v_last_seq
+    FROM public.task_logs
+    WHERE task_id = p_task_id;
+
+    INSERT INTO public.task_logs (task_id, seq, user_id, message, type, logged_at)
+    SELECT
+        p_task_id,
+        v_last_seq + entry.ord,
+        v_user_id,
+        COALESCE(entry.value->>'message', ''),
+        COALESCE(entry.value->>'type', 'info'),
+        COALESCE((entry.value->>'timestamp')::timestamptz, NOW())
+    FROM jsonb_array_elements(p_entries) WITH ORDINALITY AS entry(value, ord);
+
+    RETURN v_last_seq + jsonb_array_length(p_entries);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Page through a task's logs after a cursor
+CREATE OR REPLACE FUNCTION public.get_task_logs(
+    p_task_id UUID,
+    p_since_seq BIGINT DEFAULT 0,
+    p_limit INTEGER DEFAULT 200
+)
+RETURNS SETOF public.task_logs AS $$
+    SELECT *
+    FROM public.task_logs
+    WHERE task_id = p_task_id
+    AND seq > p_since_seq
+    ORDER BY seq
+    LIMIT LEAST(GREATEST(p_limit, 0), 1000);
+$$ LANGUAGE sql STABLE SECURITY INVOKER;
+
 -- Function to append a log entry to a task
 CREATE OR REPLACE FUNCTION public.append_task_log(
     task_id UUID,
@@ -234,15 +334,21 @@ CREATE OR REPLACE FUNCTION public.append_task_log(
 )
 RETURNS VOID AS $$
 BEGIN
-    UPDATE public.tasks
-    SET 
-        logs = logs || jsonb_build_object(
-            'timestamp', NOW(),
-            'message', log_message,
-            'type', log_type
-        ),
-        updated_at = NOW()
-    WHERE id = task_id;
+    PERFORM public.insert_task_logs(
+        task_id,
+        jsonb_build_array(jsonb_build_object('timestamp', NOW(), 'message', log_message, 'type', log_type))
+    );
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Function to append a batch of log entries to a task
+CREATE OR REPLACE FUNCTION public.append_task_logs(
+    task_id UUID,
+    entries JSONB
+)
+RETURNS VOID AS $$
+BEGIN
+    PERFORM public.insert_task_logs(task_id, entries);
 END;
 $$ LANGUAGE plpgsql SECURITY DEFINER;
 
@@ -265,6 +371,243 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql SECURITY DEFINER;
 
+-- Workers claim tasks atomically so several replicas can share the queue.
+-- Pending tasks are served in weighted fair order across users (start-time
+-- fair queuing, weighted by subscription tier; see FAIR-SHARE QUEUE TABLES).
+-- Claim up to p_limit pending tasks for a worker, in weighted fair order
+CREATE OR REPLACE FUNCTION public.claim_tasks(
+    p_worker_id TEXT,
+    p_limit INTEGER DEFAULT 1,
+    p_lease_seconds INTEGER DEFAULT 1800
+)
+RETURNS SETOF public.tasks AS $$
+DECLARE
+    v_clock DOUBLE PRECISION;
+    v_candidate RECORD;
+    v_task public.tasks;
+    v_claimed INTEGER := 0;
+BEGIN
+    -- One claimer at a time keeps the virtual clock and finish tags consistent
+    SELECT virtual_time INTO v_clock
+    FROM public.task_queue_clock
+    WHERE id
+    FOR UPDATE;
+
+    WHILE v_claimed < GREATEST(p_limit, 0) LOOP
+        v_task := NULL;
+
+        FOR v_candidate IN
+            WITH RECURSIVE pending_users(user_id) AS (
+                (SELECT user_id FROM public.tasks
+                 WHERE status = 'pending'
+                 ORDER BY user_id LIMIT 1)
+                UNION ALL
+                SELECT (SELECT t.user_id FROM public.tasks t
+                        WHERE t.status = 'pending' AND t.user_id > p.user_id
+                        ORDER BY t.user_id LIMIT 1)
+                FROM pending_users p
+                WHERE p.user_id IS NOT NULL
+            )
+            SELECT
+                u.user_id,
+                GREATEST(v_clock, COALESCE(s.finish_tag, 0)) AS start_tag,
+                COALESCE(l.weight, 1) AS weight,
+                COALESCE(l.max_running, 1) AS max_running,
+                (SELECT MIN(t.created_at) FROM public.tasks t
+                 WHERE t.status = 'pending' AND t.user_id = u.user_id) AS oldest_pending
+            FROM pending_users u
+            LEFT JOIN public.profiles pr ON pr.id = u.user_id
+            LEFT JOIN public.subscription_tier_limits l ON l.tier = pr.subscription_tier
+            LEFT JOIN public.task_queue_shares s ON s.user_id = u.user_id
+            WHERE u.user_id IS NOT NULL
+            ORDER BY start_tag, oldest_pending
+        LOOP
+            CONTINUE WHEN public.get_active_task_count(
+                v_candidate.user_id, ARRAY['running', 'waiting_for_secret']::task_status[]
+            ) >= v_candidate.max_running;
+
+            UPDATE public.tasks t
+            SET
+                status = 'running',
+                started_at = COALESCE(t.started_at, NOW()),
+                worker_id = p_worker_id,
+                lease_expires_at = NOW() + make_interval(secs => p_lease_seconds),
+                attempts = t.attempts + 1,
+                updated_at = NOW()
+            WHERE t.id = (
+                SELECT id FROM public.tasks
+                WHERE status = 'pending' AND user_id = v_candidate.user_id
+                ORDER BY created_at
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING t.* INTO v_task;
+
+            -- The user's oldest task is locked elsewhere (e.g. being cancelled)
+            CONTINUE WHEN v_task.id IS NULL;
+
+            INSERT INTO public.task_queue_shares (user_id, finish_tag)
+            VALUES (v_candidate.user_id, v_candidate.start_tag + 1.0 / v_candidate.weight)
+            ON CONFLICT (user_id) DO UPDATE SET finish_tag = EXCLUDED.finish_tag;
+
+            v_clock := v_candidate.start_tag;
+            EXIT;
+        END LOOP;
+
+        -- Nothing claimable: queue empty or every waiting user at their cap
+        EXIT WHEN v_task.id IS NULL;
+
+        v_claimed := v_claimed + 1;
+        RETURN NEXT v_task;
+    END LOOP;
+
+    UPDATE public.task_queue_clock SET virtual_time = v_clock WHERE id;
+    RETURN;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Only workers (service role) may call it
+REVOKE EXECUTE ON FUNCTION public.claim_tasks(TEXT, INTEGER, INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.claim_tasks(TEXT, INTEGER, INTEGER) TO service_role;
+
+-- Claim up to p_limit tasks whose user provided input and that no worker
+-- holds; a parked task is reserved for its parking worker for
+-- p_affinity_seconds after the input arrived (updated_at)
+CREATE OR REPLACE FUNCTION public.claim_resumable_tasks(
+    p_worker_id TEXT,
+    p_limit INTEGER DEFAULT 1,
+    p_lease_seconds INTEGER DEFAULT 1800,
+    p_affinity_seconds INTEGER DEFAULT 15
+)
+RETURNS SETOF public.tasks AS $$
+BEGIN
+    RETURN QUERY
+    WITH claimable AS (
+        SELECT id
+        FROM public.tasks
+        WHERE status = 'running'
+        AND user_provided_input IS NOT NULL
+        AND (lease_expires_at IS NULL OR lease_expires_at < NOW())
+        AND (
+            parked_at IS NULL
+            OR worker_id IS NOT DISTINCT FROM p_worker_id
+            OR updated_at < NOW() - make_interval(secs => p_affinity_seconds)
+        )
+        ORDER BY updated_at
+        LIMIT GREATEST(p_limit, 0)
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE public.tasks t
+    SET
+        worker_id = p_worker_id,
+        lease_expires_at = NOW() + make_interval(secs => p_lease_seconds),
+        parked_at = NULL,
+        updated_at = NOW()
+    FROM claimable
+    WHERE t.id = claimable.id
+    RETURNING t.*;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Only workers (service role) may call it
+REVOKE EXECUTE ON FUNCTION public.claim_resumable_tasks(TEXT, INTEGER, INTEGER, INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.claim_resumable_tasks(TEXT, INTEGER, INTEGER, INTEGER) TO service_role;
+
+-- Running tasks renew their lease with heartbeats; tasks whose lease expires
+-- go back to pending, or fail once claimed p_max_attempts times.
+-- Extend the leases a worker holds; reports for each task whether it still
+-- holds it and its status (so cancelled runs can be stopped)
+CREATE OR REPLACE FUNCTION public.renew_task_leases(
+    p_worker_id TEXT,
+    p_task_ids UUID[],
+    p_lease_seconds INTEGER DEFAULT 120
+)
+RETURNS TABLE (task_id UUID, held BOOLEAN, status task_status) AS $$
+BEGIN
+    UPDATE public.tasks t
+    SET lease_expires_at = NOW() + make_interval(secs => p_lease_seconds)
+    WHERE t.id = ANY(p_task_ids)
+    AND t.worker_id = p_worker_id
+    AND t.status = 'running'
+    AND t.lease_expires_at IS NOT NULL;
+
+    -- Finished or paused tasks keep the worker ID and still count as held
+    RETURN QUERY
+    SELECT t.id, t.worker_id IS NOT DISTINCT FROM p_worker_id, t.status
+    FROM public.tasks t
+    WHERE t.id = ANY(p_task_ids);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Workers only (service role key); see the function's migration
+REVOKE EXECUTE ON FUNCTION public.renew_task_leases(TEXT, UUID[], INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.renew_task_leases(TEXT, UUID[], INTEGER) TO service_role;
+
+-- Requeue running tasks whose lease expired (or that never had one), failing
+-- those out of attempts
+CREATE OR REPLACE FUNCTION public.reap_expired_tasks(
+    p_max_attempts INTEGER DEFAULT 3,
+    p_dead_worker_id TEXT DEFAULT NULL,
+    p_limit INTEGER DEFAULT 100,
+    p_unleased_seconds INTEGER DEFAULT 600
+)
+RETURNS TABLE (task_id UUID, status task_status, attempts INTEGER) AS $$
+DECLARE
+    v_task RECORD;
+BEGIN
+    FOR v_task IN
+        WITH expired AS (
+            SELECT id
+            FROM public.tasks
+            WHERE tasks.status = 'running'
+            AND user_provided_input IS NULL
+            AND (
+                lease_expires_at < NOW()
+                OR (lease_expires_at IS NULL AND started_at < NOW() - make_interval(secs => p_unleased_seconds))
+                OR (p_dead_worker_id IS NOT NULL AND worker_id = p_dead_worker_id)
+            )
+            ORDER BY COALESCE(lease_expires_at, started_at)
+            LIMIT GREATEST(p_limit, 0)
+            FOR UPDATE SKIP LOCKED
+        )
+        UPDATE public.tasks t
+        SET
+            status = CASE WHEN t.attempts >= p_max_attempts THEN 'failed'::task_status ELSE 'pending'::task_status END,
+            error_message = CASE
+                WHEN t.attempts >= p_max_attempts
+                THEN format('Task abandoned by its worker %s times', t.attempts)
+                ELSE t.error_message
+            END,
+            completed_at = CASE WHEN t.attempts >= p_max_attempts THEN NOW() ELSE NULL END,
+            worker_id = NULL,
+            lease_expires_at = NULL,
+            updated_at = NOW()
+        FROM expired
+        WHERE t.id = expired.id
+        RETURNING t.id, t.status, t.attempts
+    LOOP
+        PERFORM public.insert_task_logs(v_task.id, jsonb_build_array(jsonb_build_object(
+            'timestamp', NOW(),
+            'message', CASE
+                WHEN v_task.status = 'pending'
+                THEN format('Worker stopped responding, task requeued (attempt %s of %s)', v_task.attempts, p_max_attempts)
+                ELSE format('Worker stopped responding %s times, giving up', v_task.attempts)
+            END,
+            'type', CASE WHEN v_task.status = 'pending' THEN 'warning' ELSE 'error' END
+        )));
+
+        task_id := v_task.id;
+        status := v_task.status;
+        attempts := v_task.attempts;
+        RETURN NEXT;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Workers only (service role key); see the function's migration
+REVOKE EXECUTE ON FUNCTION public.reap_expired_tasks(INTEGER, TEXT, INTEGER, INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.reap_expired_tasks(INTEGER, TEXT, INTEGER, INTEGER) TO service_role;
+
 -- ============================================================================
 -- UPDATED_AT TRIGGER
 -- Automatically update the updated_at timestamp
@@ -384,7 +727,9 @@ CREATE TABLE public.secrets_vault (
     name TEXT NOT NULL,
     description TEXT,
     
-    -- Encrypted credentials (encrypted with user's key)
+    -- Credentials. The vault page stores them as entered (plaintext at rest,
+    -- guarded by RLS); the worker reads them through a decrypt hook that is
+    -- the identity until the app encrypts them client-side
     encrypted_username TEXT,
     encrypted_password TEXT,
     encrypted_notes TEXT,
@@ -445,12 +790,188 @@ CREATE TRIGGER set_updated_at_usage_tracking
     BEFORE UPDATE ON public.usage_tracking
     FOR EACH ROW EXECUTE FUNCTION public.handle_updated_at();
 
+-- ============================================================================
+-- TASK TRACES TABLE
+-- Recorded action traces, replayed for recurring prompts
+-- ============================================================================
+CREATE TABLE public.task_traces (
+    user_id UUID NOT NULL REFERENCES public.profiles(id) ON DELETE CASCADE,
+    prompt_hash TEXT NOT NULL,                       -- sha256 of the normalized prompt
+    prompt TEXT NOT NULL,                            -- Normalized prompt
+
+    history JSONB DEFAULT NULL,                      -- Replayable action history (NULL once stale)
+    step_count INTEGER NOT NULL DEFAULT 0,
+    recorded_duration_seconds REAL NOT NULL DEFAULT 0, -- Wall time of the recorded LLM run
+
+    replays INTEGER NOT NULL DEFAULT 0,              -- Replays that completed
+    replay_failures INTEGER NOT NULL DEFAULT 0,      -- Replays handed back to the LLM
+
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    last_used_at TIMESTAMPTZ DEFAULT NULL,
+
+    PRIMARY KEY (user_id, prompt_hash)
+);
+
+-- Enable RLS
+ALTER TABLE public.task_traces ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view own task traces"
+    ON public.task_traces FOR SELECT
+    USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can delete own task traces"
+    ON public.task_traces FOR DELETE
+    USING (auth.uid() = user_id);
+
+CREATE POLICY "Service role can manage all task traces"
+    ON public.task_traces FOR ALL
+    USING (auth.role() = 'service_role');
+
+CREATE TRIGGER set_updated_at_task_traces
+    BEFORE UPDATE ON public.task_traces
+    FOR EACH ROW EXECUTE FUNCTION public.handle_updated_at();
+
+-- Store the trace of a successful run, keeping the replay counters
+CREATE OR REPLACE FUNCTION public.save_task_trace(
+    p_user_id UUID,
+    p_prompt_hash TEXT,
+    p_prompt TEXT,
+    p_history JSONB,
+    p_step_count INTEGER,
+    p_duration_seconds REAL
+)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO public.task_traces (user_id, prompt_hash, prompt, history, step_count, recorded_duration_seconds)
+    VALUES (p_user_id, p_prompt_hash, p_prompt, p_history, p_step_count, p_duration_seconds)
+    ON CONFLICT (user_id, prompt_hash) DO UPDATE SET
+        prompt = EXCLUDED.prompt,
+        history = EXCLUDED.history,
+        step_count = EXCLUDED.step_count,
+        recorded_duration_seconds = EXCLUDED.recorded_duration_seconds;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Workers only (service role key); see the function's migration
+REVOKE EXECUTE ON FUNCTION public.save_task_trace(UUID, TEXT, TEXT, JSONB, INTEGER, REAL) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.save_task_trace(UUID, TEXT, TEXT, JSONB, INTEGER, REAL) TO service_role;
+
+-- Count a replay attempt; a failed one clears the trace so it is re-recorded
+CREATE OR REPLACE FUNCTION public.record_trace_replay(
+    p_user_id UUID,
+    p_prompt_hash TEXT,
+    p_success BOOLEAN
+)
+RETURNS TABLE (replays INTEGER, replay_failures INTEGER) AS $$
+BEGIN
+    RETURN QUERY
+    UPDATE public.task_traces t
+    SET
+        replays = t.replays + CASE WHEN p_success THEN 1 ELSE 0 END,
+        replay_failures = t.replay_failures + CASE WHEN p_success THEN 0 ELSE 1 END,
+        history = CASE WHEN p_success THEN t.history ELSE NULL END,
+        last_used_at = NOW()
+    WHERE t.user_id = p_user_id
+    AND t.prompt_hash = p_prompt_hash
+    RETURNING t.replays, t.replay_failures;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Workers only (service role key); see the function's migration
+REVOKE EXECUTE ON FUNCTION public.record_trace_replay(UUID, TEXT, BOOLEAN) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.record_trace_replay(UUID, TEXT, BOOLEAN) TO service_role;
+
+-- ============================================================================
+-- FAIR-SHARE QUEUE TABLES
+-- Tier weights and caps, per-user finish tags and the queue's virtual clock
+-- ============================================================================
+-- Scheduling weight and concurrent-task cap per subscription tier
+CREATE TABLE public.subscription_tier_limits (
+    tier TEXT PRIMARY KEY CHECK (tier IN ('free', 'pro', 'enterprise')),
+    weight REAL NOT NULL CHECK (weight > 0),          -- Share of worker capacity under contention
+    max_running INTEGER NOT NULL CHECK (max_running > 0) -- Tasks running or paused at once
+);
+
+INSERT INTO public.subscription_tier_limits (tier, weight, max_running) VALUES
+    ('free', 1, 1),
+    ('pro', 4, 3),
+    ('enterprise', 8, 10);
+
+-- Per-user finish tag of the fair queue
+CREATE TABLE public.task_queue_shares (
+    user_id UUID PRIMARY KEY REFERENCES public.profiles(id) ON DELETE CASCADE,
+    finish_tag DOUBLE PRECISION NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- The queue's virtual clock (a single row)
+CREATE TABLE public.task_queue_clock (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    virtual_time DOUBLE PRECISION NOT NULL DEFAULT 0
+);
+
+INSERT INTO public.task_queue_clock (id, virtual_time) VALUES (TRUE, 0);
+
+-- Enable RLS
+ALTER TABLE public.subscription_tier_limits ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.task_queue_shares ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.task_queue_clock ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Anyone can view tier limits"
+    ON public.subscription_tier_limits FOR SELECT
+    USING (TRUE);
+
+CREATE POLICY "Service role can manage tier limits"
+    ON public.subscription_tier_limits FOR ALL
+    USING (auth.role() = 'service_role');
+
+CREATE POLICY "Service role can manage queue shares"
+    ON public.task_queue_shares FOR ALL
+    USING (auth.role() = 'service_role');
+
+CREATE POLICY "Service role can manage queue clock"
+    ON public.task_queue_clock FOR ALL
+    USING (auth.role() = 'service_role');
+
+CREATE TRIGGER set_updated_at_task_queue_shares
+    BEFORE UPDATE ON public.task_queue_shares
+    FOR EACH ROW EXECUTE FUNCTION public.handle_updated_at();
+
+-- ============================================================================
+-- TASK ARTIFACTS BUCKET
+-- Content-addressed task screenshots: <sha256[:2]>/<sha256>.webp
+-- ============================================================================
+INSERT INTO storage.buckets (id, name, public, allowed_mime_types)
+VALUES ('task-artifacts', 'task-artifacts', FALSE, ARRAY['image/webp'])
+ON CONFLICT (id) DO NOTHING;
+
+-- Workers upload with the service role; users read what their tasks reference
+CREATE POLICY "Users can view artifacts of their tasks"
+    ON storage.objects FOR SELECT
+    USING (
+        bucket_id = 'task-artifacts'
+        AND EXISTS (
+            SELECT 1 FROM public.tasks t
+            WHERE t.user_id = auth.uid()
+            AND (
+                t.result->'artifacts'->'screenshots' @> jsonb_build_array(
+                    jsonb_build_object('sha256', split_part(storage.filename(name), '.', 1))
+                )
+                OR t.required_input->>'screenshot' = split_part(storage.filename(name), '.', 1)
+            )
+        )
+    );
+
 -- ============================================================================
 -- ADDITIONAL HELPER FUNCTIONS
 -- ============================================================================
 
--- Function to check if user has active task
-CREATE OR REPLACE FUNCTION public.get_active_task_count(p_user_id UUID)
+-- Count a user's tasks in the given states (by default every unfinished one)
+CREATE OR REPLACE FUNCTION public.get_active_task_count(
+    p_user_id UUID,
+    p_statuses task_status[] DEFAULT ARRAY['pending', 'running', 'waiting_for_secret']::task_status[]
+)
 RETURNS INTEGER AS $$
 DECLARE
     active_count INTEGER;
@@ -458,8 +979,8 @@ BEGIN
     SELECT COUNT(*) INTO active_count
     FROM public.tasks
     WHERE user_id = p_user_id
-    AND status IN ('pending', 'running', 'waiting_for_secret');
-    
+    AND status = ANY(p_statuses);
+
     RETURN active_count;
 END;
 $$ LANGUAGE plpgsql SECURITY DEFINER;